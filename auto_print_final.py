@@ -1,70 +1,299 @@
+import time
+STARTUP_T0 = time.perf_counter()  # отсчёт для отчёта о времени запуска
 
 import sys
 import os
-import win32print
-import win32api
 from pathlib import Path
 from datetime import datetime
 import json
-import time
-import subprocess
+import argparse
+import importlib.util
+import multiprocessing
+import bisect
 import threading
-import psutil
-import tempfile
 
-from PySide6.QtWidgets import *
-from PySide6.QtCore import *
-from PySide6.QtGui import *
+from PySide6.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QLabel, QPushButton, QComboBox, QSpinBox,
+    QGroupBox, QListView, QHBoxLayout, QVBoxLayout,
+    QFileDialog, QMessageBox, QProgressBar, QMenu
+)
+from PySide6.QtCore import Qt, QTimer, Signal, QAbstractListModel, QModelIndex
+from PySide6.QtGui import QImage, QPixmap, QActionGroup
 
-# Используем PyMuPDF для работы с PDF
-try:
-    import fitz  # PyMuPDF
-    PYPDF_AVAILABLE = True
-except ImportError:
-    PYPDF_AVAILABLE = False
+# PyMuPDF нужен только для превью PDF - импортируется в процессах пула рендера
+PYPDF_AVAILABLE = importlib.util.find_spec("fitz") is not None
+if not PYPDF_AVAILABLE:
     print("⚠️ PyMuPDF nicht installiert.")
 
-# Используем pyautogui для эмуляции клавиатуры/мыши
-try:
-    import pyautogui
-    PYAUTOGUI_AVAILABLE = True
-except ImportError:
-    PYAUTOGUI_AVAILABLE = False
-    print("⚠️ pyautogui не установлен. Используется fallback метод печати.")
+from autoprint.backends import (
+    create_backend, PRINTER_READY, PRINTER_PAUSED, PRINTER_ERROR, PRINTER_PRINTING, PRINTER_OFFLINE,
+    JOB_SPOOLED, JOB_PRINTED, JOB_ERROR
+)
+from autoprint.engine import PrintEngine, JOB_MISSING, JOB_CANCELLED, JOB_PAUSED
+from autoprint.journal import JobJournal, SENT_STATES
+from autoprint.print_log import PrintLog
+from autoprint.metrics import metrics_from_env
+from autoprint.registry import PrinterRegistry
+from autoprint.thumbnails import ThumbnailCache
+from autoprint.job_queue import JobQueue, DUPLICATE_POLICIES, PRIORITY_NORMAL, PRIORITY_RUSH
+from autoprint.scheduler import PriorityScheduler
+from autoprint.pool import PrinterPool, POLICIES, POLICY_LEAST_PAGES, POLICY_ROUND_ROBIN
+from autoprint.imposition import Layout, run_imposed
+from autoprint.coalesce import run_coalesced, MAX_PAGES, MAX_BYTES
+
+STARTUP_LOG = Path("startup_times.jsonl")
+
+
+class StartupTimer:
+    """Замеры запуска: импорт, окно, первая отрисовка, список принтеров"""
+    
+    def __init__(self):
+        self.marks = {'imports': time.perf_counter() - STARTUP_T0}
+        self.reported = False
+    
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - STARTUP_T0
+        # Отчёт, когда есть и первая отрисовка, и принтеры
+        if not self.reported and 'first_paint' in self.marks and 'printers' in self.marks:
+            self.report()
+    
+    def report(self):
+        self.reported = True
+        parts = [f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.marks.items()]
+        print("Startzeit: " + ", ".join(parts))
+        try:
+            entry = {'time': datetime.now().isoformat()}
+            entry.update({name: round(seconds * 1000, 1) for name, seconds in self.marks.items()})
+            with open(STARTUP_LOG, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError:
+            pass
+
 
+class QueueListModel(QAbstractListModel):
+    """Очередь для QListView: строки рисуются по запросу, обновления только построчные"""
+    
+    def __init__(self, job_queue, parent=None):
+        super().__init__(parent)
+        self.job_queue = job_queue
+        # id растут в порядке добавления, поэтому строка ищется бинарным поиском
+        self._ids = []
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._ids)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._ids):
+            return None
+        job = self.job_queue.get(self._ids[index.row()])
+        if job is None:
+            return None
+        if role == Qt.DisplayRole:
+            marks = ("⚡ " if job.priority > PRIORITY_NORMAL else "") + ("⏸ " if job.paused else "")
+            return f"{index.row() + 1}. {marks}{os.path.basename(job.path)} ({job.copies}x)"
+        if role == Qt.ToolTipRole:
+            return job.path
+        if role == Qt.UserRole:
+            return job.id
+        return None
+    
+    def row_of(self, job_id):
+        row = bisect.bisect_left(self._ids, job_id)
+        if row < len(self._ids) and self._ids[row] == job_id:
+            return row
+        return -1
+    
+    def add_jobs(self, jobs):
+        """Новые задания - вставка строк, уже показанные (merge) - dataChanged"""
+        new_ids = []
+        for job in jobs:
+            row = self.row_of(job.id)
+            if row >= 0:
+                self.job_changed(job.id)
+            else:
+                new_ids.append(job.id)
+        if not new_ids:
+            return
+        new_ids.sort()
+        if not self._ids or new_ids[0] > self._ids[-1]:
+            # Обычный случай: добавление в конец одним блоком
+            first = len(self._ids)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_ids) - 1)
+            self._ids.extend(new_ids)
+            self.endInsertRows()
+            return
+        for job_id in new_ids:
+            row = bisect.bisect_left(self._ids, job_id)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._ids.insert(row, job_id)
+            self.endInsertRows()
+    
+    def remove_jobs(self, job_ids):
+        """Удаляет строки заданий смежными блоками, с конца"""
+        rows = sorted((row for row in map(self.row_of, job_ids) if row >= 0), reverse=True)
+        i = 0
+        while i < len(rows):
+            last = first = rows[i]
+            i += 1
+            while i < len(rows) and rows[i] == first - 1:
+                first = rows[i]
+                i += 1
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._ids[first:last + 1]
+            self.endRemoveRows()
+    
+    def job_changed(self, job_id):
+        row = self.row_of(job_id)
+        if row >= 0:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DisplayRole])
+    
+    def clear(self):
+        self.beginResetModel()
+        self._ids = []
+        self.endResetModel()
 
 
 class AutoPrintTool(QMainWindow):
     status_signal = Signal(str)
     printing_done_signal = Signal()
-    log_print_signal = Signal(str)
     queue_updated_signal = Signal(int)  # сигнал об обновлении очереди
+    manifest_progress_signal = Signal(object)  # пачка манифеста добавлена
+    manifest_done_signal = Signal(object)
+    hotfolder_files_signal = Signal(object)  # новые файлы из наблюдаемой папки
+    printers_changed_signal = Signal(object)  # дифф реестра принтеров из фонового потока
+    thumbnail_ready_signal = Signal(object)  # (путь, превью) из пула рендера
+    jobs_added_signal = Signal(object)  # задания, добавленные в очередь из фонового потока
+    jobs_removed_signal = Signal(object)  # id заданий, убранных из очереди фоновым потоком
+    ingest_progress_signal = Signal(object)  # ход обхода папки
+    ingest_done_signal = Signal(object)
     
     def __init__(self):
         super().__init__()
+        self.startup_timer = StartupTimer()
+        self.saved_printer = None
+        self.printers_loading = False
         self.current_file = None
-        self.print_queue = []  # очередь печати
-        self.print_queue_copies = {}  # копии для каждого файла
-        self.queue_lock = threading.Lock()  # блокировка для потокобезопасности
+        # Очередь печати: задания с id, копиями и принтером
+        self.print_queue = JobQueue(merge=self.merge_copies)
+        # Журнал на диске: после падения неподтверждённые задания возвращаются в очередь
+        self.journal = JobJournal()
+        self.unconfirmed_count = 0
+        # Журнал печати: строка JSON на задание, запись в фоне, итоги по дням в индексе
+        self.print_log = PrintLog()
+        # Модель списка трогается только из GUI-потока; фоновые потоки шлют сигналы
+        self.queue_model = QueueListModel(self.print_queue)
         self.print_copies = 1
         self.config_file = Path("autoprint_config.json")
         self.printing_in_progress = False
         self.files_directory = "W:\\live\\Buttons"
+        self.hotfolder = None
+        # Превью рендерятся в пуле процессов сразу в размере метки и кэшируются
+        self.thumbnails = ThumbnailCache(size=(210, 300))
+        self.preview_file = None
+        self.preview_thumbnail = None
+        # Обход папок идёт в фоне; следующие папки ждут, пока закончится текущая
+        self.ingest = None
+        self.pending_directories = []
+        # Пул: при двух и более отмеченных принтерах очередь печатается на все сразу
+        self.pool_printers = []
+        self.pool_policy = POLICY_LEAST_PAGES
+        # Сборка кнопок на листы: настройки сетки из конфигурации, включается кнопкой
+        self.imposition = {}
+        # Склейка очереди в общие PDF: лимиты из конфигурации, включается кнопкой
+        self.coalesce = {}
+        # Планировщик идущей печати: новые задания, срочность, пауза и отмена попадают в него на ходу
+        self.scheduler = None
         
         if not os.path.exists(self.files_directory):
             self.files_directory = str(Path.home())
         
+        # Бэкенд печати: win32 / cups / file (AUTOPRINT_BACKEND)
+        self.backend = create_backend()
+        # Статус и настройки принтеров кэшируются и обновляются в фоне, UI читает только кэш
+        self.registry = PrinterRegistry(self.backend, on_change=self.printers_changed_signal.emit)
+        # Метрики включаются через AUTOPRINT_METRICS_PORT / AUTOPRINT_METRICS_JSON
+        self.metrics, self.metrics_server = metrics_from_env()
+        self.engine = PrintEngine(
+            self.backend,
+            status_callback=self.status_signal.emit,
+            registry=self.registry,
+            metrics=self.metrics
+        )
+        
         self.setup_ui()
-        self.load_printers()
         self.load_config()
         
         self.status_signal.connect(self.update_status)
         self.printing_done_signal.connect(self.on_printing_done)
-        self.log_print_signal.connect(self.do_log_print)
         self.queue_updated_signal.connect(self.on_queue_updated)
+        self.manifest_progress_signal.connect(self.on_manifest_progress)
+        self.manifest_done_signal.connect(self.on_manifest_done)
+        self.hotfolder_files_signal.connect(self.on_hotfolder_files)
+        self.printers_changed_signal.connect(self.on_printers_changed)
+        self.thumbnail_ready_signal.connect(self.on_thumbnail_ready)
+        self.jobs_added_signal.connect(self.on_jobs_added)
+        self.jobs_removed_signal.connect(self.queue_model.remove_jobs)
+        self.ingest_progress_signal.connect(self.on_ingest_progress)
+        self.ingest_done_signal.connect(self.on_ingest_done)
+        
+        self.resume_journal()
+        try:
+            self.print_log.open()
+        except OSError as e:
+            print(f"Drucklog nicht verfügbar: {e}")
+        
+        # EnumPrinters с сетевыми принтерами может идти секунды - не блокируем окно
+        self.load_printers()
+        self.startup_timer.mark('window')
         
         print("AutoPrintTool gestartet")
     
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        self.startup_timer.mark('first_paint')
+    
+    def closeEvent(self, event):
+        # Дописываем последние пачки журналов до выхода
+        self.journal.close()
+        self.print_log.close()
+        self.backend.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.metrics.enabled and os.environ.get("AUTOPRINT_METRICS_JSON"):
+            try:
+                self.metrics.dump(os.environ["AUTOPRINT_METRICS_JSON"])
+            except OSError as e:
+                print(f"Metriken nicht gespeichert: {e}")
+        super().closeEvent(event)
+    
+    def resume_journal(self):
+        """Открывает журнал и возвращает в очередь задания, не подтверждённые в прошлый раз"""
+        try:
+            self.journal.open()
+            rows = self.journal.unfinished()
+        except Exception as e:
+            # Без журнала очередь работает как раньше, только в памяти
+            print(f"Journal nicht verfügbar: {e}")
+            return
+        
+        restored = self.print_queue.restore(
+            ((job_id, path, copies, printer) for job_id, path, copies, printer, _ in rows),
+            next_id=self.journal.next_id
+        )
+        self.print_queue.journal = self.journal
+        if not restored:
+            return
+        
+        self.queue_model.add_jobs(restored)
+        self.queue_updated_signal.emit(len(self.print_queue))
+        message = f"♻️ {len(restored)} Auftrag/Aufträge aus dem Journal wiederhergestellt"
+        sent = sum(1 for row in rows if row[4] in SENT_STATES)
+        if sent:
+            message += f" ({sent} bereits an Drucker gesendet - bitte prüfen)"
+        self.status_label.setText(message)
+    
     def setup_ui(self):
         self.setWindowTitle("🖨️ AutoPrintTool - Automatisches Drucksystem")
         self.setGeometry(100, 100, 950, 750)
@@ -168,8 +397,16 @@ class AutoPrintTool(QMainWindow):
         self.btn_refresh.setToolTip("Druckerliste aktualisieren")
         self.btn_refresh.clicked.connect(self.load_printers)
         
+        self.btn_pool = QPushButton("🔀")
+        self.btn_pool.setFixedSize(32, 32)
+        self.btn_pool.setToolTip("Druckerpool: mehrere Drucker parallel verwenden")
+        self.pool_menu = QMenu(self)
+        self.pool_menu.aboutToShow.connect(self.fill_pool_menu)
+        self.btn_pool.setMenu(self.pool_menu)
+        
         printer_selection_layout.addWidget(self.printer_combo)
         printer_selection_layout.addWidget(self.btn_refresh)
+        printer_selection_layout.addWidget(self.btn_pool)
         
         # Информация о принтере
         self.printer_info_display = QLabel("Wählen Sie einen Drucker")
@@ -213,20 +450,25 @@ class AutoPrintTool(QMainWindow):
         queue_layout = QVBoxLayout()
         
         # Список очереди
-        self.queue_list = QListWidget()
+        self.queue_list = QListView()
+        self.queue_list.setModel(self.queue_model)
+        # Одинаковая высота строк и раскладка порциями: вставка не пересчитывает все 100k строк
+        self.queue_list.setUniformItemSizes(True)
+        self.queue_list.setLayoutMode(QListView.Batched)
+        self.queue_list.setBatchSize(200)
         self.queue_list.setMaximumHeight(120)
         self.queue_list.setStyleSheet("""
-            QListWidget {
+            QListView {
                 border: 1px solid #dee2e6;
                 border-radius: 4px;
                 padding: 5px;
                 background: #f8f9fa;
             }
-            QListWidget::item {
+            QListView::item {
                 padding: 5px;
                 border-radius: 3px;
             }
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background: #667eea;
                 color: white;
             }
@@ -249,17 +491,55 @@ class AutoPrintTool(QMainWindow):
         self.btn_copies_minus.setToolTip("Удалить 1 копию из выбранного файла")
         self.btn_copies_minus.clicked.connect(self.decrease_copies_for_selected)
         
+        self.btn_rush = QPushButton("⚡ Eilig")
+        self.btn_rush.setFixedWidth(100)
+        self.btn_rush.setToolTip("Ausgewählten Auftrag vorziehen (Eilauftrag) oder zurückstufen")
+        self.btn_rush.clicked.connect(self.toggle_rush_for_selected)
+        
+        self.btn_pause_item = QPushButton("⏸ Pause")
+        self.btn_pause_item.setFixedWidth(100)
+        self.btn_pause_item.setToolTip("Ausgewählten Auftrag anhalten oder fortsetzen, auch während des Drucks")
+        self.btn_pause_item.clicked.connect(self.toggle_pause_for_selected)
+        
         self.btn_clear_queue = QPushButton("🧹 clear")
         self.btn_clear_queue.setFixedWidth(120)
         self.btn_clear_queue.clicked.connect(self.clear_queue)
         
+        self.btn_manifest = QPushButton("📥 Manifest")
+        self.btn_manifest.setFixedWidth(120)
+        self.btn_manifest.setToolTip("CSV/JSON-Manifest mit Dateien und Kopien importieren")
+        self.btn_manifest.clicked.connect(self.select_manifest)
+        
         queue_buttons_layout.addWidget(self.btn_remove_item)
         queue_buttons_layout.addWidget(self.btn_copies_plus)
         queue_buttons_layout.addWidget(self.btn_copies_minus)
+        queue_buttons_layout.addWidget(self.btn_rush)
+        queue_buttons_layout.addWidget(self.btn_pause_item)
         queue_buttons_layout.addWidget(self.btn_clear_queue)
+        queue_buttons_layout.addWidget(self.btn_manifest)
         queue_buttons_layout.addStretch()
         
+        # Ход чтения папки и отмена; видны только во время обхода
+        ingest_layout = QHBoxLayout()
+        
+        self.ingest_progress = QProgressBar()
+        self.ingest_progress.setRange(0, 0)
+        self.ingest_progress.setTextVisible(True)
+        self.ingest_progress.setFormat("📂 Ordner wird gelesen...")
+        self.ingest_progress.setMaximumHeight(18)
+        self.ingest_progress.hide()
+        
+        self.btn_cancel_ingest = QPushButton("✖ Abbrechen")
+        self.btn_cancel_ingest.setFixedWidth(120)
+        self.btn_cancel_ingest.setToolTip("Einlesen des Ordners abbrechen")
+        self.btn_cancel_ingest.clicked.connect(self.cancel_ingest)
+        self.btn_cancel_ingest.hide()
+        
+        ingest_layout.addWidget(self.ingest_progress, 1)
+        ingest_layout.addWidget(self.btn_cancel_ingest)
+        
         queue_layout.addWidget(self.queue_list)
+        queue_layout.addLayout(ingest_layout)
         queue_layout.addLayout(queue_buttons_layout)
         
         queue_group.setLayout(queue_layout)
@@ -284,10 +564,25 @@ class AutoPrintTool(QMainWindow):
         self.btn_apply_copies.clicked.connect(self.apply_copy_settings)
         self.btn_apply_copies.setFixedWidth(90)
         
+        self.btn_imposition = QPushButton("▦ Sammelbogen")
+        self.btn_imposition.setCheckable(True)
+        self.btn_imposition.setToolTip("Motive mit ihren Kopien auf volle Bögen mit Schnittmarken setzen")
+        self.btn_imposition.setFixedWidth(120)
+        
+        self.btn_coalesce = QPushButton("⧉ Zusammenfassen")
+        self.btn_coalesce.setCheckable(True)
+        self.btn_coalesce.setToolTip("Dateien mit ihren Kopien als einen Druckauftrag senden")
+        self.btn_coalesce.setFixedWidth(140)
+        # Оба режима объединяют задания по-своему - включён может быть только один
+        self.btn_imposition.toggled.connect(lambda checked: checked and self.btn_coalesce.setChecked(False))
+        self.btn_coalesce.toggled.connect(lambda checked: checked and self.btn_imposition.setChecked(False))
+        
         copies_layout.addWidget(self.copy_label)
         copies_layout.addWidget(self.copy_spinbox)
         copies_layout.addWidget(self.btn_apply_copies)
         copies_layout.addStretch()
+        copies_layout.addWidget(self.btn_imposition)
+        copies_layout.addWidget(self.btn_coalesce)
         
         main_layout.addWidget(copies_widget)
         
@@ -300,6 +595,12 @@ class AutoPrintTool(QMainWindow):
         self.btn_save_config.clicked.connect(self.save_printer_config)
         self.btn_save_config.setFixedWidth(120)
         
+        self.btn_watch = QPushButton("👁️ Überwachen")
+        self.btn_watch.setCheckable(True)
+        self.btn_watch.setToolTip("Neue Dateien im Ordner automatisch zur Warteschlange hinzufügen")
+        self.btn_watch.toggled.connect(self.toggle_hotfolder)
+        self.btn_watch.setFixedWidth(130)
+        
         self.btn_print = QPushButton("🚀 DRUCKEN")
         self.btn_print.setObjectName("print_button")
         self.btn_print.setMinimumHeight(40)
@@ -311,6 +612,7 @@ class AutoPrintTool(QMainWindow):
         self.btn_reset.setFixedWidth(110)
         
         buttons_layout.addWidget(self.btn_save_config)
+        buttons_layout.addWidget(self.btn_watch)
         buttons_layout.addWidget(self.btn_print, 1)
         buttons_layout.addWidget(self.btn_reset)
         
@@ -415,12 +717,13 @@ class AutoPrintTool(QMainWindow):
         QApplication.processEvents()
     
     def on_printing_done(self):
+        # Планировщик сбрасываем здесь, в GUI-потоке: обработчики кнопок читают его там же
+        self.scheduler = None
         self.btn_print.setEnabled(len(self.print_queue) > 0)
         self.printing_in_progress = False
         self.btn_print.setText("🚀 DRUCKEN")
-    
-    def do_log_print(self, printer_name):
-        self.log_print(printer_name)
+        # Таймер заводим в GUI-потоке, у рабочего потока нет цикла событий
+        QTimer.singleShot(100, self.reset_ui_after_print)
     
     def on_queue_updated(self, count):
         """Обновляет кнопку печати при изменении очереди"""
@@ -437,12 +740,8 @@ class AutoPrintTool(QMainWindow):
                 with open(self.config_file, 'r', encoding='utf-8') as f:
                     config = json.load(f)
                     
-                saved_printer = config.get('default_printer')
-                if saved_printer:
-                    index = self.printer_combo.findText(saved_printer)
-                    if index >= 0:
-                        self.printer_combo.setCurrentIndex(index)
-                        self.update_printer_info_display()
+                # Принтер выберем, когда фоновая загрузка списка закончится
+                self.saved_printer = config.get('default_printer')
                     
                 saved_copies = config.get('default_copies', 1)
                 self.copy_spinbox.setValue(saved_copies)
@@ -452,6 +751,22 @@ class AutoPrintTool(QMainWindow):
                 if saved_dir and os.path.exists(saved_dir):
                     self.files_directory = saved_dir
                 
+                if config.get('watch_folder'):
+                    self.btn_watch.setChecked(True)
+                
+                if config.get('duplicate_policy') in DUPLICATE_POLICIES:
+                    self.print_queue.duplicates = config['duplicate_policy']
+                
+                self.pool_printers = list(config.get('pool_printers') or [])
+                if config.get('pool_policy') in POLICIES:
+                    self.pool_policy = config['pool_policy']
+                self.update_pool_button()
+                
+                self.imposition = dict(config.get('imposition') or {})
+                self.btn_imposition.setChecked(bool(self.imposition.get('enabled')))
+                self.coalesce = dict(config.get('coalesce') or {})
+                self.btn_coalesce.setChecked(bool(self.coalesce.get('enabled')))
+                
                 self.status_label.setText(f"💾 Konfiguration geladen")
                 
         except Exception as e:
@@ -468,7 +783,13 @@ class AutoPrintTool(QMainWindow):
                 'default_printer': printer,
                 'default_copies': self.print_copies,
                 'last_saved': datetime.now().isoformat(),
-                'files_directory': self.files_directory
+                'files_directory': self.files_directory,
+                'watch_folder': self.hotfolder is not None,
+                'duplicate_policy': self.print_queue.duplicates,
+                'pool_printers': self.pool_printers,
+                'pool_policy': self.pool_policy,
+                'imposition': dict(self.imposition, enabled=self.btn_imposition.isChecked()),
+                'coalesce': dict(self.coalesce, enabled=self.btn_coalesce.isChecked())
             }
             
             with open(self.config_file, 'w', encoding='utf-8') as f:
@@ -486,54 +807,42 @@ class AutoPrintTool(QMainWindow):
             self.printer_info_display.setText("Wählen Sie einen Drucker")
             return
         
+        printer_info = self.registry.get(printer_name, block=False)
+        if printer_info is None:
+            # Ещё не в кэше - реестр спросит спулер в фоне и пришлёт дифф
+            self.printer_info_display.setText(f"⏳ {printer_name}")
+            return
+        if printer_info['status_code'] is None:
+            self.printer_info_display.setText(f"✅ {printer_name}")
+            return
+        
         try:
-            handle = win32print.OpenPrinter(printer_name)
-            printer_info = win32print.GetPrinter(handle, 2)
-            win32print.ClosePrinter(handle)
-            
             info_parts = []
             
             # Статус
-            status = printer_info['Status']
             status_text = {
-                0: "✅ Bereit",
-                1: "⏸️ Pausiert",
-                2: "❌ Fehler",
-                4: "🖨️ Druckt",
-                5: "🔌 Offline"
-            }.get(status, f"Status {status}")
+                PRINTER_READY: "✅ Bereit",
+                PRINTER_PAUSED: "⏸️ Pausiert",
+                PRINTER_ERROR: "❌ Fehler",
+                PRINTER_PRINTING: "🖨️ Druckt",
+                PRINTER_OFFLINE: "🔌 Offline"
+            }.get(printer_info['status'], f"Status {printer_info['status_code']}")
             info_parts.append(status_text)
             
-            # Настройки из DEVMODE
-            if 'pDevMode' in printer_info and printer_info['pDevMode']:
-                devmode = printer_info['pDevMode']
-                
-                # Размер бумаги
-                if hasattr(devmode, 'PaperSize'):
-                    paper_sizes = {
-                        1: "Letter",
-                        5: "Legal",
-                        8: "A3",
-                        9: "A4",
-                        11: "A5",
-                        80: "Custom"
-                    }
-                    paper = paper_sizes.get(devmode.PaperSize, f"Size {devmode.PaperSize}")
-                    info_parts.append(f"📄 {paper}")
-                
-                # Ориентация
-                if hasattr(devmode, 'Orientation'):
-                    orientation = "Breit" if devmode.Orientation == 1 else "Hoch"
-                    info_parts.append(f"🔄 {orientation}")
-                
-                # Разрешение
-                if hasattr(devmode, 'PrintQuality') and devmode.PrintQuality > 0:
-                    info_parts.append(f"⭐ {devmode.PrintQuality}dpi")
-                
-                # Цвет
-                if hasattr(devmode, 'Color'):
-                    color = "Farbe" if devmode.Color == 2 else "S/W"
-                    info_parts.append(f"🎨 {color}")
+            # Настройки из DEVMODE / параметров драйвера
+            if printer_info['paper']:
+                info_parts.append(f"📄 {printer_info['paper']}")
+            
+            if printer_info['orientation']:
+                orientation = "Breit" if printer_info['orientation'] == "landscape" else "Hoch"
+                info_parts.append(f"🔄 {orientation}")
+            
+            if printer_info['dpi']:
+                info_parts.append(f"⭐ {printer_info['dpi']}dpi")
+            
+            if printer_info['color'] is not None:
+                color = "Farbe" if printer_info['color'] else "S/W"
+                info_parts.append(f"🎨 {color}")
             
             self.printer_info_display.setText(" | ".join(info_parts))
             
@@ -542,48 +851,40 @@ class AutoPrintTool(QMainWindow):
             self.printer_info_display.setText(f"✅ {printer_name}")
     
     def generate_preview(self, file_path):
-        """Создает превью файла"""
-        try:
-            file_ext = Path(file_path).suffix.lower()
-            preview_size = QSize(210, 300)
-            
-            if file_ext in ['.jpg', '.jpeg', '.png', '.bmp']:
-                pixmap = QPixmap(file_path)
-                if not pixmap.isNull():
-                    pixmap = pixmap.scaled(preview_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                    self.preview_label.setPixmap(pixmap)
-                else:
-                    self.set_preview_icon(file_ext)
-                    
-            elif file_ext == '.pdf' and PYPDF_AVAILABLE:
-                try:
-                    doc = fitz.open(file_path)
-                    page = doc.load_page(0)
-                    pix = page.get_pixmap(matrix=fitz.Matrix(1.5, 1.5))
-                    
-                    img_data = pix.tobytes("ppm")
-                    qimage = QImage()
-                    qimage.loadFromData(img_data)
-                    
-                    pixmap = QPixmap.fromImage(qimage)
-                    if not pixmap.isNull():
-                        pixmap = pixmap.scaled(preview_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                        self.preview_label.setPixmap(pixmap)
-                    else:
-                        self.set_preview_icon(file_ext)
-                    
-                    doc.close()
-                        
-                except Exception as e:
-                    print(f"PDF Vorschau Fehler: {e}")
-                    self.set_preview_icon(file_ext)
-                    
-            else:
-                self.set_preview_icon(file_ext)
-                
-        except Exception as e:
-            print(f"Vorschau Fehler: {e}")
-            self.set_preview_icon('.unknown')
+        """Показывает превью файла: из кэша сразу, иначе рендер в фоне"""
+        self.preview_file = file_path
+        file_ext = Path(file_path).suffix.lower()
+        if file_ext not in ['.pdf', '.jpg', '.jpeg', '.png', '.bmp']:
+            self.set_preview_icon(file_ext)
+            return
+        
+        # Из памяти - сразу; stat и диск (возможно, сетевой) проверяет пул, не GUI-поток
+        thumbnail = self.thumbnails.get(file_path)
+        if thumbnail is not None:
+            self.show_thumbnail(file_path, thumbnail)
+        else:
+            self.preview_label.clear()
+            self.preview_label.setText("⏳\nVorschau...")
+        self.thumbnails.request(file_path, lambda path, thumb: self.thumbnail_ready_signal.emit((path, thumb)))
+    
+    def on_thumbnail_ready(self, result):
+        file_path, thumbnail = result
+        # Пока рендерили, могли выбрать другой файл; то же превью второй раз не рисуем
+        if file_path == self.preview_file and (thumbnail is None or thumbnail is not self.preview_thumbnail):
+            self.show_thumbnail(file_path, thumbnail)
+    
+    def show_thumbnail(self, file_path, thumbnail):
+        self.preview_thumbnail = thumbnail
+        if thumbnail is None:
+            self.set_preview_icon(Path(file_path).suffix.lower())
+            return
+        image_format = QImage.Format_Grayscale8 if thumbnail.channels == 1 else QImage.Format_RGB888
+        # Сэмплы уже в нужном размере: QImage прямо из буфера, без PPM и масштабирования
+        qimage = QImage(
+            thumbnail.samples, thumbnail.width, thumbnail.height,
+            thumbnail.width * thumbnail.channels, image_format
+        ).copy()
+        self.preview_label.setPixmap(QPixmap.fromImage(qimage))
     
     def set_preview_icon(self, file_ext):
         """Устанавливает иконку вместо превью"""
@@ -645,7 +946,6 @@ class AutoPrintTool(QMainWindow):
             
             if added > 0:
                 self.queue_updated_signal.emit(len(self.print_queue))
-                self.update_queue_display()
         
         self.drop_zone.setStyleSheet("""
             QLabel#drop_zone {
@@ -680,7 +980,6 @@ class AutoPrintTool(QMainWindow):
                     self.add_to_queue(file_path)
             
             self.queue_updated_signal.emit(len(self.print_queue))
-            self.update_queue_display()
     
     def is_supported_file(self, file_path):
         """Проверяет, поддерживается ли файл"""
@@ -688,81 +987,265 @@ class AutoPrintTool(QMainWindow):
         return ext in ['.pdf', '.jpg', '.jpeg', '.png', '.bmp']
     
     def add_files_from_directory(self, directory):
-        """Добавляет все поддерживаемые файлы из папки"""
-        try:
-            for root, dirs, files in os.walk(directory):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    if self.is_supported_file(file_path):
-                        self.add_to_queue(file_path)
-        except Exception as e:
-            print(f"Fehler beim Durchsuchen des Verzeichnisses: {e}")
+        """Добавляет все поддерживаемые файлы из папки: обход в фоне, очередь пополняется пачками"""
+        if self.ingest is not None and self.ingest.running:
+            self.pending_directories.append(directory)
+            return
+        
+        from autoprint.ingest import DirectoryIngest
+        copies = self.print_copies
+        
+        def on_batch(paths):
+            # Поток обхода: очередь потокобезопасна, модель обновится через сигнал
+            added = self.print_queue.add_many((path, copies) for path in paths)
+            if added:
+                self.jobs_added_signal.emit(added)
+        
+        self.ingest = DirectoryIngest(
+            directory,
+            on_batch,
+            progress_callback=self.ingest_progress_signal.emit
+        )
+        self.ingest_progress.setFormat(f"📂 {os.path.basename(directory) or directory}...")
+        self.ingest_progress.show()
+        self.btn_cancel_ingest.setEnabled(True)
+        self.btn_cancel_ingest.show()
+        self.ingest.start(on_done=self.ingest_done_signal.emit)
+    
+    def cancel_ingest(self):
+        self.pending_directories.clear()
+        if self.ingest is not None:
+            self.ingest.cancel()
+            self.btn_cancel_ingest.setEnabled(False)
+            self.ingest_progress.setFormat("⏹️ Wird abgebrochen...")
+    
+    def on_ingest_progress(self, summary):
+        self.ingest_progress.setFormat(
+            f"📂 {summary['files']} Dateien, {summary['directories']} Ordner gelesen..."
+        )
+        self.on_queue_changed_in_background()
+    
+    def on_ingest_done(self, summary):
+        self.ingest = None
+        self.on_queue_changed_in_background()
+        if summary['cancelled']:
+            text = f"⏹️ Einlesen abgebrochen: {summary['files']} Datei(en) übernommen"
+        else:
+            text = f"📂 {summary['files']} Datei(en) aus {summary['directories']} Ordner(n) gelesen"
+        if summary['errors']:
+            text += f", {len(summary['errors'])} Ordner nicht lesbar"
+        self.status_label.setText(text)
+        
+        if self.pending_directories:
+            self.add_files_from_directory(self.pending_directories.pop(0))
+            return
+        self.ingest_progress.hide()
+        self.btn_cancel_ingest.hide()
+    
+    def on_queue_changed_in_background(self):
+        """Кнопка печати и превью после пополнения очереди фоновым потоком"""
+        self.queue_updated_signal.emit(len(self.print_queue))
+        if self.current_file is None and self.print_queue:
+            self.current_file = self.print_queue.first().path
+            self.generate_preview(self.current_file)
     
     def add_to_queue(self, file_path):
         """Добавляет файл в очередь печати с указанным количеством копий"""
-        with self.queue_lock:
-            if file_path not in self.print_queue:
-                self.print_queue.append(file_path)
-                # Сохраняем количество копий для этого файла
-                self.print_queue_copies[file_path] = self.print_copies
-                # Показываем превью первого файла в очереди
-                if len(self.print_queue) == 1:
-                    self.current_file = file_path
-                    self.generate_preview(file_path)
-                    
-                self.status_label.setText(
-                    f"✅ {os.path.basename(file_path)} добавлен ({self.print_copies} копий)"
+        job = self.print_queue.add(file_path, self.print_copies)
+        if job is None:
+            return
+        self.on_jobs_added([job])
+        # Показываем превью первого файла в очереди
+        if len(self.print_queue) == 1:
+            self.current_file = file_path
+            self.generate_preview(file_path)
+        
+        self.status_label.setText(
+            f"✅ {os.path.basename(file_path)} добавлен ({job.copies} копий)"
+        )
+    
+    def add_entries_to_queue(self, entries):
+        """Добавляет пачку записей манифеста за один захват блокировки (из фонового потока)"""
+        added = self.print_queue.add_many(
+            (entry.path, entry.copies, entry.printer) for entry in entries
+        )
+        if added:
+            self.jobs_added_signal.emit(added)
+        return len(added)
+    
+    def select_manifest(self):
+        """Диалог выбора манифеста"""
+        manifest_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Manifest auswählen",
+            self.files_directory,
+            "Manifeste (*.csv *.tsv *.txt *.json *.jsonl *.ndjson)"
+        )
+        if manifest_path:
+            self.import_manifest_file(manifest_path)
+    
+    def import_manifest_file(self, manifest_path):
+        """Запускает импорт манифеста в фоне; UI обновляется раз на пачку"""
+        self.btn_manifest.setEnabled(False)
+        self.status_label.setText(f"📥 Importiere {os.path.basename(manifest_path)}...")
+        
+        def worker():
+            try:
+                from autoprint.manifest import import_manifest
+                summary = import_manifest(
+                    manifest_path,
+                    self.add_entries_to_queue,
+                    default_copies=self.print_copies,
+                    progress_callback=self.manifest_progress_signal.emit
                 )
+            except Exception as e:
+                summary = {'manifest': manifest_path, 'error': str(e)}
+            self.manifest_done_signal.emit(summary)
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
+    def on_manifest_progress(self, summary):
+        self.on_queue_changed_in_background()
+        self.status_label.setText(
+            f"📥 Manifest: {summary['added']} hinzugefügt, {summary['total']} gelesen"
+        )
+    
+    def on_manifest_done(self, summary):
+        self.btn_manifest.setEnabled(True)
+        if 'error' in summary:
+            self.status_label.setText(f"❌ Manifest-Fehler: {summary['error']}")
+            return
+        
+        self.on_manifest_progress(summary)
+        skipped = summary['missing'] + summary['unsupported'] + summary['invalid']
+        self.status_label.setText(
+            f"✅ Manifest: {summary['added']} Datei(en) hinzugefügt, {skipped} übersprungen"
+        )
+        for error in summary['errors'][:20]:
+            print(f"Manifest: {error}")
+    
+    def toggle_hotfolder(self, enabled):
+        """Включает/выключает наблюдение за папкой файлов"""
+        if self.hotfolder:
+            self.hotfolder.stop()
+            self.hotfolder = None
+        
+        if not enabled:
+            self.status_label.setText("👁️ Ordnerüberwachung aus")
+            return
+        
+        if not os.path.isdir(self.files_directory):
+            self.status_label.setText(f"❌ Ordner nicht gefunden: {self.files_directory}")
+            self.btn_watch.setChecked(False)
+            return
+        
+        from autoprint.hotfolder import HotFolderWatcher
+        self.hotfolder = HotFolderWatcher(self.files_directory, self.hotfolder_files_signal.emit)
+        self.hotfolder.start()
+        mode = "Benachrichtigungen" if self.hotfolder.native else "Abfrage"
+        self.status_label.setText(f"👁️ Überwache {self.files_directory} ({mode})")
+    
+    def on_hotfolder_files(self, paths):
+        """Добавляет готовые файлы из папки с копиями по умолчанию"""
+        from autoprint.manifest import ManifestEntry
+        added = self.add_entries_to_queue([ManifestEntry(path, self.print_copies) for path in paths])
+        if not added:
+            return
+        self.on_queue_changed_in_background()
+        self.status_label.setText(f"👁️ {added} neue Datei(en) aus dem Ordner hinzugefügt")
     
-    def update_queue_display(self):
-        """Обновляет отображение очереди с количеством копий"""
-        self.queue_list.clear()
-        with self.queue_lock:
-            for i, file_path in enumerate(self.print_queue):
-                filename = os.path.basename(file_path)
-                copies = self.print_queue_copies.get(file_path, 1)
-                item = QListWidgetItem(f"{i+1}. {filename} ({copies}x)")
-                self.queue_list.addItem(item)
+    def selected_job_id(self):
+        index = self.queue_list.currentIndex()
+        return index.data(Qt.UserRole) if index.isValid() else None
+    
+    def on_jobs_added(self, jobs):
+        """Новые задания в списке; во время печати - сразу в планировщик"""
+        # Дополненные копиями (merge) уже в списке и в планировщике: их копии он прочтёт сам
+        inserted = [job for job in jobs if self.queue_model.row_of(job.id) < 0]
+        self.queue_model.add_jobs(jobs)
+        scheduler = self.scheduler
+        if scheduler is not None:
+            scheduler.push_many(inserted)
+    
+    def merge_copies(self, job, apply):
+        """Дубликат при merge: копии прибавляются, пока задание ждёт печати; к взятому в печать
+        или уже отправленному они встают отдельным заданием (вызывается под блокировкой очереди)"""
+        scheduler = self.scheduler
+        if scheduler is None:
+            apply()
+            return True
+        return scheduler.update_waiting(job.id, apply)
+    
+    def cancel_scheduled(self, job_ids):
+        """Отменяет задания идущей печати: ждущие не печатаются, печатаемое останавливается
+        на следующей странице или копии"""
+        scheduler = self.scheduler
+        if scheduler is not None:
+            for job_id in job_ids:
+                scheduler.cancel(job_id)
     
     def remove_from_queue(self):
-        """Удаляет выбранный файл из очереди"""
-        current_row = self.queue_list.currentRow()
-        if current_row >= 0:
-            with self.queue_lock:
-                if current_row < len(self.print_queue):
-                    file_path = self.print_queue[current_row]
-                    del self.print_queue[current_row]
-                    # Удаляем количество копий для этого файла
-                    if file_path in self.print_queue_copies:
-                        del self.print_queue_copies[file_path]
-            self.update_queue_display()
+        """Удаляет выбранный файл из очереди; печатаемый останавливается на следующей странице или копии"""
+        job_id = self.selected_job_id()
+        if job_id is not None:
+            self.cancel_scheduled([job_id])
+        if job_id is not None and self.print_queue.remove(job_id) is not None:
+            self.queue_model.remove_jobs([job_id])
             self.queue_updated_signal.emit(len(self.print_queue))
     
     def increase_copies_for_selected(self):
         """Увеличить количество копий для выбранного файла"""
-        current_row = self.queue_list.currentRow()
-        if current_row >= 0 and current_row < len(self.print_queue):
-            file_path = self.print_queue[current_row]
-            with self.queue_lock:
-                current_copies = self.print_queue_copies.get(file_path, 1)
-                self.print_queue_copies[file_path] = min(current_copies + 1, 9999)
-            self.update_queue_display()
-            self.status_label.setText(
-                f"📌 {os.path.basename(file_path)}: {self.print_queue_copies[file_path]} копий"
-            )
+        self.change_copies_for_selected(1)
     
     def decrease_copies_for_selected(self):
         """Уменьшить количество копий для выбранного файла"""
-        current_row = self.queue_list.currentRow()
-        if current_row >= 0 and current_row < len(self.print_queue):
-            file_path = self.print_queue[current_row]
-            with self.queue_lock:
-                current_copies = self.print_queue_copies.get(file_path, 1)
-                self.print_queue_copies[file_path] = max(current_copies - 1, 1)
-            self.update_queue_display()
-            self.status_label.setText(
-                f"📌 {os.path.basename(file_path)}: {self.print_queue_copies[file_path]} копий"
-            )
+        self.change_copies_for_selected(-1)
+    
+    def change_copies_for_selected(self, delta):
+        job = self.print_queue.get(self.selected_job_id())
+        if job is None:
+            return
+        job = self.print_queue.set_copies(job.id, job.copies + delta)
+        self.queue_model.job_changed(job.id)
+        self.status_label.setText(
+            f"📌 {os.path.basename(job.path)}: {job.copies} копий"
+        )
+    
+    def toggle_rush_for_selected(self):
+        """Eilauftrag: задание печатается раньше обычных, с учётом старения ждущих"""
+        job = self.print_queue.get(self.selected_job_id())
+        if job is None:
+            return
+        priority = PRIORITY_NORMAL if job.priority > PRIORITY_NORMAL else PRIORITY_RUSH
+        self.print_queue.set_priority(job.id, priority)
+        scheduler = self.scheduler
+        if scheduler is not None:
+            scheduler.set_priority(job.id, priority)
+        self.queue_model.job_changed(job.id)
+        if priority == PRIORITY_RUSH:
+            self.status_label.setText(f"⚡ {os.path.basename(job.path)}: Eilauftrag")
+        else:
+            self.status_label.setText(f"📌 {os.path.basename(job.path)}: normale Priorität")
+    
+    def toggle_pause_for_selected(self):
+        """Пауза задания: ждущее пропускается, печатаемое возвращается в очередь до отправки
+        или на следующей странице растра; принтер тем временем печатает следующие"""
+        job = self.print_queue.get(self.selected_job_id())
+        if job is None:
+            return
+        paused = not job.paused
+        self.print_queue.set_paused(job.id, paused)
+        scheduler = self.scheduler
+        if scheduler is not None:
+            if paused:
+                scheduler.pause(job.id)
+            else:
+                scheduler.resume(job.id)
+        self.queue_model.job_changed(job.id)
+        if paused:
+            self.status_label.setText(f"⏸ {os.path.basename(job.path)}: angehalten")
+        else:
+            self.status_label.setText(f"▶️ {os.path.basename(job.path)}: fortgesetzt")
     
     def clear_queue(self):
         """Очищает всю очередь"""
@@ -774,37 +1257,104 @@ class AutoPrintTool(QMainWindow):
             QMessageBox.No
         )
         if reply == QMessageBox.Yes:
-            with self.queue_lock:
-                self.print_queue.clear()
-                self.print_queue_copies.clear()
-            self.update_queue_display()
+            self.cancel_scheduled(job.id for job in self.print_queue.jobs())
+            self.print_queue.clear()
+            self.queue_model.clear()
             self.queue_updated_signal.emit(0)
             self.status_label.setText("🧹 Warteschlange geleert")
     
     def load_printers(self):
-        try:
-            printers = win32print.EnumPrinters(
-                win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS
-            )
-            
-            default_printer = win32print.GetDefaultPrinter()
-            self.printer_combo.clear()
-            
-            for printer in printers:
-                name = printer[2]
-                self.printer_combo.addItem(name)
-                if name == default_printer:
-                    self.printer_combo.setCurrentText(name)
-            
-            if len(printers) > 0:
-                self.status_label.setText(f"📋 {len(printers)} Drucker geladen")
+        """Просит реестр перечитать принтеры в фоне; комбобокс заполнит on_printers_changed"""
+        if self.printers_loading:
+            return
+        self.printers_loading = True
+        self.btn_refresh.setEnabled(False)
+        if self.printer_combo.count() == 0:
+            self.printer_combo.setPlaceholderText("⏳ Drucker werden geladen...")
+        
+        if self.registry.running:
+            self.registry.request_refresh()
+        else:
+            self.registry.start()
+    
+    def on_printers_changed(self, diff):
+        """Применяет дифф реестра: список принтеров или новые данные одного принтера"""
+        if diff['changed']:
+            if self.printer_combo.currentText() in diff['changed']:
                 self.update_printer_info_display()
-            else:
-                self.status_label.setText("⚠ Keine Drucker gefunden")
-                
-        except Exception as e:
-            print(f"Fehler beim Laden der Drucker: {e}")
+            return
+        
+        self.printers_loading = False
+        self.btn_refresh.setEnabled(True)
+        self.startup_timer.mark('printers')
+        
+        error = diff.get('error')
+        if error is not None:
+            print(f"Fehler beim Laden der Drucker: {error}")
             self.status_label.setText("⚠ Fehler beim Laden der Drucker")
+            return
+        
+        printers = diff['printers']
+        default_printer = diff['default']
+        
+        # Сохраняем выбор пользователя при обновлении, иначе берём сохранённый/стандартный
+        selected = self.printer_combo.currentText() or self.saved_printer
+        if selected not in printers:
+            selected = default_printer
+        
+        self.printer_combo.blockSignals(True)
+        self.printer_combo.clear()
+        self.printer_combo.addItems(printers)
+        if selected in printers:
+            self.printer_combo.setCurrentText(selected)
+        self.printer_combo.blockSignals(False)
+        
+        if len(printers) > 0:
+            self.status_label.setText(f"📋 {len(printers)} Drucker geladen")
+            self.update_printer_info_display()
+        else:
+            self.status_label.setText("⚠ Keine Drucker gefunden")
+    
+    def fill_pool_menu(self):
+        """Меню пула: отметки принтеров и способ распределения"""
+        self.pool_menu.clear()
+        printers = self.registry.printers()
+        for printer in printers:
+            action = self.pool_menu.addAction(printer)
+            action.setCheckable(True)
+            action.setChecked(printer in self.pool_printers)
+            action.toggled.connect(lambda checked, name=printer: self.toggle_pool_printer(name, checked))
+        if not printers:
+            self.pool_menu.addAction("Keine Drucker").setEnabled(False)
+        
+        self.pool_menu.addSeparator()
+        group = QActionGroup(self.pool_menu)
+        for policy, label in ((POLICY_LEAST_PAGES, "Wenigste offene Seiten"), (POLICY_ROUND_ROBIN, "Reihum")):
+            action = self.pool_menu.addAction(label)
+            action.setCheckable(True)
+            action.setChecked(policy == self.pool_policy)
+            action.triggered.connect(lambda checked, value=policy: self.set_pool_policy(value))
+            group.addAction(action)
+    
+    def toggle_pool_printer(self, printer, checked):
+        if checked and printer not in self.pool_printers:
+            self.pool_printers.append(printer)
+        elif not checked and printer in self.pool_printers:
+            self.pool_printers.remove(printer)
+        self.update_pool_button()
+    
+    def set_pool_policy(self, policy):
+        self.pool_policy = policy
+        self.update_pool_button()
+    
+    def update_pool_button(self):
+        if len(self.pool_printers) >= 2:
+            self.btn_pool.setText(f"🔀{len(self.pool_printers)}")
+            self.status_label.setText(
+                f"🔀 Pool: {', '.join(self.pool_printers)} ({self.pool_policy})"
+            )
+        else:
+            self.btn_pool.setText("🔀")
     
     def update_copy_count(self, value):
         self.print_copies = value
@@ -816,13 +1366,14 @@ class AutoPrintTool(QMainWindow):
     
     def start_printing(self):
         """Начинает печать очереди"""
-        with self.queue_lock:
-            if not self.print_queue:
-                self.status_label.setText("❌ Keine Datei(en) in der Warteschlange")
-                return
+        if not self.print_queue:
+            self.status_label.setText("❌ Keine Datei(en) in der Warteschlange")
+            return
         
         printer = self.printer_combo.currentText()
-        if not printer:
+        if len(self.pool_printers) >= 2:
+            printer = None
+        elif not printer:
             self.status_label.setText("❌ Bitte Drucker auswählen")
             return
         
@@ -831,7 +1382,7 @@ class AutoPrintTool(QMainWindow):
             return
         
         # Подтверждение для большого количества
-        total_copies = len(self.print_queue) * self.print_copies
+        total_copies = sum(job.copies for job in self.print_queue if not job.paused)
         if total_copies > 50:
             reply = QMessageBox.question(
                 self,
@@ -843,282 +1394,216 @@ class AutoPrintTool(QMainWindow):
             if reply == QMessageBox.No:
                 return
         
+        layout = None
+        if self.btn_imposition.isChecked():
+            try:
+                layout = Layout.from_config(self.imposition)
+            except ValueError as e:
+                self.status_label.setText(f"❌ Sammelbogen: {e}")
+                return
+        
+        scheduler = PriorityScheduler()
+        # Под блокировкой очереди: merge из фонового потока видит либо ещё не начатую печать,
+        # либо уже заполненный планировщик (merge_copies)
+        with self.print_queue.lock:
+            scheduler.push_many(self.print_queue.jobs())
+            if scheduler:
+                self.scheduler = scheduler
+        if not scheduler:
+            self.status_label.setText("⏸ Alle Aufträge sind angehalten")
+            return
+        
         self.printing_in_progress = True
         self.btn_print.setEnabled(False)
         self.btn_print.setText("🖨️ DRUCKE...")
         
         thread = threading.Thread(
             target=self.print_queue_worker,
-            args=(printer, self.print_copies),
+            args=(printer, self.print_copies, layout, self.btn_coalesce.isChecked(), scheduler),
             daemon=True
         )
         thread.start()
     
-    def print_queue_worker(self, printer_name, copies):
-        """Обрабатывает очередь печати последовательно в отдельном потоке"""
+    def print_queue_worker(self, printer_name, copies, layout=None, coalesce=False, scheduler=None):
+        """Печатает задания планировщика в отдельном потоке: по приоритету, новые и срочные - на ходу
+        
+        С layout задания собираются на листы, с coalesce - склеиваются в общие PDF; им нужен
+        весь список сразу, поэтому ждущие задания берутся из планировщика одним снимком.
+        Без scheduler (замеры, скрипты) печатается вся очередь по приоритету.
+        """
+        if scheduler is None:
+            scheduler = PriorityScheduler()
+            scheduler.push_many(self.print_queue.jobs())
+        controls = None
+        if layout is not None or coalesce:
+            drained = scheduler.drain()
+            batch = [job for job, _ in drained]
+            jobs = [job.as_tuple() for job in batch]
+            # Отмена и пауза проверяются по общим файлам (combined.PartControl)
+            controls = {index: control for index, (_, control) in enumerate(drained)}
+            lookup = batch.__getitem__
+        else:
+            # Движок берёт задания из планировщика по одному, ключ состояния - id задания
+            jobs = scheduler
+            lookup = scheduler.job
+        journal = self.print_queue.journal
+        completed = []
+        records = {}  # ключ задания -> состояние, принтер, страницы и отметки времени
+        seen = {}  # ключ задания -> задание: планировщик забывает ушедшие в спулер (discard)
+        
+        def on_job_state(key, state, info):
+            job = seen.get(key)
+            if job is None:
+                job = seen[key] = lookup(key)
+            now = time.monotonic()
+            record = records.get(key)
+            if record is None:
+                record = records[key] = {'time': datetime.now().isoformat(timespec='seconds'), 'started': now}
+                self.metrics.observe('queue_wait', now - job.added_at, info.get('printer'), self.backend.name)
+            record['state'] = state
+            record['finished'] = now
+            if state == JOB_SPOOLED:
+                record['spooled'] = now
+            for name in ('printer', 'pages', 'error', 'batch'):
+                if info.get(name) is not None:
+                    record[name] = info[name]
+            if journal is not None:
+                journal.state(job.id, state, printer=info.get('printer'), detail=info.get('error'))
+            if state in (JOB_SPOOLED, JOB_PRINTED, JOB_ERROR, JOB_MISSING, JOB_CANCELLED):
+                # Ушло в спулер или завершилось: пауза и отмена к заданию больше не относятся
+                scheduler.discard(job.id)
+            # Из очереди уходит только то, что принтер подтвердил (или чего уже нет на диске, или отменено)
+            if (state in (JOB_PRINTED, JOB_MISSING, JOB_CANCELLED)
+                    or (state == JOB_SPOOLED and not self.engine.wait_printed)):
+                completed.append(job.id)
+        
         try:
-            with self.queue_lock:
-                queue_copy = list(self.print_queue)
-            
-            total = len(queue_copy)
+            if printer_name is None:
+                # Пул: по потоку на принтер, распределение по выбранной политике
+                run = PrinterPool(self.engine, self.pool_printers, policy=self.pool_policy).run
+            else:
+                def run(jobs, **callbacks):
+                    return self.engine.run(jobs, printer_name, **callbacks)
             
-            for idx, file_path in enumerate(queue_copy):
-                if not os.path.exists(file_path):
-                    self.status_signal.emit(f"⚠️ Datei nicht gefunden: {os.path.basename(file_path)}")
-                    continue
-                
-                self.current_file = file_path
-                
-                # Получаем количество копий для этого конкретного файла
-                file_copies = self.print_queue_copies.get(file_path, copies)
-                
-                self.status_signal.emit(
-                    f"🖨️ Drucke {idx+1}/{total}: {os.path.basename(file_path)} ({file_copies}x)"
+            if layout is not None:
+                summary = run_imposed(
+                    run,
+                    jobs,
+                    layout,
+                    on_job_start=self.set_current_file,
+                    on_job_state=on_job_state,
+                    status=self.status_signal.emit,
+                    controls=controls
                 )
-                
-                try:
-                    file_ext = Path(file_path).suffix.lower()
-                    
-                    if file_ext == '.pdf':
-                        success = self.print_pdf_adobe_simple(file_path, printer_name, file_copies)
-                        if not success:
-                            self.status_signal.emit(f"⚠️ Adobe nicht verfügbar, verwende Windows-Druck...")
-                            self.print_with_windows(file_path, printer_name, file_copies)
-                    else:
-                        self.print_with_windows(file_path, printer_name, file_copies)
-                    
-                    self.log_print(printer_name, file_copies)
-                    time.sleep(0.5)
-                    
-                except Exception as e:
-                    self.status_signal.emit(f"❌ Fehler beim Drucken {os.path.basename(file_path)}: {e}")
-                    print(f"Print error: {e}")
-            
-            self.status_signal.emit(f"✅ {total} Datei(en) gesendet an {printer_name}")
-            
-        finally:
-            with self.queue_lock:
-                self.print_queue.clear()
-                self.print_queue_copies.clear()
-            self.queue_updated_signal.emit(0)
-            self.update_queue_display()
-            QTimer.singleShot(100, self.reset_ui_after_print)
-            self.printing_done_signal.emit()
-    
-    def print_pdf_adobe_simple(self, file_path, printer_name, copies):
-        """Улучшенная печать PDF - закрываем Adobe после каждой копии"""
-        try:
-            adobe_exe = self.find_adobe_reader()
-            if not adobe_exe:
-                return False
-            
-            print(f"Verwende Adobe Reader: {adobe_exe}")
-            
-            # Для каждой копии отдельно
-            for i in range(copies):
-                if copies > 1:
-                    self.status_signal.emit(f"🔄 Drucke PDF Kopie {i + 1}/{copies}...")
-                
-                # 1. Сначала убеждаемся, что Adobe закрыт
-                self.force_kill_adobe()
-                time.sleep(0.5)
-                
-                # 2. Команда для печати с параметром /t (печать и закрыть файл, но не сам Adobe)
-                cmd = f'"{adobe_exe}" /t "{file_path}" "{printer_name}"'
-                print(f"Adobe Druck Befehl: {cmd}")
-                
-                # 3. Запускаем Adobe
-                try:
-                    # Скрытый запуск
-                    startupinfo = subprocess.STARTUPINFO()
-                    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                    startupinfo.wShowWindow = subprocess.SW_HIDE
-                    
-                    process = subprocess.Popen(
-                        cmd,
-                        shell=True,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        startupinfo=startupinfo,
-                        creationflags=subprocess.CREATE_NO_WINDOW
-                    )
-                    
-                    # Ждем немного чтобы Adobe успел открыть файл
-                    time.sleep(2)
-                    
-                    # 4. Ждем завершения процесса печати (не Adobe!)
-                    # Adobe Reader останется открытым, но файл будет закрыт
-                    timeout = 30  # Максимальное время ожидания в секундах
-                    start_time = time.time()
-                    
-                    while time.time() - start_time < timeout:
-                        # Проверяем, завершился ли процесс печати
-                        # Вместо этого проверяем, что Adobe запущен и окно существует
-                        time.sleep(0.5)
-                        
-                        # После 5 секунд принудительно закрываем Adobe
-                        if time.time() - start_time > 5:
-                            break
-                    
-                    # 5. Закрываем Adobe Reader принудительно
-                    self.force_kill_adobe()
-                    
-                    # 6. Небольшая пауза перед следующей копией
-                    if i < copies - 1:
-                        time.sleep(1)
-                        
-                except Exception as e:
-                    print(f"Fehler bei Kopie {i + 1}: {e}")
-                    self.force_kill_adobe()
-                    time.sleep(1)
-                    continue
-            
-            return True
-            
-        except Exception as e:
-            print(f"PDF Druckfehler: {e}")
-            return False
-    
-
-    
-    def print_with_windows(self, file_path, printer_name, copies):
-        """Печать через Windows ShellExecute"""
-        try:
-            original_printer = win32print.GetDefaultPrinter()
-            
-            if printer_name != original_printer:
-                try:
-                    win32print.SetDefaultPrinter(printer_name)
-                except:
-                    pass
-            
-            for i in range(copies):
-                if copies > 1:
-                    self.status_signal.emit(f"🔄 Windows-Druck Kopie {i + 1}/{copies}...")
-                
-                win32api.ShellExecute(
-                    0,
-                    "print",
-                    file_path,
-                    None,
-                    ".",
-                    0
+                imposed = summary['imposed']
+                print(f"Sammelbogen: {imposed['placements']} Motive auf {imposed['pages']} Bögen "
+                      f"in {imposed['files']} Aufträgen")
+            elif coalesce:
+                summary = run_coalesced(
+                    run,
+                    jobs,
+                    max_pages=self.coalesce.get('max_pages', MAX_PAGES),
+                    max_bytes=self.coalesce.get('max_mb', MAX_BYTES // (1024 * 1024)) * 1024 * 1024,
+                    on_job_start=self.set_current_file,
+                    on_job_state=on_job_state,
+                    status=self.status_signal.emit,
+                    controls=controls
                 )
-                
-                print(f"Windows Druck: {file_path} - Kopie {i + 1}")
-                
-                if i < copies - 1:
-                    time.sleep(1.5)
+                coalesced = summary['coalesced']
+                print(f"Sammelauftrag: {coalesced['jobs']} Dateien in {coalesced['files']} Aufträgen, "
+                      f"{coalesced['pages']} Seiten")
+            else:
+                summary = run(jobs, on_job_start=self.set_current_file, on_job_state=on_job_state)
             
-            if original_printer:
-                try:
-                    win32print.SetDefaultPrinter(original_printer)
-                except:
-                    pass
-                
-        except Exception as e:
-            print(f"Windows Druckfehler: {e}")
-            raise
-    
-    def find_adobe_reader(self):
-        """Находит Adobe Reader на компьютере"""
-        adobe_paths = [
-            r"C:\Program Files\Adobe\Acrobat Reader DC\Reader\AcroRd32.exe",
-            r"C:\Program Files (x86)\Adobe\Acrobat Reader DC\Reader\AcroRd32.exe",
-            r"C:\Program Files\Adobe\Acrobat Reader\Acrobat Reader.exe",
-            r"C:\Program Files (x86)\Adobe\Acrobat Reader\Acrobat Reader.exe",
-            r"C:\Program Files\Adobe\Acrobat Reader 2025\Acrobat Reader.exe",
-            r"C:\Program Files (x86)\Adobe\Acrobat Reader 2025\Acrobat Reader.exe",
-            r"C:\Program Files\Adobe\Acrobat Reader 2024\Acrobat Reader.exe",
-            r"C:\Program Files (x86)\Adobe\Acrobat Reader 2024\Acrobat Reader.exe",
-            r"C:\Program Files\Adobe\Acrobat Reader 2023\Acrobat Reader.exe",
-            r"C:\Program Files (x86)\Adobe\Acrobat Reader 2023\Acrobat Reader.exe",
-            r"C:\Program Files\Adobe\Acrobat Reader 2020\Acrobat Reader.exe",
-            r"C:\Program Files (x86)\Adobe\Acrobat Reader 2020\Acrobat Reader.exe",
-        ]
-        
-        for path in adobe_paths:
-            if os.path.exists(path):
-                return path
-        return None
-    
-    def force_kill_adobe(self):
-        """Принудительно закрывает все процессы Adobe Reader"""
-        try:
-            # Используем taskkill для надежного закрытия
-            subprocess.run(
-                "taskkill /F /IM AcroRd32.exe /T",
-                shell=True,
-                capture_output=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            for name, counters in summary.get('printers', {}).items():
+                print(f"Pool {name}: {counters['jobs']} Aufträge, {counters['pages']} Seiten, "
+                      f"{counters['pages_per_minute']} Seiten/min")
             
-            subprocess.run(
-                "taskkill /F /IM Acrobat.exe /T",
-                shell=True,
-                capture_output=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            self.status_signal.emit(f"✅ {summary['total']} Datei(en) gesendet an {summary['printer']}")
             
-            subprocess.run(
-                "taskkill /F /IM AcroDist.exe /T",
-                shell=True,
-                capture_output=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
+        finally:
+            # Неподтверждённые и упавшие задания остаются в очереди и в журнале
+            for key, record in records.items():
+                self.log_print(seen[key], record)
+            removed = self.print_queue.remove_many(completed)
+            # Отменённые пользователь уже убрал из очереди, приостановленные ждут продолжения
+            self.unconfirmed_count = sum(
+                1 for key, record in records.items()
+                if record['state'] != JOB_PAUSED and self.print_queue.get(seen[key].id) is not None
             )
-            
-            # Также ищем процессы с "Adobe" в имени
-            for proc in psutil.process_iter(['pid', 'name']):
-                try:
-                    proc_name = proc.info['name'].lower()
-                    if 'acro' in proc_name or 'adobe' in proc_name and 'reader' in proc_name:
-                        psutil.Process(proc.info['pid']).terminate()
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    pass
-                    
-        except Exception as e:
-            print(f"Fehler beim Beenden von Adobe: {e}")
+            self.jobs_removed_signal.emit([job.id for job in removed])
+            self.queue_updated_signal.emit(len(self.print_queue))
+            self.printing_done_signal.emit()
     
-    def log_print(self, printer_name, copies=None):
-        """Логирование печати"""
-        try:
-            log_file = Path("print_log.txt")
-            with open(log_file, 'a', encoding='utf-8') as f:
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                filename = os.path.basename(self.current_file) if self.current_file else "Unbekannt"
-                copy_count = copies if copies is not None else self.print_copies
-                f.write(f"{timestamp} | {filename} | {printer_name} | {copy_count} Kopien\n")
-        except:
-            pass
+    def set_current_file(self, file_path):
+        self.current_file = file_path
+    
+    def log_print(self, job, record):
+        """Запись о задании в журнал печати: id задания, время, страницы, копии и итог"""
+        entry = {
+            'job': job.id,
+            'time': record['time'],
+            'file': os.path.basename(job.path),
+            'path': job.path,
+            'printer': record.get('printer'),
+            'copies': job.copies,
+            'pages': record.get('pages'),
+            'state': record['state'],
+            'seconds': round(record['finished'] - record['started'], 3),
+        }
+        if 'spooled' in record:
+            entry['spool_seconds'] = round(record['spooled'] - record['started'], 3)
+        if 'error' in record:
+            entry['error'] = record['error']
+        if 'batch' in record:
+            # Задание в общем файле: где его страницы, чтобы найти их в стопке
+            entry['batch'] = record['batch']
+        self.print_log.log(entry)
     
     def reset_ui_after_print(self):
         """Сброс после печати"""
         self.current_file = None
+        self.preview_file = None
         self.preview_label.clear()
         self.set_preview_icon('.unknown')
-        self.btn_print.setEnabled(False)
-        self.btn_print.setText("🚀 DRUCKEN")
         self.printing_in_progress = False
-        self.status_label.setText("✅ Fertig. Neue Datei(en) wählen.")
+        self.on_queue_updated(len(self.print_queue))
+        if self.unconfirmed_count:
+            self.status_label.setText(
+                f"⚠️ {self.unconfirmed_count} Auftrag/Aufträge nicht bestätigt - bleiben in der Warteschlange"
+            )
+        else:
+            self.status_label.setText("✅ Fertig. Neue Datei(en) wählen.")
     
     def reset_ui(self):
-        """Ручной сброс"""
+        """Ручной сброс; идущая печать отменяется, кнопку печати вернёт on_printing_done"""
+        self.cancel_scheduled(job.id for job in self.print_queue.jobs())
         self.current_file = None
+        self.preview_file = None
         self.preview_label.clear()
         self.set_preview_icon('.unknown')
         self.btn_print.setEnabled(False)
-        self.btn_print.setText("🚀 DRUCKEN")
-        self.printing_in_progress = False
+        if not self.printing_in_progress:
+            self.btn_print.setText("🚀 DRUCKEN")
         self.print_queue.clear()
-        self.queue_list.clear()
+        self.queue_model.clear()
         self.status_label.setText("🔵 Bereit für neue Datei(en)")
 
 
 def main():
-    app = QApplication(sys.argv)
+    # Нужно для пула процессов растеризации в собранном PyInstaller EXE
+    multiprocessing.freeze_support()
+    
+    parser = argparse.ArgumentParser(description="AutoPrintTool")
+    parser.add_argument("--manifest", help="CSV/JSON-Manifest beim Start importieren")
+    args, qt_args = parser.parse_known_args()
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyle("Fusion")
     window = AutoPrintTool()
     window.show()
+    if args.manifest:
+        window.import_manifest_file(args.manifest)
     sys.exit(app.exec())
 
 
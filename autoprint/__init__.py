@@ -0,0 +1,3 @@
+"""Ядро AutoPrint: очередь и печать без привязки к Qt"""
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.bmp')
@@ -0,0 +1,10 @@
+"""python -m autoprint - консольный запуск без Qt"""
+import sys
+import multiprocessing
+
+from autoprint.cli import main
+
+if __name__ == "__main__":
+    # Нужно для пула процессов растеризации в собранном EXE
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,1070 @@
+"""Бэкенды печати: Win32 (Adobe/ShellExecute), CUPS, IPP, RAW-порт 9100 и файловый приёмник"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+import itertools
+import subprocess
+import importlib.util
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from autoprint import ipp, rawsocket
+from autoprint.viewer import ViewerSupervisor
+
+try:
+    import win32print
+    import win32api
+    import win32ui
+    import win32gui
+    import win32con
+    WIN32_AVAILABLE = True
+except ImportError:
+    WIN32_AVAILABLE = False
+
+# Pillow нужен только для вывода растра в DC принтера Windows, грузим его при печати
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+
+# Нормализованные состояния принтера
+PRINTER_READY = "ready"
+PRINTER_PAUSED = "paused"
+PRINTER_ERROR = "error"
+PRINTER_PRINTING = "printing"
+PRINTER_OFFLINE = "offline"
+
+# Состояния заданий в очереди спулера
+JOB_SPOOLING = "spooling"
+JOB_SPOOLED = "spooled"
+JOB_PRINTING = "printing"
+JOB_PRINTED = "printed"
+JOB_ERROR = "error"
+
+
+def copy_rounds(copies, max_copies):
+    """Копии по заданиям: до max_copies копий в задании делает драйвер, остальное - новые задания"""
+    max_copies = max(max_copies or 1, 1)
+    full, rest = divmod(copies, max_copies)
+    return [max_copies] * full + ([rest] if rest else [])
+
+
+class RasterJob:
+    """Одно задание спулера, в которое постранично пишутся растровые страницы"""
+    
+    def __init__(self, printer_name, title, dpi=None, color=None):
+        self.printer_name = printer_name
+        self.title = title
+        self.dpi = dpi
+        self.color = color
+        # Печатная область в пикселях (ширина, высота); None - неизвестна
+        self.printable = None
+        # Копий делает драйвер по DEVMODE/тикету; 1 - копии повторяются страницами в задании
+        self.copies = 1
+        self.pages = 0
+        self.job_ids = []
+    
+    def add_page(self, page):
+        raise NotImplementedError
+    
+    def close(self):
+        pass
+    
+    def abort(self):
+        pass
+
+
+def image_to_pdf(file_path):
+    """Картинка как PDF в памяти - для принтеров, которые принимают только PDF/PostScript"""
+    if not PIL_AVAILABLE:
+        raise RuntimeError("Pillow fehlt: Bilder können nicht als PDF gesendet werden")
+    from PIL import Image
+    buffer = io.BytesIO()
+    with Image.open(file_path) as image:
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(buffer, "PDF", resolution=300.0)
+    return buffer.getbuffer()
+
+
+class PrinterBackend:
+    """Базовый интерфейс: перечисление, запрос, отправка и опрос заданий"""
+    name = "base"
+    supports_raster = False
+    # submit() только ставит отправку в очередь: приём спулером виден позже через poll()
+    pipelined = False
+    
+    def list_printers(self):
+        """Возвращает список имён принтеров"""
+        raise NotImplementedError
+    
+    def default_printer(self):
+        """Имя принтера по умолчанию или None"""
+        return None
+    
+    def printer_info(self, printer_name):
+        """Статус и настройки принтера в виде словаря"""
+        return {
+            'name': printer_name,
+            'status': PRINTER_READY,
+            'status_code': 0,
+            'paper': None,
+            'orientation': None,
+            'dpi': None,
+            'color': None,
+        }
+    
+    def printer_capabilities(self, printer_name):
+        """Что умеет драйвер: цвет, дуплекс, copies - больше всего копий в одном задании,
+        collate - разбирает ли копии по экземплярам; пустой словарь - неизвестно"""
+        return {}
+    
+    def submit(self, file_path, printer_name, copies=1, status_callback=None):
+        """Отправляет файл на печать, возвращает список id заданий спулера"""
+        raise NotImplementedError
+    
+    def open_raster_job(self, printer_name, title, info=None, copies=1):
+        """Открывает RasterJob; info - закэшированный printer_info, чтобы не спрашивать спулер
+        
+        copies - копии, которые должен сделать драйвер; сколько он взял, покажет job.copies.
+        """
+        raise NotImplementedError
+    
+    def poll(self, printer_name):
+        """Активные задания принтера: список словарей id/document/state (и error, если известна)"""
+        return []
+    
+    def close(self):
+        pass
+    
+    def _status(self, status_callback, message):
+        if status_callback:
+            status_callback(message)
+
+
+class Win32Backend(PrinterBackend):
+    """Печать через спулер Windows: Adobe Reader для PDF, ShellExecute для остального"""
+    name = "win32"
+    
+    STATUS_CODES = {
+        0: PRINTER_READY,
+        1: PRINTER_PAUSED,
+        2: PRINTER_ERROR,
+        4: PRINTER_PRINTING,
+        5: PRINTER_OFFLINE,
+    }
+    
+    PAPER_SIZES = {
+        1: "Letter",
+        5: "Legal",
+        8: "A3",
+        9: "A4",
+        11: "A5",
+        80: "Custom",
+    }
+    
+    ADOBE_PATHS = [
+        r"C:\Program Files\Adobe\Acrobat Reader DC\Reader\AcroRd32.exe",
+        r"C:\Program Files (x86)\Adobe\Acrobat Reader DC\Reader\AcroRd32.exe",
+        r"C:\Program Files\Adobe\Acrobat Reader\Acrobat Reader.exe",
+        r"C:\Program Files (x86)\Adobe\Acrobat Reader\Acrobat Reader.exe",
+        r"C:\Program Files\Adobe\Acrobat Reader 2025\Acrobat Reader.exe",
+        r"C:\Program Files (x86)\Adobe\Acrobat Reader 2025\Acrobat Reader.exe",
+        r"C:\Program Files\Adobe\Acrobat Reader 2024\Acrobat Reader.exe",
+        r"C:\Program Files (x86)\Adobe\Acrobat Reader 2024\Acrobat Reader.exe",
+        r"C:\Program Files\Adobe\Acrobat Reader 2023\Acrobat Reader.exe",
+        r"C:\Program Files (x86)\Adobe\Acrobat Reader 2023\Acrobat Reader.exe",
+        r"C:\Program Files\Adobe\Acrobat Reader 2020\Acrobat Reader.exe",
+        r"C:\Program Files (x86)\Adobe\Acrobat Reader 2020\Acrobat Reader.exe",
+    ]
+    
+    supports_raster = PIL_AVAILABLE
+    
+    def __init__(self):
+        if not WIN32_AVAILABLE:
+            raise RuntimeError("pywin32 ist nicht installiert")
+        from autoprint.tracking import JobTracker
+        # Adobe и ShellExecute не возвращают id задания - ждём его появления в спулере
+        self.tracker = JobTracker(self)
+        # Один экземпляр Adobe на все задания: запускается при первой печати PDF;
+        # печать через него идёт по одному заданию, как и смена Standarddrucker
+        self._viewer = None
+        self._viewer_lock = threading.Lock()
+        self._default_printer_lock = threading.Lock()
+    
+    def list_printers(self):
+        printers = win32print.EnumPrinters(
+            win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS
+        )
+        return [printer[2] for printer in printers]
+    
+    def default_printer(self):
+        try:
+            return win32print.GetDefaultPrinter()
+        except Exception:
+            return None
+    
+    def printer_info(self, printer_name):
+        handle = win32print.OpenPrinter(printer_name)
+        try:
+            printer_info = win32print.GetPrinter(handle, 2)
+        finally:
+            win32print.ClosePrinter(handle)
+        
+        info = PrinterBackend.printer_info(self, printer_name)
+        status = printer_info['Status']
+        info['status_code'] = status
+        info['status'] = self.STATUS_CODES.get(status)
+        
+        devmode = printer_info.get('pDevMode')
+        if devmode:
+            if hasattr(devmode, 'PaperSize'):
+                info['paper'] = self.PAPER_SIZES.get(devmode.PaperSize, f"Size {devmode.PaperSize}")
+            if hasattr(devmode, 'Orientation'):
+                # DMORIENT_PORTRAIT = 1, DMORIENT_LANDSCAPE = 2
+                info['orientation'] = "portrait" if devmode.Orientation == 1 else "landscape"
+            if hasattr(devmode, 'PrintQuality') and devmode.PrintQuality > 0:
+                info['dpi'] = devmode.PrintQuality
+            if hasattr(devmode, 'Color'):
+                info['color'] = devmode.Color == 2
+        return info
+    
+    def printer_capabilities(self, printer_name):
+        handle = win32print.OpenPrinter(printer_name)
+        try:
+            port = win32print.GetPrinter(handle, 2)['pPortName']
+        finally:
+            win32print.ClosePrinter(handle)
+        copies = win32print.DeviceCapabilities(printer_name, port, win32con.DC_COPIES)
+        return {
+            'color_device': win32print.DeviceCapabilities(printer_name, port, win32con.DC_COLORDEVICE) == 1,
+            'duplex': win32print.DeviceCapabilities(printer_name, port, win32con.DC_DUPLEX) == 1,
+            # DC_COPIES - сколько копий драйвер делает сам по dmCopies; -1/0 - не умеет
+            'copies': max(copies, 1),
+            'collate': win32print.DeviceCapabilities(printer_name, port, win32con.DC_COLLATE) == 1,
+        }
+    
+    def submit(self, file_path, printer_name, copies=1, status_callback=None):
+        if Path(file_path).suffix.lower() == '.pdf':
+            job_ids = self.print_pdf_adobe_simple(file_path, printer_name, copies, status_callback)
+            if job_ids is not None:
+                return job_ids
+            self._status(status_callback, "⚠️ Adobe nicht verfügbar, verwende Windows-Druck...")
+        return self.print_with_windows(file_path, printer_name, copies, status_callback)
+    
+    def open_raster_job(self, printer_name, title, info=None, copies=1):
+        if info is None:
+            try:
+                info = self.printer_info(printer_name)
+            except Exception:
+                info = {}
+        return Win32RasterJob(printer_name, title, info.get('color'), copies)
+    
+    def poll(self, printer_name):
+        handle = win32print.OpenPrinter(printer_name)
+        try:
+            jobs = win32print.EnumJobs(handle, 0, -1, 1)
+        finally:
+            win32print.ClosePrinter(handle)
+        
+        result = []
+        for job in jobs:
+            status = job.get('Status', 0)
+            if status & win32print.JOB_STATUS_ERROR:
+                state = JOB_ERROR
+            elif status & win32print.JOB_STATUS_PRINTED:
+                state = JOB_PRINTED
+            elif status & win32print.JOB_STATUS_PRINTING:
+                state = JOB_PRINTING
+            elif status & win32print.JOB_STATUS_SPOOLING:
+                state = JOB_SPOOLING
+            else:
+                state = JOB_SPOOLED
+            result.append({
+                'id': job['JobId'],
+                'document': job.get('pDocument'),
+                'state': state,
+                'pages': job.get('TotalPages', 0),
+            })
+        return result
+    
+    def wait_for_spooled(self, printer_name, file_path):
+        """Ждёт, пока документ допишется в спулер; возвращает id задания или None"""
+        job = self.tracker.track(printer_name, [], os.path.basename(file_path))[0]
+        if self.tracker.wait([job], until=JOB_SPOOLED):
+            return job.job_id
+        print(f"Auftrag nicht im Spooler bestätigt: {file_path}")
+        return None
+    
+    def print_pdf_adobe_simple(self, file_path, printer_name, copies, status_callback=None):
+        """Печать PDF через резидентный Adobe Reader; None, если Adobe нет"""
+        try:
+            viewer = self.adobe_viewer()
+            if viewer is None:
+                return None
+            return self._print_adobe_copies(viewer, file_path, printer_name, copies, status_callback)
+        
+        except Exception as e:
+            print(f"PDF Druckfehler: {e}")
+            return None
+    
+    def adobe_viewer(self):
+        """ViewerSupervisor для Adobe Reader; создаётся один раз, None - Adobe не установлен"""
+        with self._viewer_lock:
+            if self._viewer is None:
+                adobe_exe = self.find_adobe_reader()
+                if not adobe_exe:
+                    return None
+                print(f"Verwende Adobe Reader: {adobe_exe}")
+                self._viewer = ViewerSupervisor(adobe_exe)
+            return self._viewer
+    
+    def _print_adobe_copies(self, viewer, file_path, printer_name, copies, status_callback):
+        job_ids = []
+        for i in range(copies):
+            if copies > 1:
+                self._status(status_callback, f"🔄 Drucke PDF Kopie {i + 1}/{copies}...")
+            try:
+                # /t отдаёт файл запущенному Adobe; ждём, пока задание допишется в спулер
+                job_id = viewer.print_file(
+                    file_path, printer_name, lambda: self.wait_for_spooled(printer_name, file_path)
+                )
+            except Exception as e:
+                print(f"Fehler bei Kopie {i + 1}: {e}")
+                continue
+            if job_id is not None:
+                job_ids.append(job_id)
+        
+        return job_ids
+    
+    def print_with_windows(self, file_path, printer_name, copies, status_callback=None):
+        """Печать через Windows ShellExecute"""
+        job_ids = []
+        try:
+            for i in range(copies):
+                if copies > 1:
+                    self._status(status_callback, f"🔄 Windows-Druck Kopie {i + 1}/{copies}...")
+                
+                job_id = self.shell_print(file_path, printer_name)
+                print(f"Windows Druck: {file_path} - Kopie {i + 1}")
+                if job_id is not None:
+                    job_ids.append(job_id)
+            
+            return job_ids
+        
+        except Exception as e:
+            print(f"Windows Druckfehler: {e}")
+            raise
+    
+    def shell_print(self, file_path, printer_name):
+        """Одна копия через программу просмотра; возвращает id задания спулера или None"""
+        try:
+            # "printto" получает принтер аргументом - Standarddrucker не трогаем,
+            # и потоки пула печатают на свои принтеры параллельно
+            win32api.ShellExecute(0, "printto", file_path, f'"{printer_name}"', ".", 0)
+            # Программа просмотра печатает асинхронно - ждём задание в спулере
+            return self.wait_for_spooled(printer_name, file_path)
+        except win32api.error as e:
+            print(f"'printto' nicht verfügbar ({e}), verwende Standarddrucker")
+        
+        # Без обработчика printto: переключаем Standarddrucker, пока задание не в спулере
+        with self._default_printer_lock:
+            original_printer = win32print.GetDefaultPrinter()
+            if printer_name != original_printer:
+                try:
+                    win32print.SetDefaultPrinter(printer_name)
+                except:
+                    pass
+            try:
+                win32api.ShellExecute(0, "print", file_path, None, ".", 0)
+                return self.wait_for_spooled(printer_name, file_path)
+            finally:
+                if original_printer and printer_name != original_printer:
+                    try:
+                        win32print.SetDefaultPrinter(original_printer)
+                    except:
+                        pass
+    
+    def find_adobe_reader(self):
+        """Находит Adobe Reader на компьютере"""
+        for path in self.ADOBE_PATHS:
+            if os.path.exists(path):
+                return path
+        return None
+    
+    def close(self):
+        # Завершается только свой экземпляр Adobe, открытые пользователем окна остаются
+        if self._viewer is not None:
+            self._viewer.close()
+
+
+class Win32RasterJob(RasterJob):
+    """Растровое задание через DC принтера: StartDoc, страница на StartPage/EndPage"""
+    
+    def __init__(self, printer_name, title, color=None, copies=1):
+        hdc, driver_copies = self._create_dc(printer_name, copies)
+        self.hdc = win32ui.CreateDCFromHandle(hdc)
+        # Родное разрешение и печатная область берутся у драйвера
+        dpi = self.hdc.GetDeviceCaps(win32con.LOGPIXELSX)
+        RasterJob.__init__(self, printer_name, title, dpi, color)
+        self.copies = driver_copies
+        self.printable = (
+            self.hdc.GetDeviceCaps(win32con.HORZRES),
+            self.hdc.GetDeviceCaps(win32con.VERTRES)
+        )
+        self.hdc.StartDoc(title)
+        self._last_page = None
+        self._dib = None
+    
+    @staticmethod
+    def _create_dc(printer_name, copies):
+        """DC с DEVMODE принтера; при copies > 1 копии с разбором ставятся в DEVMODE - их делает драйвер
+        
+        Возвращает (hdc, копий у драйвера): если драйвер урезал dmCopies, копии остаются нам.
+        """
+        handle = win32print.OpenPrinter(printer_name)
+        try:
+            devmode = win32print.GetPrinter(handle, 2)['pDevMode']
+            driver_copies = 1
+            if devmode is not None and copies > 1:
+                devmode.Copies = copies
+                devmode.Collate = win32con.DMCOLLATE_TRUE
+                devmode.Fields |= win32con.DM_COPIES | win32con.DM_COLLATE
+                win32print.DocumentProperties(
+                    0, handle, printer_name, devmode, devmode, win32con.DM_IN_BUFFER | win32con.DM_OUT_BUFFER
+                )
+                if devmode.Copies == copies:
+                    driver_copies = copies
+                else:
+                    devmode.Copies = 1
+        finally:
+            win32print.ClosePrinter(handle)
+        return win32gui.CreateDC("WINSPOOL", printer_name, devmode), driver_copies
+    
+    def add_page(self, page):
+        from PIL import Image, ImageWin
+        if page is not self._last_page:
+            mode = "L" if page.channels == 1 else "RGB"
+            image = Image.frombuffer(mode, (page.width, page.height), page.samples, "raw", mode, 0, 1)
+            # Копии одной страницы рисуются из того же DIB, без повторной конвертации
+            self._dib = ImageWin.Dib(image)
+            self._last_page = page
+        
+        # Вписываем страницу в печатную область с сохранением пропорций
+        area_width, area_height = self.printable
+        scale = min(area_width / page.width, area_height / page.height)
+        width, height = int(page.width * scale), int(page.height * scale)
+        x, y = (area_width - width) // 2, (area_height - height) // 2
+        
+        self.hdc.StartPage()
+        self._dib.draw(self.hdc.GetHandleOutput(), (x, y, x + width, y + height))
+        self.hdc.EndPage()
+        self.pages += 1
+    
+    def close(self):
+        self.hdc.EndDoc()
+        self.hdc.DeleteDC()
+    
+    def abort(self):
+        try:
+            self.hdc.AbortDoc()
+            self.hdc.DeleteDC()
+        except Exception as e:
+            print(f"Fehler beim Abbrechen des Druckauftrags: {e}")
+
+
+class CupsBackend(PrinterBackend):
+    """Печать через CUPS утилиты lp/lpstat/lpoptions"""
+    name = "cups"
+    # MaxCopies cupsd по умолчанию
+    MAX_COPIES = 9999
+    
+    def __init__(self, lp="lp", lpstat="lpstat", lpoptions="lpoptions"):
+        self.lp = lp
+        self.lpstat = lpstat
+        self.lpoptions = lpoptions
+        if not shutil.which(self.lp):
+            raise RuntimeError("CUPS 'lp' wurde nicht gefunden")
+    
+    def _run(self, *args):
+        result = subprocess.run(
+            list(args),
+            capture_output=True,
+            text=True,
+            env=dict(os.environ, LC_ALL="C")
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"{args[0]} Fehler {result.returncode}")
+        return result.stdout
+    
+    def list_printers(self):
+        printers = []
+        for line in self._run(self.lpstat, "-p").splitlines():
+            if line.startswith("printer "):
+                printers.append(line.split()[1])
+        return printers
+    
+    def default_printer(self):
+        try:
+            output = self._run(self.lpstat, "-d")
+        except RuntimeError:
+            return None
+        if ":" in output:
+            name = output.split(":", 1)[1].strip()
+            return name or None
+        return None
+    
+    def printer_info(self, printer_name):
+        info = PrinterBackend.printer_info(self, printer_name)
+        output = self._run(self.lpstat, "-p", printer_name)
+        if "disabled" in output:
+            info['status'] = PRINTER_PAUSED
+        elif "now printing" in output:
+            info['status'] = PRINTER_PRINTING
+        
+        try:
+            options = self._parse_options(self._run(self.lpoptions, "-p", printer_name, "-l"))
+        except RuntimeError:
+            options = {}
+        info['paper'] = options.get('PageSize') or options.get('media')
+        orientation = options.get('orientation-requested')
+        if orientation:
+            info['orientation'] = "landscape" if orientation in ("4", "5") else "portrait"
+        resolution = options.get('Resolution', '')
+        digits = "".join(itertools.takewhile(str.isdigit, resolution))
+        if digits:
+            info['dpi'] = int(digits)
+        color_model = options.get('ColorModel')
+        if color_model:
+            info['color'] = color_model.lower() not in ("gray", "grayscale", "black")
+        return info
+    
+    def printer_capabilities(self, printer_name):
+        try:
+            output = self._run(self.lpoptions, "-p", printer_name, "-l")
+        except RuntimeError:
+            return {}
+        # Копии с разбором делает сам CUPS (lp -n, collate=true), до MaxCopies сервера
+        capabilities = {'copies': self.MAX_COPIES, 'collate': True}
+        for line in output.splitlines():
+            if ":" not in line:
+                continue
+            key, values = line.split(":", 1)
+            key = key.split("/", 1)[0].strip()
+            values = [value.lstrip("*").lower() for value in values.split()]
+            if key == 'ColorModel':
+                capabilities['color_device'] = any(v not in ("gray", "grayscale", "black") for v in values)
+            elif key == 'Duplex':
+                capabilities['duplex'] = any(v != "none" for v in values)
+        return capabilities
+    
+    def _parse_options(self, output):
+        """Разбирает 'lpoptions -l': значение по умолчанию помечено '*'"""
+        options = {}
+        for line in output.splitlines():
+            if ":" not in line:
+                continue
+            key, values = line.split(":", 1)
+            key = key.split("/", 1)[0].strip()
+            for value in values.split():
+                if value.startswith("*"):
+                    options[key] = value[1:]
+                    break
+        return options
+    
+    def submit(self, file_path, printer_name, copies=1, status_callback=None):
+        options = ["-o", "collate=true"] if copies > 1 else []
+        output = self._run(
+            self.lp, "-d", printer_name, "-n", str(copies), *options,
+            "-t", os.path.basename(file_path), file_path
+        )
+        # "request id is Printer-42 (1 file(s))"
+        job_ids = []
+        for word in output.split():
+            if word.startswith(printer_name + "-"):
+                job_ids.append(word)
+        return job_ids
+    
+    def poll(self, printer_name):
+        jobs = []
+        output = self._run(self.lpstat, "-W", "not-completed", "-o", printer_name)
+        for index, line in enumerate(output.splitlines()):
+            parts = line.split()
+            if not parts:
+                continue
+            jobs.append({
+                'id': parts[0],
+                'document': None,
+                'state': JOB_PRINTING if index == 0 else JOB_SPOOLED,
+                'pages': 0,
+            })
+        return jobs
+
+
+class FileSinkRasterJob(RasterJob):
+    """Пишет страницы в PPM-файлы; метаданные задания добавляются при close()"""
+    
+    def __init__(self, backend, printer_name, title, copies=1):
+        RasterJob.__init__(self, printer_name, title, dpi=300, color=True)
+        # A4 при 300 dpi
+        self.printable = (2480, 3508)
+        self.copies = copies if copies <= backend.max_copies else 1
+        self.backend = backend
+        self.spool_dir = backend.directory / printer_name
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.job_id = backend._next_job_id(printer_name)
+        self.bytes = 0
+        self.submitted_at = datetime.now().isoformat()
+        self.started = time.perf_counter()
+    
+    def add_page(self, page):
+        kind = b"P5" if page.channels == 1 else b"P6"
+        payload = self.spool_dir / f"{self.job_id}_{self.title}.p{self.pages + 1:04d}.ppm"
+        with open(payload, 'wb') as f:
+            f.write(kind + b" %d %d 255\n" % (page.width, page.height))
+            f.write(page.samples)
+        self.bytes += payload.stat().st_size
+        self.pages += 1
+    
+    def close(self):
+        self.backend._record_job(self.spool_dir, {
+            'job_id': self.job_id,
+            'printer': self.printer_name,
+            'source': self.title,
+            'payload': f"{self.job_id}_{self.title}.p*.ppm",
+            'bytes': self.bytes,
+            'pages': self.pages,
+            'copies': self.copies,
+            'dpi': self.dpi,
+            'submitted_at': self.submitted_at,
+            'spool_seconds': round(time.perf_counter() - self.started, 6),
+        }, self.title)
+        self.job_ids = [self.job_id]
+    
+    def abort(self):
+        for payload in self.spool_dir.glob(f"{self.job_id}_*"):
+            payload.unlink()
+
+
+class FileSinkBackend(PrinterBackend):
+    """Пишет задания в папку вместо принтера; для тестов и замеров без железа"""
+    name = "file"
+    supports_raster = True
+    
+    def __init__(self, directory=None, printers=None, print_seconds=0.0, max_copies=999):
+        if directory is None:
+            directory = os.environ.get(
+                "AUTOPRINT_SINK_DIR",
+                os.path.join(tempfile.gettempdir(), "autoprint_sink")
+            )
+        self.directory = Path(directory)
+        self.printers = list(printers) if printers else ["FileSink"]
+        # Симуляция: print_seconds на страницу, каждый принтер печатает задания по одному
+        self.print_seconds = print_seconds
+        # Сколько копий «драйвер» делает в одном задании; 1 - как принтер без своих копий
+        self.max_copies = max_copies
+        self._busy_until = {}
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        # Префикс сессии, чтобы id не совпадали между запусками
+        self._session = datetime.now().strftime("%Y%m%d%H%M%S")
+    
+    def list_printers(self):
+        return list(self.printers)
+    
+    def default_printer(self):
+        return self.printers[0] if self.printers else None
+    
+    def printer_info(self, printer_name):
+        info = PrinterBackend.printer_info(self, printer_name)
+        info['paper'] = "A4"
+        info['orientation'] = "portrait"
+        info['dpi'] = 300
+        info['color'] = True
+        return info
+    
+    def printer_capabilities(self, printer_name):
+        return {'color_device': True, 'duplex': False, 'copies': self.max_copies, 'collate': True}
+    
+    def submit(self, file_path, printer_name, copies=1, status_callback=None):
+        if printer_name not in self.printers:
+            raise RuntimeError(f"Unbekannter Drucker: {printer_name}")
+        
+        spool_dir = self.directory / printer_name
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Файл спулится один раз на max_copies копий, остальные копии делает «принтер»
+        rounds = copy_rounds(copies, self.max_copies)
+        job_ids = []
+        for i, round_copies in enumerate(rounds):
+            if len(rounds) > 1:
+                self._status(status_callback, f"🔄 Spool Auftrag {i + 1}/{len(rounds)}...")
+            job_ids.append(self._write_payload(spool_dir, file_path, printer_name, round_copies))
+        return job_ids
+    
+    def open_raster_job(self, printer_name, title, info=None, copies=1):
+        if printer_name not in self.printers:
+            raise RuntimeError(f"Unbekannter Drucker: {printer_name}")
+        return FileSinkRasterJob(self, printer_name, title, copies)
+    
+    def _next_job_id(self, printer_name):
+        return f"{printer_name}-{self._session}-{next(self._counter)}"
+    
+    def _write_payload(self, spool_dir, file_path, printer_name, copies):
+        """Копирует файл в папку спула и пишет рядом метаданные с таймингами"""
+        job_id = self._next_job_id(printer_name)
+        payload = spool_dir / f"{job_id}_{os.path.basename(file_path)}"
+        
+        started = time.perf_counter()
+        submitted_at = datetime.now().isoformat()
+        shutil.copyfile(file_path, payload)
+        spool_seconds = time.perf_counter() - started
+        
+        self._record_job(spool_dir, {
+            'job_id': job_id,
+            'printer': printer_name,
+            'source': str(file_path),
+            'payload': payload.name,
+            'bytes': payload.stat().st_size,
+            'copies': copies,
+            'submitted_at': submitted_at,
+            'spool_seconds': round(spool_seconds, 6),
+        }, os.path.basename(file_path))
+        return job_id
+    
+    def _record_job(self, spool_dir, meta, document):
+        """Дописывает метаданные в jobs.jsonl и ставит задание в симулируемую очередь"""
+        with self._lock:
+            with open(spool_dir / "jobs.jsonl", 'a', encoding='utf-8') as f:
+                f.write(json.dumps(meta, ensure_ascii=False) + "\n")
+            printer = meta['printer']
+            started_at = max(time.monotonic(), self._busy_until.get(printer, 0.0))
+            done_at = started_at + self.print_seconds * meta.get('pages', 1) * meta.get('copies', 1)
+            self._busy_until[printer] = done_at
+            self._jobs[meta['job_id']] = {
+                'id': meta['job_id'],
+                'printer': printer,
+                'document': document,
+                'pages': meta.get('pages', 1),
+                'started_at': started_at,
+                'done_at': done_at,
+            }
+    
+    def poll(self, printer_name):
+        now = time.monotonic()
+        jobs = []
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job['printer'] != printer_name:
+                    continue
+                if job['done_at'] <= now:
+                    # Напечатанное задание исчезает из очереди, как в настоящем спулере
+                    del self._jobs[job_id]
+                    continue
+                jobs.append({
+                    'id': job_id,
+                    'document': job['document'],
+                    'state': JOB_PRINTING if job['started_at'] <= now else JOB_SPOOLED,
+                    'pages': job['pages'],
+                })
+        return jobs
+
+
+class RawSocketBackend(PrinterBackend):
+    """Печать прямо в порт 9100 принтера: файл уходит в сокет без Adobe, драйвера и спулера"""
+    name = "raw"
+    
+    def __init__(self, printers=None, copies_mode=None, pjl=True, pool_size=2, timeout=30.0):
+        if printers is None:
+            printers = os.environ.get("AUTOPRINT_RAW_PRINTERS", "")
+        self.addresses = rawsocket.parse_printers(printers)
+        if not self.addresses:
+            raise RuntimeError("Keine RAW-Drucker angegeben (AUTOPRINT_RAW_PRINTERS=Name=Host[:Port])")
+        # pjl - копии делает принтер по @PJL SET QTY, resend - файл шлётся copies раз
+        self.copies_mode = copies_mode or os.environ.get("AUTOPRINT_RAW_COPIES", "pjl")
+        if self.copies_mode not in ("pjl", "resend"):
+            raise ValueError(f"Unbekannter Kopienmodus: {self.copies_mode}")
+        # Без PJL границу задания принтер видит только по закрытию соединения
+        self.pjl = pjl
+        self._pools = {
+            name: rawsocket.ConnectionPool(host, port, size=pool_size, timeout=timeout)
+            for name, (host, port) in self.addresses.items()
+        }
+        self._counter = itertools.count(1)
+        self._session = datetime.now().strftime("%Y%m%d%H%M%S")
+    
+    def printer_capabilities(self, printer_name):
+        driver_copies = self.pjl and self.copies_mode == "pjl"
+        return {'copies': rawsocket.PJL_MAX_COPIES if driver_copies else 1, 'collate': True}
+    
+    def list_printers(self):
+        return list(self.addresses)
+    
+    def default_printer(self):
+        return next(iter(self.addresses), None)
+    
+    def printer_info(self, printer_name):
+        info = PrinterBackend.printer_info(self, printer_name)
+        # Обратного канала нет: знаем только, принимает ли принтер соединения
+        if not self._pool(printer_name).check():
+            info['status'] = PRINTER_OFFLINE
+        return info
+    
+    def _pool(self, printer_name):
+        pool = self._pools.get(printer_name)
+        if pool is None:
+            raise RuntimeError(f"Unbekannter Drucker: {printer_name}")
+        return pool
+    
+    def submit(self, file_path, printer_name, copies=1, status_callback=None):
+        pool = self._pool(printer_name)
+        language = rawsocket.pjl_language(file_path)
+        payload = file_path
+        if language is None:
+            # Картинки принтер сам не разбирает: Pillow упаковывает их в PDF в памяти
+            payload = image_to_pdf(file_path)
+            language = "PDF"
+        
+        rounds = copy_rounds(copies, self.printer_capabilities(printer_name)['copies'])
+        
+        job_ids = []
+        for i, round_copies in enumerate(rounds):
+            if len(rounds) > 1:
+                self._status(status_callback, f"🔄 Sende Kopie {i + 1}/{len(rounds)}...")
+            job_id = f"{printer_name}-{self._session}-{next(self._counter)}"
+            if self.pjl:
+                parts = (rawsocket.pjl_header(job_id, language, round_copies), payload,
+                         rawsocket.pjl_trailer(job_id))
+            else:
+                parts = (payload,)
+            try:
+                pool.send(parts, reuse=self.pjl)
+            except OSError as e:
+                raise RuntimeError(f"RAW-Druck an {printer_name} fehlgeschlagen: {e}")
+            job_ids.append(job_id)
+        # Принтер не сообщает о заданиях: poll() пуст, и трекер считает принятое напечатанным
+        return job_ids
+    
+    def close(self):
+        for pool in self._pools.values():
+            pool.close()
+
+
+class IppBackend(PrinterBackend):
+    """Печать по IPP: Print-Job с копиями, статус из Get-Jobs/Get-Printer-Attributes, отправка в фоне"""
+    name = "ipp"
+    pipelined = True
+    
+    # printer-state -> нормализованное состояние
+    PRINTER_STATES = {
+        ipp.PRINTER_IDLE: PRINTER_READY,
+        ipp.PRINTER_PROCESSING: PRINTER_PRINTING,
+        ipp.PRINTER_STOPPED: PRINTER_PAUSED,
+    }
+    # job-state -> состояние задания спулера
+    JOB_STATES = {
+        ipp.JOB_PENDING: JOB_SPOOLED,
+        ipp.JOB_HELD: JOB_SPOOLED,
+        ipp.JOB_PROCESSING: JOB_PRINTING,
+        ipp.JOB_STOPPED: JOB_PRINTING,
+        ipp.JOB_CANCELED: JOB_ERROR,
+        ipp.JOB_ABORTED: JOB_ERROR,
+        ipp.JOB_COMPLETED: JOB_PRINTED,
+    }
+    
+    def __init__(self, printers=None, max_in_flight=1, create_job=False, timeout=60.0):
+        if printers is None:
+            printers = os.environ.get("AUTOPRINT_IPP_PRINTERS", "")
+        self.uris = ipp.parse_printers(printers)
+        if not self.uris:
+            raise RuntimeError("Keine IPP-Drucker angegeben (AUTOPRINT_IPP_PRINTERS=Name=ipp://Host/ipp/print)")
+        # Create-Job + Send-Document вместо Print-Job: для серверов, где задание создаётся отдельно
+        self.create_job = create_job
+        # Соединений на одно больше, чем отправок: опрос статуса не ждёт, пока уйдёт большой файл
+        self._clients = {
+            name: ipp.IppClient(uri, connections=max_in_flight + 1, timeout=timeout)
+            for name, uri in self.uris.items()
+        }
+        # Отправка в фоне; одна отправка на принтер сохраняет порядок заданий,
+        # при max_in_flight > 1 задания уходят параллельно и принтер может получить их не по порядку
+        self._executors = {
+            name: ThreadPoolExecutor(max_in_flight, thread_name_prefix=f"ipp-{name}")
+            for name in self.uris
+        }
+        self._formats = {}
+        self._collate = {}
+        self._uploads = {}  # локальный id -> {'printer', 'document', 'ipp_id', 'error'}
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        self._session = datetime.now().strftime("%Y%m%d%H%M%S")
+    
+    def list_printers(self):
+        return list(self.uris)
+    
+    def default_printer(self):
+        return next(iter(self.uris), None)
+    
+    def _client(self, printer_name):
+        client = self._clients.get(printer_name)
+        if client is None:
+            raise RuntimeError(f"Unbekannter Drucker: {printer_name}")
+        return client
+    
+    def printer_info(self, printer_name):
+        info = PrinterBackend.printer_info(self, printer_name)
+        try:
+            attributes = self._client(printer_name).get_printer_attributes()
+        except (OSError, ipp.IppError, ValueError):
+            info['status'] = PRINTER_OFFLINE
+            return info
+        state = ipp.first(attributes, "printer-state")
+        info['status'] = self.PRINTER_STATES.get(state, PRINTER_ERROR)
+        info['status_code'] = state
+        info['paper'] = ipp.first(attributes, "media-default")
+        orientation = ipp.first(attributes, "orientation-requested-default")
+        if orientation:
+            info['orientation'] = "landscape" if orientation in (4, 5) else "portrait"
+        resolution = ipp.first(attributes, "printer-resolution-default")
+        if isinstance(resolution, tuple):
+            info['dpi'] = resolution[0]
+        color = ipp.first(attributes, "color-supported")
+        if color is not None:
+            info['color'] = bool(color) and ipp.first(attributes, "print-color-mode-default") != "monochrome"
+        self._formats[printer_name] = attributes.get("document-format-supported") or []
+        return info
+    
+    def printer_capabilities(self, printer_name):
+        try:
+            attributes = self._client(printer_name).get_printer_attributes([
+                "color-supported", "sides-supported", "copies-supported", "multiple-document-handling-supported",
+            ])
+        except (OSError, ipp.IppError, ValueError):
+            return {}
+        copies = ipp.first(attributes, "copies-supported")
+        collate = ipp.COLLATED_COPIES in attributes.get("multiple-document-handling-supported", [])
+        self._collate[printer_name] = collate
+        return {
+            'color_device': bool(ipp.first(attributes, "color-supported", False)),
+            'duplex': any(side != "one-sided" for side in attributes.get("sides-supported", [])),
+            # copies-supported - диапазон (1, максимум); без него принтер копий в тикете не знает
+            'copies': copies[1] if isinstance(copies, tuple) else 1,
+            'collate': collate,
+        }
+    
+    def submit(self, file_path, printer_name, copies=1, status_callback=None):
+        """Ставит документ в отправку и сразу возвращает локальный id; состояние покажет poll()"""
+        client = self._client(printer_name)
+        format = ipp.document_format(file_path)
+        document = file_path
+        supported = self._formats.get(printer_name)
+        if supported and format not in supported and ipp.OCTET_STREAM not in supported:
+            if not format.startswith("image/") or "application/pdf" not in supported:
+                raise RuntimeError(f"{printer_name} unterstützt {format} nicht")
+            # Картинку принтер не примет: Pillow упаковывает её в PDF в памяти
+            document = image_to_pdf(file_path)
+            format = "application/pdf"
+        
+        job_id = f"{printer_name}-{self._session}-{next(self._counter)}"
+        upload = {'printer': printer_name, 'document': os.path.basename(file_path), 'ipp_id': None, 'error': None}
+        with self._lock:
+            self._uploads[job_id] = upload
+        collate = self._collate.get(printer_name, False)
+        self._executors[printer_name].submit(self._upload, client, upload, document, copies, format, collate)
+        return [job_id]
+    
+    def _upload(self, client, upload, document, copies, format, collate=False):
+        try:
+            if self.create_job:
+                ipp_id = client.create_job(copies, upload['document'], collate)
+                client.send_document(ipp_id, document, format)
+            else:
+                ipp_id = client.print_job(document, copies, upload['document'], format, collate)
+            upload['ipp_id'] = ipp_id
+        except Exception as e:
+            upload['error'] = str(e)
+            print(f"IPP-Druck an {upload['printer']} fehlgeschlagen: {e}")
+    
+    def poll(self, printer_name):
+        with self._lock:
+            ours = [(job_id, upload) for job_id, upload in self._uploads.items()
+                    if upload['printer'] == printer_name]
+        if not ours:
+            return []
+        client = self._client(printer_name)
+        active = completed = None
+        jobs = []
+        for job_id, upload in ours:
+            ipp_id = upload['ipp_id']
+            if upload['error'] is not None:
+                state = JOB_ERROR
+            elif ipp_id is None:
+                state = JOB_SPOOLING
+            else:
+                if active is None:
+                    active = client.get_jobs()
+                if ipp_id in active:
+                    state = self.JOB_STATES.get(active[ipp_id].get("job-state"), JOB_SPOOLED)
+                else:
+                    # Ушло из незавершённых: отличаем напечатанное от отменённого одним запросом на опрос
+                    if completed is None:
+                        try:
+                            completed = client.get_jobs("completed")
+                        except ipp.IppError:
+                            completed = {}
+                    job_state = completed.get(ipp_id, {}).get("job-state", ipp.JOB_COMPLETED)
+                    state = self.JOB_STATES.get(job_state, JOB_PRINTED)
+            if state in (JOB_PRINTED, JOB_ERROR):
+                # Итог отдаём один раз, дальше трекер задание не спрашивает
+                with self._lock:
+                    self._uploads.pop(job_id, None)
+                if state == JOB_PRINTED:
+                    continue
+            jobs.append({
+                'id': job_id,
+                'document': upload['document'],
+                'state': state,
+                'pages': 0,
+                'error': upload['error'],
+            })
+        return jobs
+    
+    def close(self):
+        # Начатые отправки дописываются до конца, иначе задание потеряется при выходе
+        for executor in self._executors.values():
+            executor.shutdown(wait=True)
+        for client in self._clients.values():
+            client.close()
+
+
+BACKENDS = {
+    Win32Backend.name: Win32Backend,
+    CupsBackend.name: CupsBackend,
+    IppBackend.name: IppBackend,
+    RawSocketBackend.name: RawSocketBackend,
+    FileSinkBackend.name: FileSinkBackend,
+}
+
+
+def default_backend_name():
+    """Выбирает бэкенд по платформе, если не задан AUTOPRINT_BACKEND"""
+    name = os.environ.get("AUTOPRINT_BACKEND")
+    if name:
+        return name
+    if WIN32_AVAILABLE:
+        return Win32Backend.name
+    if sys.platform != "win32" and shutil.which("lp"):
+        return CupsBackend.name
+    return FileSinkBackend.name
+
+
+def create_backend(name=None, **options):
+    """Создает бэкенд по имени (win32, cups, ipp, raw, file)"""
+    name = name or default_backend_name()
+    if name not in BACKENDS:
+        raise ValueError(f"Unbekanntes Backend: {name}")
+    return BACKENDS[name](**options)
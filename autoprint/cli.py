@@ -0,0 +1,367 @@
+"""Консольный режим и демон: та же очередь и печать, но без Qt"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+import contextlib
+
+from autoprint import SUPPORTED_EXTENSIONS
+
+EXIT_OK = 0
+EXIT_FAILED = 1  # часть файлов не напечатана: ошибка, нет файла, ошибка спулера или отмена
+EXIT_USAGE = 2  # неверные аргументы, нет принтера или файлов
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="autoprint",
+        description="AutoPrint ohne Oberfläche: Dateien drucken und JSON-Zusammenfassung ausgeben"
+    )
+    parser.add_argument("paths", nargs="*", help="Dateien oder Ordner (PDF, JPG, PNG, BMP)")
+    parser.add_argument("-c", "--copies", type=int, default=1, help="Kopien pro Datei (Standard: 1)")
+    parser.add_argument("-p", "--printer", help="Drucker (Standard: Standarddrucker des Backends)")
+    parser.add_argument("-b", "--backend", help="Backend: win32, cups, ipp, raw, file (Standard: automatisch)")
+    parser.add_argument("-m", "--manifest", action="append", default=[], help="CSV/JSON-Manifest")
+    parser.add_argument("--sink-dir", help="Zielordner für das file-Backend")
+    parser.add_argument("--raw-printer", action="append", default=[],
+                        help="Drucker für das raw-Backend: NAME=HOST[:PORT] (mehrfach angeben)")
+    parser.add_argument("--raw-copies", choices=("pjl", "resend"),
+                        help="Kopien im raw-Backend: per PJL oder Datei mehrfach senden (Standard: pjl)")
+    parser.add_argument("--ipp-printer", action="append", default=[],
+                        help="Drucker für das ipp-Backend: NAME=ipp://HOST[:PORT]/PFAD (mehrfach angeben)")
+    parser.add_argument("--ipp-in-flight", type=int,
+                        help="Gleichzeitige IPP-Uploads pro Drucker, ab 2 ohne feste Reihenfolge (Standard: 1)")
+    parser.add_argument("--nup", action="store_true",
+                        help="Motive mit ihren Kopien auf Sammelbögen setzen statt einzeln drucken")
+    parser.add_argument("--nup-paper", default="A4", help="Bogenformat: A4, A3, SRA3, Letter (Standard: A4)")
+    parser.add_argument("--nup-grid", help="Raster SPALTENxZEILEN, Motivgröße ergibt sich daraus")
+    parser.add_argument("--nup-cell", help="Endformat eines Motivs BREITExHÖHE in mm (Standard: 59x59)")
+    parser.add_argument("--nup-bleed", type=float, default=2.0, help="Beschnitt in mm (Standard: 2)")
+    parser.add_argument("--nup-marks", type=float, default=3.0, help="Länge der Schnittmarken in mm, 0 = keine")
+    parser.add_argument("--nup-landscape", action="store_true", help="Bogen im Querformat")
+    parser.add_argument("--nup-dir", help="Sammelbögen hier aufbewahren statt nach dem Druck löschen")
+    parser.add_argument("--coalesce", action="store_true",
+                        help="Aufeinanderfolgende Dateien mit ihren Kopien als ein PDF-Auftrag senden")
+    parser.add_argument("--coalesce-pages", type=int, default=500,
+                        help="Höchstens so viele Seiten pro Sammelauftrag (Standard: 500)")
+    parser.add_argument("--coalesce-mb", type=int, default=200,
+                        help="Höchstens so viele MB Quelldateien pro Sammelauftrag (Standard: 200)")
+    parser.add_argument("--coalesce-dir", help="Sammelaufträge hier aufbewahren statt nach dem Druck löschen")
+    parser.add_argument("--list-printers", action="store_true", help="Drucker auflisten und beenden")
+    parser.add_argument("--no-raster", action="store_true", help="PDF und Bilder nicht selbst rendern")
+    parser.add_argument("--no-wait", action="store_true", help="Nicht auf Druckbestätigung warten")
+    parser.add_argument("--daemon", action="store_true", help="Ordner überwachen und dauerhaft drucken")
+    parser.add_argument("--watch", help="Ordner für --daemon (Standard: erster Ordner aus paths)")
+    parser.add_argument("--settle", type=float, default=2.0, help="Sekunden Ruhe, bevor eine neue Datei gilt")
+    parser.add_argument("--pool", action="append", default=[],
+                        help="Drucker für parallelen Druck (mehrfach angeben)")
+    parser.add_argument("--policy", choices=("least-pages", "round-robin"), default="least-pages",
+                        help="Verteilung im Druckerpool (Standard: least-pages)")
+    parser.add_argument("--stats", action="store_true", help="Seiten pro Drucker und Tag aus dem Drucklog ausgeben")
+    parser.add_argument("--since", help="Erster Tag für --stats (YYYY-MM-DD)")
+    parser.add_argument("--until", help="Letzter Tag für --stats (YYYY-MM-DD)")
+    parser.add_argument("--log-dir", help="Ordner des Drucklogs (Standard: print_logs)")
+    parser.add_argument("--metrics-port", type=int, help="Metriken per HTTP anbieten (/metrics, /metrics.json)")
+    parser.add_argument("--metrics-json", help="Metriken am Ende als JSON in diese Datei schreiben")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Statusmeldungen auf stderr")
+    return parser
+
+
+def iter_directory_files(directory):
+    """Поддерживаемые файлы папки рекурсивно, через scandir без лишних stat"""
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                files = []
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS:
+                        files.append(entry.path)
+        except OSError as e:
+            print(f"Ordner nicht lesbar: {current}: {e}", file=sys.stderr)
+            continue
+        yield from sorted(files)
+
+
+def collect_jobs(args):
+    """Собирает задания (путь, копии, принтер) из аргументов и манифестов;
+    jobs = None, если манифест не открылся или не разобрался (ошибка уже выведена)"""
+    jobs = []
+    seen = set()
+    for path in args.paths:
+        if os.path.isdir(path):
+            files = iter_directory_files(path)
+        else:
+            files = [path]
+        for file_path in files:
+            file_path = os.path.abspath(file_path)
+            if file_path not in seen:
+                seen.add(file_path)
+                jobs.append((file_path, args.copies, None))
+    
+    manifest_errors = []
+    if args.manifest:
+        from autoprint.manifest import import_manifest
+        
+        def commit(entries):
+            for entry in entries:
+                jobs.append((entry.path, entry.copies, entry.printer))
+            return len(entries)
+        
+        unreadable = False
+        for manifest_path in args.manifest:
+            try:
+                summary = import_manifest(manifest_path, commit, default_copies=args.copies)
+            except (OSError, ValueError) as e:
+                emit({'error': str(e), 'manifest': manifest_path})
+                unreadable = True
+                continue
+            manifest_errors.extend(summary['errors'])
+        if unreadable:
+            return None, manifest_errors
+    return jobs, manifest_errors
+
+
+def create_cli_backend(args):
+    from autoprint.backends import create_backend
+    options = {}
+    if args.sink_dir:
+        options['directory'] = args.sink_dir
+    if args.backend == "file" and args.pool:
+        # У file-бэкенда принтеры виртуальные: пул задаёт их имена
+        options['printers'] = args.pool
+    if args.backend == "raw":
+        if args.raw_printer:
+            options['printers'] = args.raw_printer
+        if args.raw_copies:
+            options['copies_mode'] = args.raw_copies
+    if args.backend == "ipp":
+        if args.ipp_printer:
+            options['printers'] = args.ipp_printer
+        if args.ipp_in_flight:
+            options['max_in_flight'] = args.ipp_in_flight
+    return create_backend(args.backend, **options)
+
+
+def parse_size(value, convert):
+    """Размер вида 3x4 -> (3, 4); None без значения"""
+    if not value:
+        return None
+    try:
+        first, second = value.lower().split("x")
+        return convert(first), convert(second)
+    except ValueError:
+        raise ValueError(f"Ungültige Größe: {value} (erwartet z.B. 3x4)")
+
+
+def create_layout(args):
+    from autoprint.imposition import Layout
+    return Layout(
+        paper=args.nup_paper,
+        cell_mm=parse_size(args.nup_cell, float),
+        grid=parse_size(args.nup_grid, int),
+        bleed_mm=args.nup_bleed,
+        gap_mm=max(4.0, 2 * args.nup_bleed),
+        marks_mm=args.nup_marks,
+        landscape=args.nup_landscape,
+    )
+
+
+def emit(data):
+    sys.stdout.write(json.dumps(data, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def run_jobs(args, engine, jobs):
+    """Один принтер - PrintEngine.run, несколько в --pool - PrinterPool
+    
+    С --nup задания сначала собираются на листы, с --coalesce - склеиваются в общие PDF.
+    """
+    if len(args.pool) > 1:
+        from autoprint.pool import PrinterPool
+        run = PrinterPool(engine, args.pool, policy=args.policy).run
+    else:
+        def run(jobs, **callbacks):
+            return engine.run(jobs, args.printer, **callbacks)
+    if args.layout is not None:
+        from autoprint.imposition import run_imposed
+        return run_imposed(run, jobs, args.layout, directory=args.nup_dir, status=engine.status)
+    if args.coalesce:
+        from autoprint.coalesce import run_coalesced
+        return run_coalesced(
+            run,
+            jobs,
+            directory=args.coalesce_dir,
+            max_pages=args.coalesce_pages,
+            max_bytes=args.coalesce_mb * 1024 * 1024,
+            status=engine.status
+        )
+    return run(jobs)
+
+
+def summary_exit_code(summary):
+    """EXIT_FAILED, если хоть одно задание не дошло до принтера, в том числе ошибка спулера
+    или принтера уже после отправки (job_errors) и отмена"""
+    problems = ('failed', 'missing', 'job_errors', 'cancelled')
+    return EXIT_FAILED if any(summary.get(key) for key in problems) else EXIT_OK
+
+
+def run_once(args, backend, engine):
+    jobs, manifest_errors = collect_jobs(args)
+    if jobs is None:
+        return EXIT_USAGE
+    if not jobs:
+        emit({'error': "Keine Dateien zum Drucken"})
+        return EXIT_USAGE
+    
+    with contextlib.redirect_stdout(sys.stderr):
+        summary = run_jobs(args, engine, jobs)
+    summary['manifest_errors'] = manifest_errors[:100]
+    emit(summary)
+    return summary_exit_code(summary)
+
+
+def run_daemon(args, backend, engine):
+    """Следит за папкой и печатает новые файлы, пока не придёт SIGINT/SIGTERM"""
+    from autoprint.hotfolder import HotFolderWatcher
+    
+    directory = args.watch or next((p for p in args.paths if os.path.isdir(p)), None)
+    if not directory:
+        emit({'error': "--daemon braucht --watch ORDNER"})
+        return EXIT_USAGE
+    
+    ready = []
+    wakeup = threading.Condition()
+    stop = threading.Event()
+    
+    def on_files(paths):
+        with wakeup:
+            ready.extend(paths)
+            wakeup.notify()
+    
+    def on_signal(signum, frame):
+        stop.set()
+        with wakeup:
+            wakeup.notify()
+    
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+    
+    watcher = HotFolderWatcher(directory, on_files, settle_seconds=args.settle)
+    watcher.start()
+    emit({'event': "watching", 'directory': os.path.abspath(directory), 'native': watcher.native})
+    
+    exit_code = EXIT_OK
+    try:
+        while not stop.is_set():
+            with wakeup:
+                if not ready:
+                    wakeup.wait(1.0)
+                batch = ready[:]
+                del ready[:]
+            if not batch:
+                continue
+            with contextlib.redirect_stdout(sys.stderr):
+                summary = run_jobs(args, engine, [(path, args.copies, None) for path in batch])
+            summary['event'] = "batch"
+            emit(summary)
+            if summary_exit_code(summary) != EXIT_OK:
+                exit_code = EXIT_FAILED
+    finally:
+        watcher.stop()
+    emit({'event': "stopped"})
+    return exit_code
+
+
+def show_stats(args):
+    """Итоги из индекса журнала печати, без чтения самих записей"""
+    from autoprint.print_log import PrintLog
+    log = PrintLog(args.log_dir).open()
+    try:
+        emit({
+            'since': args.since,
+            'until': args.until,
+            'printers': log.summary(args.since, args.until),
+            'pages_per_day': log.pages_per_printer_per_day(args.since, args.until),
+        })
+    finally:
+        log.close()
+    return EXIT_OK
+
+
+def main(argv=None):
+    started = time.perf_counter()
+    args = build_parser().parse_args(argv)
+    if args.copies < 1:
+        emit({'error': "--copies muss >= 1 sein"})
+        return EXIT_USAGE
+    if args.nup and args.coalesce:
+        emit({'error': "--nup und --coalesce schließen sich aus"})
+        return EXIT_USAGE
+    
+    if args.stats:
+        return show_stats(args)
+    
+    try:
+        backend = create_cli_backend(args)
+    except (RuntimeError, ValueError) as e:
+        emit({'error': str(e)})
+        return EXIT_USAGE
+    
+    args.layout = None
+    if args.nup:
+        try:
+            args.layout = create_layout(args)
+        except ValueError as e:
+            emit({'error': str(e)})
+            return EXIT_USAGE
+    
+    if args.list_printers:
+        emit({'backend': backend.name, 'default': backend.default_printer(), 'printers': backend.list_printers()})
+        return EXIT_OK
+    
+    args.printer = args.printer or (args.pool[0] if args.pool else backend.default_printer())
+    if not args.printer:
+        emit({'error': "Kein Drucker angegeben und kein Standarddrucker gefunden"})
+        return EXIT_USAGE
+    
+    from autoprint.engine import PrintEngine
+    metrics = server = None
+    if args.metrics_port is not None or args.metrics_json:
+        from autoprint.metrics import Metrics, MetricsServer
+        metrics = Metrics()
+        if args.metrics_port is not None:
+            try:
+                server = MetricsServer(metrics, args.metrics_port).start()
+            except (OSError, OverflowError) as e:
+                emit({'error': f"Metrik-Server nicht gestartet (Port {args.metrics_port}): {e}"})
+                return EXIT_USAGE
+    status = (lambda message: print(message, file=sys.stderr)) if args.verbose else None
+    engine = PrintEngine(
+        backend,
+        status_callback=status,
+        rasterize_pdf=not args.no_raster,
+        rasterize_images=not args.no_raster,
+        wait_printed=not args.no_wait,
+        metrics=metrics
+    )
+    
+    if args.verbose:
+        print(f"Start in {(time.perf_counter() - started) * 1000:.1f} ms", file=sys.stderr)
+    
+    try:
+        if args.daemon:
+            return run_daemon(args, backend, engine)
+        return run_once(args, backend, engine)
+    finally:
+        backend.close()
+        if server is not None:
+            server.stop()
+        if args.metrics_json:
+            metrics.dump(args.metrics_json)
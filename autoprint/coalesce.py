@@ -0,0 +1,100 @@
+"""Склейка заданий подряд в один PDF: меньше заданий в спулере при тех же страницах и копиях"""
+import os
+
+from autoprint.backends import image_to_pdf
+from autoprint.combined import CombinedJob, run_combined
+
+MAX_PAGES = 500  # страниц в одном общем задании со всеми копиями
+MAX_BYTES = 200 * 1024 * 1024  # исходных файлов в одном общем задании
+
+
+def plan_batches(items, max_pages=MAX_PAGES, max_bytes=MAX_BYTES):
+    """items (индекс, путь, копии, страниц, принтер) -> партии подряд идущих заданий одного принтера
+    
+    Партия закрывается перед заданием, с которым она превысила бы лимит страниц или байт;
+    файл больше лимита целиком уходит отдельной партией.
+    """
+    batches = []
+    current = []
+    pages = size = 0
+    for item in items:
+        index, path, copies, count, printer = item
+        item_pages = count * copies
+        # Копии страниц делят ресурсы, поэтому размер файла считается один раз
+        item_size = os.path.getsize(path)
+        if current and (printer != current[-1][4] or pages + item_pages > max_pages
+                        or size + item_size > max_bytes):
+            batches.append(current)
+            current = []
+            pages = size = 0
+        current.append(item)
+        pages += item_pages
+        size += item_size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def combine(batch, path):
+    """Пишет партию в один PDF: страницы файлов по порядку, копии - подряд (разобранными)
+    
+    Возвращает CombinedJob с диапазоном страниц каждого задания.
+    """
+    import fitz
+    doc = fitz.open()
+    sources = {}
+    ranges = {}
+    try:
+        for index, file_path, copies, _, _ in batch:
+            if file_path.lower().endswith('.pdf'):
+                source = fitz.open(file_path)
+            else:
+                source = fitz.open("pdf", image_to_pdf(file_path))
+            first = doc.page_count
+            try:
+                doc.insert_pdf(source)
+            finally:
+                source.close()
+            last = doc.page_count
+            # fullcopy_page оставляет ресурсы общими: копия - это только ещё один поток содержимого
+            for _ in range(copies - 1):
+                for number in range(first, last):
+                    doc.fullcopy_page(number)
+            sources[index] = doc.page_count - first
+            ranges[index] = (first + 1, doc.page_count)
+        doc.save(path, garbage=1, deflate=True)
+        return CombinedJob(path, doc.page_count, sources, ranges)
+    finally:
+        doc.close()
+
+
+def run_coalesced(run, jobs, directory=None, max_pages=MAX_PAGES, max_bytes=MAX_BYTES, on_job_start=None,
+                  on_job_state=None, status=None, controls=None):
+    """Печатает (путь, копии[, принтер]) общими PDF через run
+    
+    Задание, оставшееся в партии одно, печатается как есть со своими копиями - без склейки.
+    Остальное - как в run_combined, статистика в summary['coalesced'].
+    """
+    def build(items, directory):
+        parts = []
+        batches = plan_batches(items, max_pages, max_bytes)
+        for number, batch in enumerate(batches):
+            if len(batch) == 1:
+                index, file_path, copies, count, printer = batch[0]
+                parts.append(CombinedJob(file_path, count * copies, {index: 1}, printer=printer, copies=copies))
+                continue
+            if status:
+                status(f"⧉ Füge {len(batch)} Dateien zusammen ({number + 1}/{len(batches)})...")
+            job = combine(batch, os.path.join(directory, f"Sammelauftrag_{number + 1:04d}.pdf"))
+            job.printer = batch[0][4]
+            parts.append(job)
+        return parts
+    
+    return run_combined(
+        run, jobs, build, 'coalesced', "Sammelauftrag",
+        directory=directory,
+        on_job_start=on_job_start,
+        on_job_state=on_job_state,
+        status=status,
+        controls=controls
+    )
@@ -0,0 +1,222 @@
+"""Печать нескольких заданий общими файлами (листы сборки, склейка) с состояниями по исходным заданиям"""
+import os
+import shutil
+import tempfile
+
+from autoprint import raster
+from autoprint.backends import JOB_SPOOLING, JOB_SPOOLED, JOB_PRINTED, JOB_ERROR
+from autoprint.engine import JOB_MISSING, JOB_CANCELLED, JOB_PAUSED
+from autoprint.scheduler import JobCancelled, JobPaused
+
+
+class CombinedJob:
+    """Общий файл: pages - напечатанных страниц со всеми копиями,
+    sources - {индекс задания: его доля (ячейки, страницы)},
+    ranges - {индекс задания: (первая, последняя) страница в этом файле}"""
+    __slots__ = ('path', 'pages', 'sources', 'ranges', 'printer', 'copies')
+    
+    def __init__(self, path, pages, sources, ranges=None, printer=None, copies=1):
+        self.path = path
+        self.pages = pages
+        self.sources = sources
+        self.ranges = ranges or {}
+        self.printer = printer
+        self.copies = copies
+
+
+class PartControl:
+    """Отмена и пауза общего файла по JobControl его заданий: только когда это касается всех
+    заданий в нём - лист с другими заданиями печатается целиком. Пауза - если задания
+    целиком в этом файле, иначе повтор удвоил бы уже отправленные части."""
+    
+    def __init__(self, controls, exclusive):
+        self.controls = controls
+        self.exclusive = exclusive
+    
+    def checkpoint(self, pause=True):
+        if all(control.cancelled for control in self.controls):
+            raise JobCancelled("Auftrag abgebrochen")
+        if pause and self.exclusive and all(control.paused for control in self.controls):
+            for control in self.controls:
+                if control.on_pause is not None:
+                    control.on_pause()
+            raise JobPaused("Auftrag angehalten")
+
+
+class PartEntries:
+    """Общие файлы с PartControl для PrintEngine.run/PrinterPool.run (см. engine.job_entries)"""
+    
+    def __init__(self, parts, states, controls):
+        self.items = []
+        for job in parts:
+            control = PartControl(
+                [controls[index] for index in job.sources if index in controls],
+                all(len(states.parts[index]) == 1 for index in job.sources)
+            )
+            self.items.append(((job.path, job.copies, job.printer), control if control.controls else None))
+        self._next = 0
+    
+    def __len__(self):
+        return len(self.items) - self._next
+    
+    def entries(self):
+        for index, (job, control) in enumerate(self.items):
+            self._next = index + 1
+            yield index, job, control
+
+
+class SourceStates:
+    """Переводит состояния общих файлов на исходные задания: готово, когда готовы все его файлы"""
+    
+    def __init__(self, parts, on_job_state, title):
+        self.combined = parts
+        self.on_job_state = on_job_state
+        self.title = title
+        self.parts = {}
+        for part, job in enumerate(parts):
+            for index in job.sources:
+                self.parts.setdefault(index, set()).add(part)
+        self.reached = {}  # (индекс, состояние) -> файлы, дошедшие до состояния
+        self.spooled = set()
+        self.failed = {}  # индекс -> текст ошибки
+        self.stopped = {JOB_CANCELLED: set(), JOB_PAUSED: set()}
+        self.finished = set()
+    
+    def __call__(self, part, state, info):
+        report = self.on_job_state or (lambda index, state, info: None)
+        for index in self.combined[part].sources:
+            if index in self.finished:
+                continue
+            if state in self.stopped:
+                self.finished.add(index)
+                self.stopped[state].add(index)
+                report(index, state, {'printer': info.get('printer')})
+                continue
+            if state not in (JOB_SPOOLING, JOB_SPOOLED, JOB_PRINTED):
+                error = info.get('error') or f"{self.title}: {state}"
+                self.finished.add(index)
+                self.failed[index] = error
+                report(index, JOB_ERROR, {'printer': info.get('printer'), 'error': error})
+                continue
+            reached = self.reached.setdefault((index, state), set())
+            first_part = not reached
+            reached.add(part)
+            if state == JOB_SPOOLING:
+                if first_part:
+                    report(index, state, {'printer': info.get('printer')})
+                continue
+            if reached != self.parts[index]:
+                continue
+            result = {'printer': info.get('printer')}
+            if state == JOB_SPOOLED:
+                result['pages'] = self.pages(index)
+                batch = self.batch(index)
+                if batch:
+                    result['batch'] = batch
+                self.spooled.add(index)
+            if state == JOB_PRINTED:
+                self.finished.add(index)
+            report(index, state, result)
+    
+    def pages(self, index):
+        """Доля страниц файла по доле задания: лист сборки делится между соседями по сетке"""
+        share = 0.0
+        for part in self.parts[index]:
+            job = self.combined[part]
+            share += job.pages * job.sources[index] / sum(job.sources.values())
+        share = round(share, 2)
+        return int(share) if share.is_integer() else share
+    
+    def batch(self, index):
+        """Где задание лежит в общих файлах: [{'file', 'pages': [первая, последняя]}]"""
+        return [
+            {'file': os.path.basename(self.combined[part].path), 'pages': list(self.combined[part].ranges[index])}
+            for part in sorted(self.parts[index]) if index in self.combined[part].ranges
+        ]
+
+
+def run_combined(run, jobs, build, kind, title, directory=None, on_job_start=None, on_job_state=None,
+                 status=None, controls=None):
+    """Печатает (путь, копии[, принтер]) общими файлами через run
+    
+    build(items, directory) собирает [CombinedJob] из items - (индекс, путь, копии, страниц, принтер)
+    существующих файлов. run(задания, on_job_start, on_job_state) - PrintEngine.run или
+    PrinterPool.run с уже выбранным принтером. on_job_state получает состояния исходных
+    заданий, при spooled - ещё batch с файлами и страницами. Сводка пересчитывается на
+    исходные задания, статистика общих файлов - в summary[kind]. Общие файлы удаляются
+    после печати, если directory не задан. controls - {индекс: JobControl} заданий
+    планировщика: общий файл отменяется или встаёт на паузу вместе со всеми своими заданиями.
+    """
+    jobs = list(jobs)
+    items = []
+    missing = 0
+    cancelled = 0
+    unreadable = {}  # индекс -> текст ошибки: файл не открылся, остальные печатаются
+    for index, job in enumerate(jobs):
+        file_path, copies = job[0], job[1]
+        control = controls.get(index) if controls else None
+        if control is not None and control.cancelled:
+            if on_job_state:
+                on_job_state(index, JOB_CANCELLED, {})
+            cancelled += 1
+            continue
+        if not os.path.exists(file_path):
+            if status:
+                status(f"⚠️ Datei nicht gefunden: {os.path.basename(file_path)}")
+            if on_job_state:
+                on_job_state(index, JOB_MISSING, {})
+            missing += 1
+            continue
+        try:
+            pages = raster.page_count(file_path) if file_path.lower().endswith('.pdf') else 1
+        except Exception as e:
+            error = str(e)
+            if status:
+                status(f"❌ Datei nicht lesbar: {os.path.basename(file_path)}: {error}")
+            if on_job_state:
+                on_job_state(index, JOB_ERROR, {'error': error})
+            unreadable[index] = error
+            continue
+        printer = job[2] if len(job) > 2 and job[2] else None
+        items.append((index, file_path, copies, pages, printer))
+    
+    temporary = directory is None
+    if temporary:
+        directory = tempfile.mkdtemp(prefix=f"autoprint_{kind}_")
+    else:
+        os.makedirs(directory, exist_ok=True)
+    try:
+        parts = build(items, directory)
+        states = SourceStates(parts, on_job_state, title)
+        if controls:
+            combined = PartEntries(parts, states, controls)
+        else:
+            combined = [(job.path, job.copies, job.printer) for job in parts]
+        summary = run(
+            combined,
+            on_job_start=on_job_start,
+            on_job_state=states
+        )
+        files = summary['total']
+        summary.update({
+            'total': len(jobs),
+            'printed': len(states.spooled),
+            'failed': len(unreadable) + len(states.failed),
+            'missing': missing,
+            'cancelled': cancelled + len(states.stopped[JOB_CANCELLED]),
+            'paused': len(states.stopped[JOB_PAUSED]),
+            'copies': sum(jobs[index][1] for index in states.spooled),
+            'errors': [
+                {'file': jobs[index][0], 'error': error}
+                for index, error in list(unreadable.items()) + list(states.failed.items())
+            ],
+        })
+        summary[kind] = {
+            'jobs': len(items),
+            'files': files,
+            'pages': sum(job.pages for job in parts),
+        }
+        return summary
+    finally:
+        if temporary:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,358 @@
+"""Движок очереди печати: проходит по заданиям и отправляет их в бэкенд"""
+import os
+import time
+import functools
+from pathlib import Path
+
+from autoprint import raster
+from autoprint.backends import JOB_SPOOLING, JOB_SPOOLED, JOB_PRINTED, JOB_ERROR, copy_rounds
+from autoprint.tracking import JobTracker
+from autoprint.scheduler import JobInterrupted, JobCancelled, JobPaused
+from autoprint.metrics import DISABLED
+
+JOB_MISSING = "missing"  # файла нет на диске, в спулер не отправлялся
+JOB_CANCELLED = "cancelled"  # отменён до конца отправки; отправленное раньше остаётся в спулере
+JOB_PAUSED = "paused"  # остановлен паузой до отправки, ждёт в очереди
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def estimate_pages(file_path, copies):
+    """Страниц на принтер: страницы PDF x копии; картинка - одна страница"""
+    pages = 1
+    if Path(file_path).suffix.lower() == '.pdf' and raster.FITZ_AVAILABLE:
+        try:
+            pages = raster.page_count(file_path)
+        except Exception:
+            pages = 1
+    return max(pages, 1) * copies
+
+
+def job_entries(jobs):
+    """(индекс, задание, JobControl) по порядку печати и total(n) - всего заданий после n-го
+    
+    jobs - список (путь, копии[, принтер]) или PriorityScheduler: тогда задания берутся
+    по приоритету прямо во время печати, индекс - id задания, добавленные позже тоже печатаются.
+    """
+    if hasattr(jobs, 'entries'):
+        return jobs.entries(), lambda number: number + len(jobs)
+    jobs = list(jobs)
+    return ((index, job, None) for index, job in enumerate(jobs)), lambda number: len(jobs)
+
+
+class PrintEngine:
+    """Последовательно печатает задания через бэкенд, не зная ничего о Qt"""
+    
+    def __init__(self, backend, status_callback=None, rasterize_pdf=True, wait_printed=True, registry=None,
+                 metrics=None, rasterize_images=True):
+        self.backend = backend
+        self.status_callback = status_callback
+        # Общий с UI кэш принтеров: настройки не запрашиваются у спулера на каждое задание
+        self.registry = registry
+        self.tracker = JobTracker(backend)
+        # В конце прогона дожидаться подтверждения печати от спулера
+        self.wait_printed = wait_printed
+        # PDF рендерится PyMuPDF и идет в бэкенд постранично, без Adobe Reader
+        self.rasterize_pdf = rasterize_pdf
+        # Картинки декодируются здесь и идут одним заданием, без программы просмотра на каждую копию
+        self.rasterize_images = rasterize_images
+        # Длительность фаз и счётчики; по умолчанию выключены и ничего не стоят
+        self.metrics = metrics or DISABLED
+        self._capabilities = {}
+    
+    def status(self, message):
+        if self.status_callback:
+            self.status_callback(message)
+    
+    def print_file(self, file_path, printer_name, copies, control=None):
+        """Отправляет один файл, возвращает id заданий спулера
+        
+        Копии по возможности делает драйвер: файл спулится один раз на задание, а не copies раз.
+        control - JobControl планировщика: отмена между страницами и копиями (JobCancelled),
+        пауза - пока в спулере нет ни одной копии (JobPaused).
+        """
+        checkpoint = control.checkpoint if control is not None else None
+        max_copies = self.driver_copies(file_path, printer_name, copies)
+        if not max_copies:
+            return self.print_copies(file_path, printer_name, copies, checkpoint=checkpoint)
+        job_ids = []
+        for round_copies in copy_rounds(copies, max_copies):
+            job_ids.extend(self.print_copies(file_path, printer_name, round_copies, max_copies, checkpoint))
+            if checkpoint is not None:
+                # Первая порция уже в спулере: дальше только отмена
+                checkpoint = functools.partial(control.checkpoint, pause=False)
+        return job_ids
+    
+    def driver_copies(self, file_path, printer_name, copies):
+        """Сколько копий драйвер берёт в одно задание; None - неизвестно, копии как раньше"""
+        if copies == 1:
+            return None
+        capabilities = self.capabilities(printer_name)
+        max_copies = capabilities.get('copies')
+        if not max_copies:
+            return None
+        if (max_copies > 1 and capabilities.get('collate') is False
+                and estimate_pages(file_path, 1) > 1):
+            # Без разбора драйвер напечатал бы 1,1,2,2: многостраничные копии делаем сами
+            return 1
+        return max_copies
+    
+    def capabilities(self, printer_name):
+        """Возможности драйвера из реестра или, без него, один раз на принтер у бэкенда"""
+        if self.registry is not None:
+            return self.registry.capabilities(printer_name)
+        if printer_name not in self._capabilities:
+            try:
+                self._capabilities[printer_name] = self.backend.printer_capabilities(printer_name)
+            except Exception:
+                self._capabilities[printer_name] = {}
+        return self._capabilities[printer_name]
+    
+    def print_copies(self, file_path, printer_name, copies, max_copies=None, checkpoint=None):
+        """Одно задание с copies копиями; max_copies - из driver_copies: 1 - драйвер копий не делает"""
+        driver = bool(max_copies and max_copies > 1)
+        if checkpoint is not None:
+            checkpoint()
+        if (self.rasterize_pdf and Path(file_path).suffix.lower() == '.pdf'
+                and raster.can_rasterize(self.backend)):
+            try:
+                return raster.print_pdf_raster(
+                    self.backend, file_path, printer_name, copies, self.status_callback,
+                    self.printer_info(printer_name), driver, checkpoint
+                )
+            except JobInterrupted:
+                raise
+            except Exception as e:
+                # Задание уже отменено в print_pdf_raster, дубликатов не будет
+                print(f"Rasterdruck fehlgeschlagen: {e}")
+                self.status(f"⚠️ Rasterdruck fehlgeschlagen, verwende {self.backend.name}-Druck...")
+        elif (self.rasterize_images and Path(file_path).suffix.lower() in IMAGE_EXTENSIONS
+                and raster.can_print_images(self.backend)):
+            try:
+                return raster.print_image_raster(
+                    self.backend, file_path, printer_name, copies, self.status_callback,
+                    self.printer_info(printer_name), driver, checkpoint
+                )
+            except JobInterrupted:
+                raise
+            except Exception as e:
+                print(f"Bilddruck fehlgeschlagen: {e}")
+                self.status(f"⚠️ Bilddruck fehlgeschlagen, verwende {self.backend.name}-Druck...")
+        if max_copies == 1:
+            # Драйвер копий не делает: файл отправляется copies раз
+            job_ids = []
+            for i in range(copies):
+                if copies > 1:
+                    self.status(f"🔄 Sende Kopie {i + 1}/{copies}...")
+                if checkpoint is not None and i:
+                    checkpoint(pause=False)
+                job_ids.extend(self.backend.submit(file_path, printer_name, 1, self.status_callback))
+            return job_ids
+        return self.backend.submit(file_path, printer_name, copies, self.status_callback)
+    
+    def submit_job(self, file_path, printer_name, copies, control=None):
+        """Отправляет файл и ждёт, пока спулер его примет; возвращает отслеживаемые задания"""
+        backend = self.backend.name
+        with self.metrics.span('submit', printer_name, backend):
+            job_ids = self.print_file(file_path, printer_name, copies, control)
+        # Следующий файл отправляем, как только спулер принял текущий
+        jobs = self.tracker.track(printer_name, job_ids, os.path.basename(file_path))
+        if self.backend.pipelined:
+            # Бэкенд отправляет сам в фоне: следующий файл не ждёт, пока примут этот
+            return jobs
+        with self.metrics.span('spool', printer_name, backend):
+            spooled = self.tracker.wait(jobs, until=JOB_SPOOLED)
+        if not spooled:
+            print(f"Spooler hat {os.path.basename(file_path)} nicht bestätigt")
+        return jobs
+    
+    def prepare(self, file_path, copies, count_pages):
+        """Проверка файла (на сетевом диске это первый запрос) и оценка страниц; None - файла нет"""
+        if not os.path.exists(file_path):
+            return None
+        return estimate_pages(file_path, copies) if count_pages else 0
+    
+    def job_spooled(self, printer_name, pages, copies):
+        self.metrics.inc('jobs', printer_name, self.backend.name, JOB_SPOOLED)
+        self.metrics.inc('copies', printer_name, self.backend.name, value=copies)
+        if pages:
+            self.metrics.inc('pages', printer_name, self.backend.name, value=pages)
+    
+    def job_failed(self, printer_name, state):
+        self.metrics.inc('jobs', printer_name, self.backend.name, state)
+    
+    def settle(self, pending, wait=False):
+        """Конвейерные отправки -> (принятые, не принятые с ошибкой, ещё в пути)
+        
+        pending - списки отслеживаемых заданий в конце кортежей; wait=True ждёт все отправки:
+        их длительность ограничивает таймаут соединения бэкенда, а не спулера.
+        """
+        jobs = [job for entry in pending for job in entry[-1] if not job.reached(JOB_SPOOLED)]
+        if wait:
+            self.tracker.wait(jobs, until=JOB_SPOOLED, timeout=self.tracker.print_timeout)
+        elif jobs:
+            self.tracker.update(jobs)
+        accepted, failed, waiting = [], [], []
+        for entry in pending:
+            submitted = entry[-1]
+            errors = [job for job in submitted if job.state == JOB_ERROR]
+            if errors:
+                failed.append((entry, errors[0].error or "Übertragung an den Drucker fehlgeschlagen"))
+            elif all(job.reached(JOB_SPOOLED) for job in submitted):
+                accepted.append(entry)
+            elif wait:
+                failed.append((entry, "Drucker hat den Auftrag nicht angenommen"))
+            else:
+                waiting.append(entry)
+        return accepted, failed, waiting
+    
+    def confirm(self, groups, on_job_state=None):
+        """После ожидания печати: итог и метрики по заданиям (индекс, отслеживаемые задания, начало)"""
+        backend = self.backend.name
+        for index, jobs, started in groups:
+            printer = jobs[0].printer if jobs else None
+            done = [job.done_at for job in jobs if job.done_at is not None]
+            spooled = [job.spooled_at for job in jobs if job.spooled_at is not None]
+            if done and spooled:
+                self.metrics.observe('print', max(done) - min(spooled), printer, backend)
+            if done:
+                self.metrics.observe('total', max(done) - started, printer, backend)
+            
+            if any(job.state == JOB_ERROR for job in jobs):
+                state, info = JOB_ERROR, {'printer': printer, 'error': "Druckerfehler"}
+            elif all(job.state == JOB_PRINTED for job in jobs):
+                state, info = JOB_PRINTED, {'printer': printer}
+            else:
+                continue
+            self.metrics.inc('jobs', printer, backend, state)
+            if on_job_state:
+                on_job_state(index, state, info)
+    
+    def printer_info(self, printer_name):
+        """Настройки принтера из реестра; без реестра бэкенд спросит сам"""
+        if self.registry is None:
+            return None
+        return self.registry.get(printer_name)
+    
+    def run(self, jobs, printer_name, on_job_start=None, on_job_done=None, on_job_state=None):
+        """Печатает список (путь, копии[, принтер]); возвращает сводку для UI/CLI
+        
+        on_job_state(индекс, состояние, сведения) получает переходы каждого задания:
+        spooling, spooled, error, missing и после ожидания - printed или error.
+        В сведениях: printer, pages (при spooled) и error. jobs может быть PriorityScheduler
+        (см. job_entries): отменённое в нём задание получает cancelled, приостановленное - paused.
+        """
+        entries, total = job_entries(jobs)
+        summary = {
+            'printer': printer_name,
+            'backend': self.backend.name,
+            'total': 0,
+            'printed': 0,
+            'failed': 0,
+            'missing': 0,
+            'cancelled': 0,
+            'paused': 0,
+            'copies': 0,
+            'confirmed': 0,
+            'errors': [],
+        }
+        started = time.perf_counter()
+        tracked = []
+        groups = []
+        # Конвейерный бэкенд отправляет в фоне: spooled - только когда принтер принял задание
+        pending = []
+        last_settle = time.monotonic()
+        report = on_job_state or (lambda index, state, info: None)
+        
+        count_pages = on_job_state is not None or self.metrics.enabled
+        
+        def spooled(idx, file_path, job_printer, pages, file_copies, job_started, submitted):
+            tracked.extend(submitted)
+            groups.append((idx, submitted, job_started))
+            self.job_spooled(job_printer, pages, file_copies)
+            report(idx, JOB_SPOOLED, {'printer': job_printer, 'pages': pages})
+            
+            summary['printed'] += 1
+            summary['copies'] += file_copies
+            if on_job_done:
+                on_job_done(file_path, job_printer, file_copies)
+        
+        def failed(idx, file_path, job_printer, error):
+            summary['failed'] += 1
+            summary['errors'].append({'file': file_path, 'error': error})
+            self.job_failed(job_printer, JOB_ERROR)
+            report(idx, JOB_ERROR, {'printer': job_printer, 'error': error})
+            self.status(f"❌ Fehler beim Drucken {os.path.basename(file_path)}: {error}")
+            print(f"Print error: {error}")
+        
+        def settle(wait=False):
+            accepted, rejected, waiting = self.settle(pending, wait)
+            pending[:] = waiting
+            for entry in accepted:
+                spooled(*entry)
+            for (idx, file_path, job_printer, _, _, _, _), error in rejected:
+                failed(idx, file_path, job_printer, error)
+        
+        for number, (idx, job, control) in enumerate(entries, 1):
+            summary['total'] += 1
+            file_path, file_copies = job[0], job[1]
+            # Принтер из манифеста имеет приоритет над выбранным
+            job_printer = job[2] if len(job) > 2 and job[2] else printer_name
+            
+            job_started = time.monotonic()
+            with self.metrics.span('prepare', job_printer, self.backend.name):
+                pages = self.prepare(file_path, file_copies, count_pages)
+            if pages is None:
+                self.status(f"⚠️ Datei nicht gefunden: {os.path.basename(file_path)}")
+                summary['missing'] += 1
+                self.job_failed(job_printer, JOB_MISSING)
+                report(idx, JOB_MISSING, {})
+                continue
+            
+            if on_job_start:
+                on_job_start(file_path)
+            report(idx, JOB_SPOOLING, {'printer': job_printer})
+            
+            self.status(
+                f"🖨️ Drucke {number}/{total(number)}: {os.path.basename(file_path)} ({file_copies}x)"
+            )
+            
+            try:
+                submitted = self.submit_job(file_path, job_printer, file_copies, control)
+                entry = (idx, file_path, job_printer, pages, file_copies, job_started, submitted)
+                if self.backend.pipelined:
+                    pending.append(entry)
+                else:
+                    spooled(*entry)
+            
+            except JobCancelled:
+                summary['cancelled'] += 1
+                self.job_failed(job_printer, JOB_CANCELLED)
+                report(idx, JOB_CANCELLED, {'printer': job_printer})
+                self.status(f"⛔ Abgebrochen: {os.path.basename(file_path)}")
+            
+            except JobPaused:
+                summary['paused'] += 1
+                report(idx, JOB_PAUSED, {'printer': job_printer})
+                self.status(f"⏸ Angehalten: {os.path.basename(file_path)}")
+            
+            except Exception as e:
+                failed(idx, file_path, job_printer, str(e))
+            
+            # Принятые принтером отчитываем по ходу, не чаще раза в полсекунды
+            if pending and time.monotonic() - last_settle >= 0.5:
+                settle()
+                last_settle = time.monotonic()
+        
+        if pending:
+            self.status("⏳ Warte, bis der Drucker die Aufträge angenommen hat...")
+            settle(wait=True)
+        if tracked and self.wait_printed:
+            self.status("⏳ Warte auf Bestätigung vom Drucker...")
+            self.tracker.wait(tracked, until=JOB_PRINTED)
+            self.confirm(groups, on_job_state)
+        summary['confirmed'] = sum(1 for job in tracked if job.state == JOB_PRINTED)
+        summary['job_errors'] = sum(1 for job in tracked if job.state == JOB_ERROR)
+        summary['latency'] = self.tracker.stats()
+        summary['seconds'] = round(time.perf_counter() - started, 3)
+        return summary
@@ -0,0 +1,266 @@
+"""Наблюдение за папкой: новые/изменённые файлы автоматически попадают в очередь"""
+import os
+import time
+import threading
+
+from autoprint import SUPPORTED_EXTENSIONS
+
+try:
+    import win32file
+    import win32con
+    NATIVE_WATCH_AVAILABLE = True
+except ImportError:
+    NATIVE_WATCH_AVAILABLE = False
+
+FILE_LIST_DIRECTORY = 0x0001
+
+
+def is_network_path(directory):
+    """UNC-путь или сетевой диск: уведомления там ненадёжны, используем опрос"""
+    directory = os.path.abspath(directory)
+    if directory.startswith("\\\\"):
+        return True
+    if NATIVE_WATCH_AVAILABLE:
+        try:
+            root = os.path.splitdrive(directory)[0] + "\\"
+            return win32file.GetDriveType(root) == win32file.DRIVE_REMOTE
+        except Exception:
+            return True
+    return False
+
+
+class HotFolderWatcher:
+    """Следит за папкой и отдаёт пачки готовых файлов в on_files(paths)"""
+    
+    def __init__(self, directory, on_files, settle_seconds=2.0, poll_interval=2.0,
+                 full_rescan_interval=60.0, recursive=True, use_native=True):
+        self.directory = os.path.abspath(directory)
+        self.on_files = on_files
+        # Файл считается дописанным, если размер и mtime не менялись settle_seconds
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.full_rescan_interval = full_rescan_interval
+        self.recursive = recursive
+        self.native = use_native and NATIVE_WATCH_AVAILABLE and not is_network_path(directory)
+        
+        self._files = {}  # путь -> (mtime_ns, size) уже известных файлов
+        self._dirs = {}  # папка -> mtime_ns для инкрементального пересканирования
+        self._pending = {}  # путь -> (mtime_ns, size, время последнего изменения)
+        # Все три словаря меняют поток уведомлений и поток проверки: только под блокировкой
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._handle = None
+    
+    @property
+    def running(self):
+        return bool(self._threads) and not self._stop.is_set()
+    
+    def start(self):
+        self._stop.clear()
+        # Файлы, которые уже лежат в папке, не печатаем - только новые
+        self._index_tree(self.directory)
+        self._threads = [threading.Thread(target=self._settle_loop, daemon=True)]
+        if self.native:
+            self._threads.append(threading.Thread(target=self._native_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._handle is not None:
+            try:
+                # Прерывает блокирующий ReadDirectoryChangesW
+                win32file.CloseHandle(self._handle)
+            except Exception:
+                pass
+            self._handle = None
+        self._threads = []
+    
+    def _is_supported(self, name):
+        return os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS
+    
+    def _index_tree(self, directory):
+        """Полный проход scandir: запоминает mtime папок и файлов без лишних stat"""
+        stack = [directory]
+        dirs = {}
+        files = {}
+        while stack:
+            current = stack.pop()
+            try:
+                dirs[current] = os.stat(current).st_mtime_ns
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.recursive:
+                                stack.append(entry.path)
+                        elif self._is_supported(entry.name):
+                            stat = entry.stat()
+                            files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                dirs.pop(current, None)
+        with self._lock:
+            self._dirs.update(dirs)
+            self._files.update(files)
+    
+    def _scan_dir(self, directory):
+        """Пересканирует одну папку; новые и изменённые файлы идут в pending"""
+        new_dirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if self.recursive:
+                            new_dirs.append(entry.path)
+                    elif self._is_supported(entry.name):
+                        stat = entry.stat()
+                        self._candidate(entry.path, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return []
+        with self._lock:
+            return [path for path in new_dirs if path not in self._dirs]
+    
+    def _candidate(self, path, mtime_ns, size):
+        with self._lock:
+            if self._files.get(path) == (mtime_ns, size):
+                return
+            previous = self._pending.get(path)
+            if previous is None or previous[:2] != (mtime_ns, size):
+                self._pending[path] = (mtime_ns, size, time.monotonic())
+    
+    def _rescan(self, full=False):
+        """Опрос: заходим только в папки, у которых изменился mtime"""
+        with self._lock:
+            dirs = list(self._dirs.items())
+        for directory, old_mtime in dirs:
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                # Папка удалена - забываем её
+                with self._lock:
+                    self._dirs.pop(directory, None)
+                continue
+            if full or mtime != old_mtime:
+                with self._lock:
+                    self._dirs[directory] = mtime
+                for new_dir in self._scan_dir(directory):
+                    self._scan_new_tree(new_dir)
+    
+    def _scan_new_tree(self, directory):
+        """Новая папка (создана или перемещена): все её файлы - кандидаты"""
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            try:
+                mtime = os.stat(current).st_mtime_ns
+            except OSError:
+                continue
+            with self._lock:
+                self._dirs[current] = mtime
+            stack.extend(self._scan_dir(current))
+    
+    def _settle_loop(self):
+        last_poll = time.monotonic()
+        last_full = last_poll
+        while not self._stop.wait(0.5):
+            now = time.monotonic()
+            if not self.native and now - last_poll >= self.poll_interval:
+                full = now - last_full >= self.full_rescan_interval
+                self._rescan(full)
+                last_poll = now
+                if full:
+                    last_full = now
+            ready = self._collect_ready()
+            if ready:
+                try:
+                    self.on_files(ready)
+                except Exception as e:
+                    print(f"Hotfolder Fehler: {e}")
+    
+    def _collect_ready(self):
+        """Проверяет pending: файл готов, если не менялся и открывается на чтение"""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            pending = list(self._pending.items())
+        for path, (mtime_ns, size, changed_at) in pending:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                with self._lock:
+                    self._pending.pop(path, None)
+                continue
+            current = (stat.st_mtime_ns, stat.st_size)
+            if current != (mtime_ns, size):
+                with self._lock:
+                    self._pending[path] = current + (now,)
+                continue
+            if now - changed_at < self.settle_seconds or stat.st_size == 0:
+                continue
+            try:
+                # Копирование по сети ещё держит файл открытым на запись
+                with open(path, 'rb'):
+                    pass
+            except OSError:
+                continue
+            with self._lock:
+                self._pending.pop(path, None)
+                self._files[path] = current
+            ready.append(path)
+        return sorted(ready)
+    
+    def _native_loop(self):
+        """ReadDirectoryChangesW: события сразу дают имена файлов, без пересканирования"""
+        try:
+            self._handle = win32file.CreateFile(
+                self.directory,
+                FILE_LIST_DIRECTORY,
+                win32con.FILE_SHARE_READ | win32con.FILE_SHARE_WRITE | win32con.FILE_SHARE_DELETE,
+                None,
+                win32con.OPEN_EXISTING,
+                win32con.FILE_FLAG_BACKUP_SEMANTICS,
+                None
+            )
+        except Exception as e:
+            print(f"Hotfolder: Benachrichtigungen nicht verfügbar ({e}), verwende Abfrage")
+            self.native = False
+            return
+        
+        flags = (
+            win32con.FILE_NOTIFY_CHANGE_FILE_NAME
+            | win32con.FILE_NOTIFY_CHANGE_DIR_NAME
+            | win32con.FILE_NOTIFY_CHANGE_SIZE
+            | win32con.FILE_NOTIFY_CHANGE_LAST_WRITE
+        )
+        while not self._stop.is_set():
+            try:
+                changes = win32file.ReadDirectoryChangesW(self._handle, 64 * 1024, self.recursive, flags, None, None)
+            except Exception as e:
+                if not self._stop.is_set():
+                    # Переполнение буфера или потеря соединения: переходим на опрос
+                    print(f"Hotfolder: Benachrichtigungen unterbrochen ({e}), verwende Abfrage")
+                    self.native = False
+                    self._rescan(full=True)
+                return
+            
+            if not changes:
+                # Переполнение буфера событий - один полный проход
+                self._rescan(full=True)
+                continue
+            
+            for action, name in changes:
+                path = os.path.join(self.directory, name)
+                if action == 2:  # FILE_ACTION_REMOVED
+                    with self._lock:
+                        self._files.pop(path, None)
+                    continue
+                if os.path.isdir(path):
+                    if action in (1, 5) and self.recursive:  # ADDED / RENAMED_NEW_NAME
+                        self._scan_new_tree(path)
+                    continue
+                if self._is_supported(name):
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    self._candidate(path, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,280 @@
+"""Сборка мелких макетов (кнопок) на листы: сетка, вылеты и метки реза через PyMuPDF"""
+import os
+
+from autoprint.combined import CombinedJob, run_combined
+
+MM = 72 / 25.4  # пунктов PDF в миллиметре
+
+# Размеры листов в мм (книжная ориентация)
+PAPER_SIZES = {
+    'A4': (210.0, 297.0),
+    'A3': (297.0, 420.0),
+    'SRA3': (320.0, 450.0),
+    'Letter': (215.9, 279.4),
+}
+
+DEFAULT_CELL_MM = (59.0, 59.0)  # кнопка 56 мм с загибом
+
+
+class Layout:
+    """Сетка на листе; размеры в мм: ячейка - формат обреза, вылет добавляется вокруг неё"""
+    
+    def __init__(self, paper="A4", cell_mm=None, grid=None, bleed_mm=2.0, gap_mm=4.0, margin_mm=8.0,
+                 marks_mm=3.0, landscape=False):
+        if paper not in PAPER_SIZES:
+            raise ValueError(f"Unbekanntes Papierformat: {paper}")
+        if gap_mm < 2 * bleed_mm:
+            raise ValueError("Abstand muss mindestens doppelt so groß wie der Beschnitt sein")
+        self.paper = paper
+        self.landscape = landscape
+        self.bleed_mm = bleed_mm
+        self.gap_mm = gap_mm
+        self.margin_mm = margin_mm
+        # Длина меток реза; 0 - без меток
+        self.marks_mm = marks_mm
+        
+        width, height = PAPER_SIZES[paper]
+        if landscape:
+            width, height = height, width
+        self.sheet_mm = (width, height)
+        area = (width - 2 * margin_mm, height - 2 * margin_mm)
+        
+        # Задана ли сетка явно: иначе она выводится из размера ячейки
+        self.grid = tuple(grid) if grid else None
+        if grid:
+            # Сетка задана: ячейка - всё, что помещается после промежутков
+            self.cols, self.rows = grid
+            self.cell_mm = tuple(
+                (size - (count - 1) * gap_mm) / count for size, count in zip(area, grid)
+            )
+        else:
+            self.cell_mm = tuple(cell_mm or DEFAULT_CELL_MM)
+            self.cols, self.rows = (
+                int((size + gap_mm) // (cell + gap_mm)) for size, cell in zip(area, self.cell_mm)
+            )
+        if self.cols < 1 or self.rows < 1 or min(self.cell_mm) <= 0:
+            raise ValueError("Motiv passt nicht auf den Bogen")
+        self.cells = self._cells()
+    
+    @property
+    def per_sheet(self):
+        return self.cols * self.rows
+    
+    @property
+    def sheet_size(self):
+        """Размер листа в пунктах"""
+        return self.sheet_mm[0] * MM, self.sheet_mm[1] * MM
+    
+    def _cells(self):
+        """Прямоугольники обреза в пунктах по строкам; сетка по центру листа"""
+        cell_width, cell_height = self.cell_mm
+        used_width = self.cols * cell_width + (self.cols - 1) * self.gap_mm
+        used_height = self.rows * cell_height + (self.rows - 1) * self.gap_mm
+        left = (self.sheet_mm[0] - used_width) / 2
+        top = (self.sheet_mm[1] - used_height) / 2
+        cells = []
+        for row in range(self.rows):
+            y = top + row * (cell_height + self.gap_mm)
+            for col in range(self.cols):
+                x = left + col * (cell_width + self.gap_mm)
+                cells.append((x * MM, y * MM, (x + cell_width) * MM, (y + cell_height) * MM))
+        return cells
+    
+    def as_dict(self):
+        return {
+            'paper': self.paper,
+            'cell_mm': list(self.cell_mm),
+            'grid': list(self.grid) if self.grid else None,
+            'bleed_mm': self.bleed_mm,
+            'gap_mm': self.gap_mm,
+            'margin_mm': self.margin_mm,
+            'marks_mm': self.marks_mm,
+            'landscape': self.landscape,
+        }
+    
+    @classmethod
+    def from_config(cls, config):
+        """Из словаря конфигурации; grid важнее cell_mm, если заданы оба"""
+        config = dict(config or {})
+        grid = config.get('grid')
+        return cls(
+            paper=config.get('paper', "A4"),
+            cell_mm=None if grid else config.get('cell_mm'),
+            grid=tuple(grid) if grid else None,
+            bleed_mm=config.get('bleed_mm', 2.0),
+            gap_mm=config.get('gap_mm', 4.0),
+            margin_mm=config.get('margin_mm', 8.0),
+            marks_mm=config.get('marks_mm', 3.0),
+            landscape=config.get('landscape', False),
+        )
+
+
+def compute_placements(items, per_sheet):
+    """items: (индекс, путь, копии, страниц[, ...]) -> [(лист, ячейка, индекс, путь, страница)]
+    
+    Копии одной страницы идут подряд, чтобы одинаковые кнопки оказались рядом при резке.
+    """
+    placements = []
+    append = placements.append
+    position = 0
+    for index, path, copies, pages, *_ in items:
+        for page in range(pages):
+            for _ in range(copies):
+                sheet, slot = divmod(position, per_sheet)
+                append((sheet, slot, index, path, page))
+                position += 1
+    return placements
+
+
+def impose(items, layout, directory, sheets_per_job=50, title="Sammelbogen"):
+    """Рисует листы в PDF по sheets_per_job листов на файл; возвращает [CombinedJob]
+    
+    Картинка вставляется через PyMuPDF один раз на лист, остальные её ячейки и метки
+    реза дописываются в поток содержимого напрямую: insert_image на каждую ячейку
+    заново разбирает ресурсы страницы и на тысячах ячеек становится основной тратой.
+    """
+    import fitz
+    placements = compute_placements(items, layout.per_sheet)
+    if not placements:
+        return []
+    width, height = layout.sheet_size
+    bleed = layout.bleed_mm * MM
+    marks = _marks_ops(layout)
+    sources = {}
+    imposed = []
+    doc = None
+    try:
+        for first in range(0, len(placements), layout.per_sheet * sheets_per_job):
+            chunk = placements[first:first + layout.per_sheet * sheets_per_job]
+            doc = fitz.open()
+            images = {}  # путь -> xref картинки в этом файле: одна кнопка хранится один раз
+            counts = {}
+            ranges = {}  # индекс -> (первый, последний) лист в этом файле
+            for start in range(0, len(chunk), layout.per_sheet):
+                page = doc.new_page(width=width, height=height)
+                names = {}  # путь -> (имя в ресурсах листа, ширина, высота)
+                ops = []
+                for sheet, slot, index, path, number in chunk[start:start + layout.per_sheet]:
+                    x0, y0, x1, y1 = layout.cells[slot]
+                    rect = fitz.Rect(x0 - bleed, y0 - bleed, x1 + bleed, y1 + bleed)
+                    if path.lower().endswith('.pdf'):
+                        source = sources.get(path)
+                        if source is None:
+                            source = sources[path] = fitz.open(path)
+                        page.show_pdf_page(rect, source, number)
+                    elif path in names:
+                        ops.append(_image_ops(rect, height, *names[path]))
+                    else:
+                        if path in images:
+                            page.insert_image(rect, xref=images[path])
+                        else:
+                            images[path] = page.insert_image(rect, filename=path)
+                        names[path] = _image_resource(page, images[path])
+                    counts[index] = counts.get(index, 0) + 1
+                    page_number = sheet - chunk[0][0] + 1
+                    ranges[index] = (ranges.get(index, (page_number,))[0], page_number)
+                ops.append(marks)
+                _append_contents(doc, page, b"".join(ops))
+            
+            path = os.path.join(directory, f"{title}_{chunk[0][0] + 1:04d}-{chunk[-1][0] + 1:04d}.pdf")
+            doc.save(path, deflate=True, garbage=1)
+            doc.close()
+            doc = None
+            imposed.append(CombinedJob(path, chunk[-1][0] - chunk[0][0] + 1, counts, ranges))
+    finally:
+        if doc is not None:
+            doc.close()
+        for source in sources.values():
+            source.close()
+    return imposed
+
+
+def _image_resource(page, xref):
+    """Имя картинки в ресурсах листа и её размер в пикселях"""
+    for image in page.get_images(full=True):
+        if image[0] == xref:
+            return image[7], image[2], image[3]
+    raise RuntimeError(f"Bild {xref} fehlt in den Ressourcen des Bogens")
+
+
+def _image_ops(rect, sheet_height, name, image_width, image_height):
+    """Команды PDF для картинки в rect с сохранением пропорций, по центру - как insert_image"""
+    scale = min(rect.width / image_width, rect.height / image_height)
+    width, height = image_width * scale, image_height * scale
+    x = rect.x0 + (rect.width - width) / 2
+    y = sheet_height - rect.y0 - (rect.height + height) / 2
+    return f"q {width:.3f} 0 0 {height:.3f} {x:.3f} {y:.3f} cm /{name} Do Q\n".encode()
+
+
+def _marks_ops(layout):
+    """Метки реза по линиям обреза столбцов и строк на полях вокруг сетки
+    
+    Внутри сетки метки легли бы на вылет соседней ячейки, поэтому только снаружи.
+    Одинаковы для всех листов - строятся один раз.
+    """
+    if not layout.marks_mm:
+        return b""
+    sheet_height = layout.sheet_size[1]
+    offset = layout.bleed_mm * MM + 1
+    length = layout.marks_mm * MM
+    cells = layout.cells
+    left, top = cells[0][0], cells[0][1]
+    right, bottom = cells[-1][2], cells[-1][3]
+    lines = []
+    for cell in cells[:layout.cols]:
+        for x in (cell[0], cell[2]):
+            lines.append((x, top - offset - length, x, top - offset))
+            lines.append((x, bottom + offset, x, bottom + offset + length))
+    for cell in cells[::layout.cols]:
+        for y in (cell[1], cell[3]):
+            lines.append((left - offset - length, y, left - offset, y))
+            lines.append((right + offset, y, right + offset + length, y))
+    ops = ["q 0 G 0.25 w"]
+    for x0, y0, x1, y1 in lines:
+        ops.append(f"{x0:.3f} {sheet_height - y0:.3f} m {x1:.3f} {sheet_height - y1:.3f} l S")
+    ops.append("Q\n")
+    return "\n".join(ops).encode()
+
+
+def _append_contents(doc, page, ops):
+    """Дописывает команды в последний поток содержимого листа"""
+    if not ops:
+        return
+    xref = page.get_contents()[-1]
+    doc.update_stream(xref, doc.xref_stream(xref) + b"\n" + ops)
+
+
+def run_imposed(run, jobs, layout, directory=None, on_job_start=None, on_job_state=None, status=None,
+                sheets_per_job=50, controls=None):
+    """Собирает (путь, копии[, принтер]) на листы и печатает их через run
+    
+    Задания с отдельным принтером собираются на свои листы; лист считается готовым для
+    всех кнопок на нём. Остальное - как в run_combined, статистика в summary['imposed'].
+    """
+    stats = {'per_sheet': layout.per_sheet}
+    
+    def build(items, directory):
+        if status:
+            status(f"▦ Erstelle Sammelbögen ({layout.cols}x{layout.rows} pro {layout.paper})...")
+        stats['placements'] = sum(copies * pages for _, _, copies, pages, _ in items)
+        groups = {}  # принтер -> items; порядок - по первому заданию принтера
+        for item in items:
+            groups.setdefault(item[4], []).append(item)
+        imposed = []
+        for number, (printer, group) in enumerate(groups.items()):
+            title = f"Sammelbogen{number + 1}" if len(groups) > 1 else "Sammelbogen"
+            for job in impose(group, layout, directory, sheets_per_job, title):
+                job.printer = printer
+                imposed.append(job)
+        return imposed
+    
+    summary = run_combined(
+        run, jobs, build, 'imposed', "Sammelbogen",
+        directory=directory,
+        on_job_start=on_job_start,
+        on_job_state=on_job_state,
+        status=status,
+        controls=controls
+    )
+    summary['imposed'].update(stats)
+    return summary
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""Фоновый обход папок: параллельный scandir по подпапкам, пачки файлов, отмена"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from autoprint import SUPPORTED_EXTENSIONS
+
+
+def scan_directory(directory, extensions=SUPPORTED_EXTENSIONS):
+    """Одна папка: (файлы, подпапки); фильтр по имени, без stat на файл"""
+    files = []
+    subdirs = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # is_dir() на Windows и SMB берётся из данных FindNextFile, без запроса к серверу
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif os.path.splitext(entry.name)[1].lower() in extensions:
+                files.append(entry.path)
+    files.sort()
+    subdirs.sort()
+    return files, subdirs
+
+
+class DirectoryIngest:
+    """Обходит папки в пуле потоков и отдаёт найденные файлы пачками в on_batch(paths)
+    
+    Папки сканируются параллельно, но файлы отдаются в порядке обхода в глубину, как os.walk:
+    файлы папки по имени, затем подпапки по имени. Отсканированное раньше очереди ждёт в памяти.
+    """
+    
+    def __init__(self, roots, on_batch, batch_size=500, workers=8, progress_callback=None,
+                 progress_interval=0.25, extensions=SUPPORTED_EXTENSIONS):
+        self.roots = [roots] if isinstance(roots, str) else list(roots)
+        self.on_batch = on_batch
+        self.batch_size = batch_size
+        # Сетевой диск упирается в задержку, а не в CPU: несколько запросов параллельно
+        self.workers = workers
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self.extensions = extensions
+        
+        self._cancel = threading.Event()
+        self._thread = None
+        self.summary = None
+    
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+    
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def cancel(self):
+        """Останавливает обход; уже отданные пачки остаются в очереди"""
+        self._cancel.set()
+    
+    def start(self, on_done=None):
+        """Запускает обход в фоновом потоке; on_done(summary) по завершении"""
+        def worker():
+            summary = self.run()
+            if on_done:
+                on_done(summary)
+        
+        self._thread = threading.Thread(target=worker, daemon=True)
+        self._thread.start()
+    
+    def run(self):
+        """Синхронный обход; возвращает сводку"""
+        started = time.perf_counter()
+        summary = {
+            'roots': self.roots,
+            'files': 0,
+            'directories': 0,
+            'pending': 0,
+            'errors': [],
+            'cancelled': False,
+        }
+        batch = []
+        last_progress = 0.0
+        # Папки в порядке выдачи (вершина стека - следующая) и уже отсканированные: папка -> результат
+        order = list(reversed(self.roots))
+        scanned = {}
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest") as pool:
+            running = {pool.submit(scan_directory, root, self.extensions): root for root in self.roots}
+            while running and not self._cancel.is_set():
+                done, _ = wait(running, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if self._cancel.is_set():
+                        break
+                    directory = running.pop(future)
+                    summary['directories'] += 1
+                    try:
+                        scanned[directory] = future.result()
+                    except OSError as e:
+                        summary['errors'].append({'directory': directory, 'error': str(e)})
+                        scanned[directory] = ([], [])
+                        continue
+                    for subdir in scanned[directory][1]:
+                        running[pool.submit(scan_directory, subdir, self.extensions)] = subdir
+                
+                # Отдаём по порядку всё, до чего дошла очередь: подпапки уже сканируются в пуле
+                while order and order[-1] in scanned and not self._cancel.is_set():
+                    files, subdirs = scanned.pop(order.pop())
+                    order.extend(reversed(subdirs))
+                    batch.extend(files)
+                    if len(batch) >= self.batch_size:
+                        summary['files'] += self._flush(batch)
+                        batch = []
+                
+                summary['pending'] = len(running)
+                now = time.perf_counter()
+                if self.progress_callback and now - last_progress >= self.progress_interval:
+                    last_progress = now
+                    self.progress_callback(dict(summary, files=summary['files'] + len(batch)))
+            
+            if self._cancel.is_set():
+                for future in running:
+                    future.cancel()
+        
+        summary['cancelled'] = self._cancel.is_set()
+        if not summary['cancelled']:
+            summary['files'] += self._flush(batch)
+        summary['pending'] = 0
+        summary['seconds'] = round(time.perf_counter() - started, 3)
+        self.summary = summary
+        return summary
+    
+    def _flush(self, batch):
+        if batch:
+            self.on_batch(batch)
+        return len(batch)
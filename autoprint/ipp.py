@@ -0,0 +1,667 @@
+"""IPP/1.1 поверх HTTP: кодирование сообщений, клиент с keep-alive и локальный принтер-заглушка"""
+import os
+import re
+import time
+import queue
+import struct
+import argparse
+import itertools
+import threading
+import http.client
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+IPP_PORT = 631
+CHUNK_SIZE = 1024 * 1024
+# Дольше простаивавшее соединение для Print-Job/Send-Document не берём: принтер мог его уже закрыть
+KEEPALIVE_SECONDS = 5.0
+
+# Операции
+PRINT_JOB = 0x0002
+CREATE_JOB = 0x0005
+SEND_DOCUMENT = 0x0006
+CANCEL_JOB = 0x0008
+GET_JOB_ATTRIBUTES = 0x0009
+GET_JOBS = 0x000A
+GET_PRINTER_ATTRIBUTES = 0x000B
+
+# После отправки этих запросов повтор может создать второе задание
+NON_IDEMPOTENT = (PRINT_JOB, CREATE_JOB, SEND_DOCUMENT)
+
+# Группы атрибутов
+OPERATION_GROUP = 0x01
+JOB_GROUP = 0x02
+END_TAG = 0x03
+PRINTER_GROUP = 0x04
+UNSUPPORTED_GROUP = 0x05
+
+# Типы значений
+TAG_NO_VALUE = 0x13
+TAG_INTEGER = 0x21
+TAG_BOOLEAN = 0x22
+TAG_ENUM = 0x23
+TAG_OCTETS = 0x30
+TAG_DATETIME = 0x31
+TAG_RESOLUTION = 0x32
+TAG_RANGE = 0x33
+TAG_BEGIN_COLLECTION = 0x34
+TAG_END_COLLECTION = 0x37
+TAG_TEXT = 0x41
+TAG_NAME = 0x42
+TAG_KEYWORD = 0x44
+TAG_URI = 0x45
+TAG_CHARSET = 0x47
+TAG_LANGUAGE = 0x48
+TAG_MIME = 0x49
+
+# Состояния принтера (printer-state)
+PRINTER_IDLE = 3
+PRINTER_PROCESSING = 4
+PRINTER_STOPPED = 5
+
+# Состояния задания (job-state)
+JOB_PENDING = 3
+JOB_HELD = 4
+JOB_PROCESSING = 5
+JOB_STOPPED = 6
+JOB_CANCELED = 7
+JOB_ABORTED = 8
+JOB_COMPLETED = 9
+
+# multiple-document-handling: копии разобранными экземплярами или каждая страница подряд
+COLLATED_COPIES = "separate-documents-collated-copies"
+UNCOLLATED_COPIES = "separate-documents-uncollated-copies"
+
+STATUS_OK = 0x0000
+STATUS_BAD_REQUEST = 0x0400
+STATUS_NOT_FOUND = 0x0406
+STATUS_OPERATION_NOT_SUPPORTED = 0x0501
+
+DOCUMENT_FORMATS = {
+    '.pdf': "application/pdf",
+    '.ps': "application/postscript",
+    '.jpg': "image/jpeg",
+    '.jpeg': "image/jpeg",
+    '.png': "image/png",
+    '.bmp': "image/bmp",
+}
+OCTET_STREAM = "application/octet-stream"
+
+
+class IppError(RuntimeError):
+    def __init__(self, message, status=None):
+        RuntimeError.__init__(self, message)
+        self.status = status
+
+
+def parse_printers(spec):
+    """'Name=ipp://host[:port]/pfad;Name2=host' (или список/словарь) -> {имя: uri}"""
+    if not spec:
+        return {}
+    if isinstance(spec, dict):
+        items = list(spec.items())
+    else:
+        if isinstance(spec, str):
+            spec = spec.split(";")
+        items = []
+        for part in spec:
+            part = part.strip()
+            if not part:
+                continue
+            if "=" not in part:
+                raise ValueError(f"IPP-Drucker erwartet Name=URI: {part}")
+            items.append(tuple(item.strip() for item in part.split("=", 1)))
+    
+    printers = {}
+    for name, uri in items:
+        if "://" not in uri:
+            # Только адрес: стандартный путь IPP Everywhere
+            uri = f"ipp://{uri}/ipp/print"
+        printers[name] = uri
+    return printers
+
+
+def document_format(file_path):
+    return DOCUMENT_FORMATS.get(os.path.splitext(str(file_path))[1].lower(), OCTET_STREAM)
+
+
+def _encode_value(tag, value):
+    if tag in (TAG_INTEGER, TAG_ENUM):
+        return struct.pack(">i", value)
+    if tag == TAG_BOOLEAN:
+        return b"\x01" if value else b"\x00"
+    if tag == TAG_RESOLUTION:
+        return struct.pack(">iib", *value)
+    if tag == TAG_RANGE:
+        return struct.pack(">ii", *value)
+    if tag == TAG_NO_VALUE:
+        return b""
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode('utf-8')
+
+
+def _decode_value(tag, data):
+    if tag in (TAG_INTEGER, TAG_ENUM) and len(data) == 4:
+        return struct.unpack(">i", data)[0]
+    if tag == TAG_BOOLEAN:
+        return data != b"\x00"
+    if tag == TAG_RESOLUTION and len(data) == 9:
+        return struct.unpack(">iib", data)
+    if tag == TAG_RANGE and len(data) == 8:
+        return struct.unpack(">ii", data)
+    if tag in (TAG_OCTETS, TAG_DATETIME) or tag < 0x20:
+        return data
+    return data.decode('utf-8', errors='replace')
+
+
+def encode_message(code, request_id, groups):
+    """code - операция (запрос) или статус (ответ); groups - [(группа, [(тег, имя, значение или список)])]"""
+    out = bytearray(struct.pack(">BBHi", 1, 1, code, request_id))
+    for group_tag, attributes in groups:
+        out.append(group_tag)
+        for tag, name, value in attributes:
+            values = value if isinstance(value, list) else [value]
+            for i, item in enumerate(values):
+                # Дополнительные значения того же атрибута идут с пустым именем
+                name_bytes = name.encode('ascii') if i == 0 else b""
+                data = _encode_value(tag, item)
+                out += struct.pack(">BH", tag, len(name_bytes)) + name_bytes
+                out += struct.pack(">H", len(data)) + data
+    out.append(END_TAG)
+    return bytes(out)
+
+
+class IppMessage:
+    """Разобранное сообщение: группы - список (тег, {имя: [значения]}), data - документ после атрибутов"""
+    __slots__ = ('code', 'request_id', 'groups', 'data')
+    
+    def __init__(self, code, request_id, groups, data=b""):
+        self.code = code
+        self.request_id = request_id
+        self.groups = groups
+        self.data = data
+    
+    @property
+    def ok(self):
+        return self.code < 0x0100
+    
+    def group(self, tag):
+        """Первая группа с этим тегом (пустой словарь, если её нет)"""
+        return next((attributes for group_tag, attributes in self.groups if group_tag == tag), {})
+    
+    def groups_of(self, tag):
+        return [attributes for group_tag, attributes in self.groups if group_tag == tag]
+
+
+def first(attributes, name, default=None):
+    values = attributes.get(name)
+    return values[0] if values else default
+
+
+def decode_message(buffer):
+    try:
+        _, _, code, request_id = struct.unpack_from(">BBHi", buffer, 0)
+        position = 8
+        groups = []
+        current = None
+        name = None
+        depth = 0
+        while True:
+            tag = buffer[position]
+            position += 1
+            if tag == END_TAG:
+                break
+            if tag < 0x10:
+                current = {}
+                groups.append((tag, current))
+                continue
+            name_length = struct.unpack_from(">H", buffer, position)[0]
+            position += 2
+            attribute = bytes(buffer[position:position + name_length]).decode('ascii', errors='replace')
+            position += name_length
+            value_length = struct.unpack_from(">H", buffer, position)[0]
+            position += 2
+            data = bytes(buffer[position:position + value_length])
+            position += value_length
+            if current is None:
+                raise ValueError("Attribut ohne Gruppe")
+            
+            # Коллекции (media-col и т.п.) не нужны: запоминаем только имя и пропускаем содержимое
+            if tag == TAG_BEGIN_COLLECTION:
+                if depth == 0 and attribute:
+                    name = attribute
+                    current.setdefault(name, [])
+                depth += 1
+                continue
+            if depth:
+                if tag == TAG_END_COLLECTION:
+                    depth -= 1
+                continue
+            if attribute:
+                name = attribute
+                current.setdefault(name, [])
+            if name is not None:
+                current[name].append(_decode_value(tag, data))
+    except (IndexError, struct.error) as e:
+        raise ValueError(f"IPP-Nachricht beschädigt: {e}")
+    return IppMessage(code, request_id, groups, buffer[position:])
+
+
+def _stream(message, document):
+    """Тело запроса: атрибуты, затем документ кусками - файл целиком в память не читается"""
+    yield message
+    if document is None:
+        return
+    if isinstance(document, (bytes, bytearray, memoryview)):
+        yield bytes(document)
+        return
+    with open(document, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+class IppConnection:
+    """Одно HTTP/1.1 соединение keep-alive к принтеру"""
+    
+    def __init__(self, uri, timeout=60.0):
+        parts = urllib.parse.urlsplit(uri)
+        self.path = parts.path or "/"
+        port = parts.port or IPP_PORT
+        if parts.scheme in ("ipps", "https"):
+            self.connection = http.client.HTTPSConnection(parts.hostname, port, timeout=timeout)
+        else:
+            self.connection = http.client.HTTPConnection(parts.hostname, port, timeout=timeout)
+        self.requests = 0
+        self.idle_since = time.monotonic()
+    
+    def post(self, message, document=None, idempotent=True):
+        """Отправляет запрос; тело без Content-Length уходит chunked
+        
+        В новом соединении повторяется только запрос, который не ушёл целиком, или повторяемая
+        операция: Print-Job, обрыв после отправки которого принтер мог уже принять, не повторяется.
+        """
+        for attempt in range(2):
+            retry = self.requests and attempt == 0
+            try:
+                self.connection.request(
+                    "POST", self.path, _stream(message, document), {"Content-Type": "application/ipp"}
+                )
+            except (ConnectionResetError, BrokenPipeError):
+                # Принтер закрыл простаивавшее соединение: запрос целиком не дошёл, повторяем в новом
+                self.connection.close()
+                if retry:
+                    self.requests = 0
+                    continue
+                raise
+            try:
+                response = self.connection.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError) as e:
+                self.connection.close()
+                if retry and idempotent:
+                    self.requests = 0
+                    continue
+                if not idempotent:
+                    raise IppError(f"Verbindung nach dem Senden getrennt, Auftrag evtl. angenommen: {e}") from e
+                raise
+            self.requests += 1
+            self.idle_since = time.monotonic()
+            if response.status != 200:
+                raise IppError(f"HTTP {response.status} {response.reason}")
+            return decode_message(data)
+    
+    def close(self):
+        self.connection.close()
+
+
+class IppClient:
+    """Клиент одного принтера: до connections запросов одновременно, соединения переиспользуются"""
+    
+    def __init__(self, uri, connections=4, timeout=60.0, user="autoprint"):
+        self.uri = uri
+        self.timeout = timeout
+        self.user = user
+        self.opened = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(connections)
+        self._request_ids = itertools.count(1)
+    
+    def request(self, operation, attributes=(), job_attributes=(), document=None):
+        groups = [(OPERATION_GROUP, [
+            (TAG_CHARSET, "attributes-charset", "utf-8"),
+            (TAG_LANGUAGE, "attributes-natural-language", "de"),
+            (TAG_URI, "printer-uri", self.uri),
+            (TAG_NAME, "requesting-user-name", self.user),
+        ] + list(attributes))]
+        if job_attributes:
+            groups.append((JOB_GROUP, list(job_attributes)))
+        message = encode_message(operation, next(self._request_ids), groups)
+        
+        self._slots.acquire()
+        try:
+            idempotent = operation not in NON_IDEMPOTENT
+            try:
+                connection = self._idle.get_nowait()
+                if not idempotent and time.monotonic() - connection.idle_since > KEEPALIVE_SECONDS:
+                    connection.close()
+                    raise queue.Empty
+            except queue.Empty:
+                connection = IppConnection(self.uri, self.timeout)
+                self.opened += 1
+            try:
+                response = connection.post(message, document, idempotent)
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                raise
+            self._idle.put(connection)
+        finally:
+            self._slots.release()
+        
+        if not response.ok:
+            message = first(response.group(OPERATION_GROUP), "status-message", "")
+            raise IppError(f"IPP-Fehler 0x{response.code:04x} {message}".strip(), response.code)
+        return response
+    
+    def print_job(self, document, copies=1, name=None, format=OCTET_STREAM, collate=False):
+        """Print-Job: атрибуты и документ одним запросом; возвращает job-id"""
+        response = self.request(PRINT_JOB, [
+            (TAG_NAME, "job-name", name or "AutoPrint"),
+            (TAG_MIME, "document-format", format),
+        ], self._job_template(copies, collate), document)
+        return first(response.group(JOB_GROUP), "job-id")
+    
+    def create_job(self, copies=1, name=None, collate=False):
+        response = self.request(
+            CREATE_JOB, [(TAG_NAME, "job-name", name or "AutoPrint")], self._job_template(copies, collate)
+        )
+        return first(response.group(JOB_GROUP), "job-id")
+    
+    def send_document(self, job_id, document, format=OCTET_STREAM, last=True):
+        self.request(SEND_DOCUMENT, [
+            (TAG_INTEGER, "job-id", job_id),
+            (TAG_MIME, "document-format", format),
+            (TAG_BOOLEAN, "last-document", last),
+        ], document=document)
+    
+    def _job_template(self, copies, collate=False):
+        """Копии в тикете задания; collate - разобранными экземплярами, а не каждая страница подряд"""
+        if copies <= 1:
+            return []
+        template = [(TAG_INTEGER, "copies", copies)]
+        if collate:
+            template.append((TAG_KEYWORD, "multiple-document-handling", COLLATED_COPIES))
+        return template
+    
+    def cancel_job(self, job_id):
+        self.request(CANCEL_JOB, [(TAG_INTEGER, "job-id", job_id)])
+    
+    def get_jobs(self, which="not-completed"):
+        """Задания принтера: {job-id: атрибуты с одиночными значениями}"""
+        response = self.request(GET_JOBS, [
+            (TAG_KEYWORD, "which-jobs", which),
+            (TAG_KEYWORD, "requested-attributes", ["job-id", "job-state", "job-name"]),
+        ])
+        jobs = {}
+        for attributes in response.groups_of(JOB_GROUP):
+            job = {name: values[0] if values else None for name, values in attributes.items()}
+            if job.get("job-id") is not None:
+                jobs[job["job-id"]] = job
+        return jobs
+    
+    def get_job(self, job_id):
+        response = self.request(GET_JOB_ATTRIBUTES, [
+            (TAG_INTEGER, "job-id", job_id),
+            (TAG_KEYWORD, "requested-attributes", ["job-id", "job-state", "job-state-reasons"]),
+        ])
+        return {name: values[0] if values else None for name, values in response.group(JOB_GROUP).items()}
+    
+    def get_printer_attributes(self, requested=None):
+        """Атрибуты принтера: {имя: [значения]}"""
+        attributes = []
+        if requested:
+            attributes.append((TAG_KEYWORD, "requested-attributes", list(requested)))
+        return self.request(GET_PRINTER_ATTRIBUTES, attributes).group(PRINTER_GROUP)
+    
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class IppStubServer:
+    """Локальный IPP-принтер для проверок и замеров: задания печатаются по print_seconds на страницу"""
+    
+    def __init__(self, host="127.0.0.1", port=0, print_seconds=0.0, latency=0.0, name="AutoPrint-Stub",
+                 max_copies=999):
+        self.host = host
+        self.port = port
+        self.name = name
+        self.print_seconds = print_seconds
+        # copies-supported: 1 - принтер без своих копий
+        self.max_copies = max_copies
+        # Задержка ответа: сеть и разбор запроса принтером
+        self.latency = latency
+        # Сколько следующих запросов обработать и оборвать соединение без ответа, как сбойный принтер
+        self.drop_responses = 0
+        self.requests = 0
+        self.connections = 0
+        self.jobs = {}
+        self._busy_until = 0.0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+    
+    @property
+    def uri(self):
+        return f"ipp://{self.host}:{self.port}/ipp/print"
+    
+    def start(self):
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Заголовки и тело ответа пишутся отдельно: с Nagle каждый ответ ждал бы отложенный ACK
+            disable_nagle_algorithm = True
+            
+            def setup(self):
+                BaseHTTPRequestHandler.setup(self)
+                with stub._lock:
+                    stub.connections += 1
+            
+            def do_POST(self):
+                body = self._read_body()
+                if stub.latency:
+                    time.sleep(stub.latency)
+                try:
+                    response = stub.handle(decode_message(body))
+                except ValueError:
+                    response = encode_message(STATUS_BAD_REQUEST, 0, [(OPERATION_GROUP, [])])
+                with stub._lock:
+                    drop = stub.drop_responses > 0
+                    if drop:
+                        stub.drop_responses -= 1
+                if drop:
+                    self.close_connection = True
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/ipp")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+            
+            def _read_body(self):
+                if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+                    return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                body = bytearray()
+                while True:
+                    size = int(self.rfile.readline().split(b";", 1)[0].strip() or b"0", 16)
+                    if not size:
+                        # Конец тела: пропускаем трейлеры до пустой строки
+                        while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                            pass
+                        return body
+                    body += self.rfile.read(size)
+                    self.rfile.readline()
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def handle(self, request):
+        with self._lock:
+            self.requests += 1
+        operation = request.group(OPERATION_GROUP)
+        groups = [(OPERATION_GROUP, [
+            (TAG_CHARSET, "attributes-charset", "utf-8"),
+            (TAG_LANGUAGE, "attributes-natural-language", "de"),
+        ])]
+        status = STATUS_OK
+        if request.code == PRINT_JOB:
+            job = self._new_job(request)
+            self._receive(job, request.data)
+            groups.append(self._job_group(job))
+        elif request.code == CREATE_JOB:
+            groups.append(self._job_group(self._new_job(request)))
+        elif request.code == SEND_DOCUMENT:
+            job = self.jobs.get(first(operation, "job-id"))
+            if job is None:
+                status = STATUS_NOT_FOUND
+            else:
+                job['format'] = first(operation, "document-format", job['format'])
+                self._receive(job, request.data)
+                groups.append(self._job_group(job))
+        elif request.code == CANCEL_JOB:
+            job = self.jobs.get(first(operation, "job-id"))
+            if job is None:
+                status = STATUS_NOT_FOUND
+            else:
+                job['canceled'] = True
+        elif request.code == GET_JOB_ATTRIBUTES:
+            job = self.jobs.get(first(operation, "job-id"))
+            if job is None:
+                status = STATUS_NOT_FOUND
+            else:
+                groups.append(self._job_group(job))
+        elif request.code == GET_JOBS:
+            completed = first(operation, "which-jobs", "not-completed") == "completed"
+            for job in list(self.jobs.values()):
+                if (self._job_state(job) >= JOB_CANCELED) == completed:
+                    groups.append(self._job_group(job))
+        elif request.code == GET_PRINTER_ATTRIBUTES:
+            groups.append((PRINTER_GROUP, self._printer_attributes()))
+        else:
+            status = STATUS_OPERATION_NOT_SUPPORTED
+        return encode_message(status, request.request_id, groups)
+    
+    def _new_job(self, request):
+        operation = request.group(OPERATION_GROUP)
+        with self._lock:
+            job = {
+                'id': next(self._ids),
+                'name': first(operation, "job-name", ""),
+                'format': first(operation, "document-format", OCTET_STREAM),
+                'copies': first(request.group(JOB_GROUP), "copies", 1),
+                'bytes': 0,
+                'pages': 0,
+                'start': None,
+                'done': None,
+                'canceled': False,
+            }
+            self.jobs[job['id']] = job
+        return job
+    
+    def _receive(self, job, data):
+        # Страницы PDF считаем по объектам /Type /Page, остальное - одна страница
+        pages = len(re.findall(rb"/Type\s*/Page(?!s)", data)) or 1
+        with self._lock:
+            job['bytes'] += len(data)
+            job['pages'] += pages
+            job['start'] = max(time.monotonic(), self._busy_until)
+            job['done'] = job['start'] + self.print_seconds * job['pages'] * job['copies']
+            self._busy_until = job['done']
+    
+    def _job_state(self, job):
+        if job['canceled']:
+            return JOB_CANCELED
+        if job['start'] is None:
+            return JOB_HELD
+        now = time.monotonic()
+        if now < job['start']:
+            return JOB_PENDING
+        if now < job['done']:
+            return JOB_PROCESSING
+        return JOB_COMPLETED
+    
+    def _job_group(self, job):
+        return (JOB_GROUP, [
+            (TAG_INTEGER, "job-id", job['id']),
+            (TAG_URI, "job-uri", f"{self.uri}/{job['id']}"),
+            (TAG_ENUM, "job-state", self._job_state(job)),
+            (TAG_NAME, "job-name", job['name']),
+        ])
+    
+    def _printer_attributes(self):
+        states = [self._job_state(job) for job in list(self.jobs.values())]
+        return [
+            (TAG_NAME, "printer-name", self.name),
+            (TAG_ENUM, "printer-state", PRINTER_PROCESSING if JOB_PROCESSING in states else PRINTER_IDLE),
+            (TAG_KEYWORD, "printer-state-reasons", "none"),
+            (TAG_BOOLEAN, "printer-is-accepting-jobs", True),
+            (TAG_INTEGER, "queued-job-count", sum(1 for state in states if state < JOB_CANCELED)),
+            (TAG_MIME, "document-format-supported", sorted(set(DOCUMENT_FORMATS.values())) + [OCTET_STREAM]),
+            (TAG_RANGE, "copies-supported", (1, self.max_copies)),
+            (TAG_KEYWORD, "multiple-document-handling-supported", [COLLATED_COPIES, UNCOLLATED_COPIES]),
+            (TAG_INTEGER, "copies-default", 1),
+            (TAG_KEYWORD, "media-default", "iso_a4_210x297mm"),
+            (TAG_ENUM, "orientation-requested-default", 3),
+            (TAG_RESOLUTION, "printer-resolution-default", (600, 600, 3)),
+            (TAG_BOOLEAN, "color-supported", True),
+            (TAG_KEYWORD, "sides-supported", ["one-sided", "two-sided-long-edge"]),
+            (TAG_ENUM, "operations-supported", [
+                PRINT_JOB, CREATE_JOB, SEND_DOCUMENT, CANCEL_JOB, GET_JOB_ATTRIBUTES, GET_JOBS,
+                GET_PRINTER_ATTRIBUTES,
+            ]),
+        ]
+
+
+def main(argv=None):
+    """python -m autoprint.ipp: IPP-заглушка для проверки бэкенда без принтера"""
+    parser = argparse.ArgumentParser(description="Lokaler IPP-Drucker (Stub) zum Testen")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=IPP_PORT)
+    parser.add_argument("--print-seconds", type=float, default=0.0, help="Simulierte Sekunden pro Seite")
+    parser.add_argument("--latency", type=float, default=0.0, help="Antwortverzögerung in Sekunden")
+    args = parser.parse_args(argv)
+    
+    stub = IppStubServer(args.host, args.port, args.print_seconds, args.latency).start()
+    print(f"IPP-Stub: {stub.uri}")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
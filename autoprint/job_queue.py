@@ -0,0 +1,196 @@
+"""Очередь заданий печати: O(1) добавление, поиск и удаление по стабильному id"""
+import time
+import threading
+
+# Что делать, если файл уже стоит в очереди
+DUPLICATES_SKIP = "skip"  # не добавлять второй раз (как раньше)
+DUPLICATES_ALLOW = "allow"  # отдельное задание со своими копиями
+DUPLICATES_MERGE = "merge"  # прибавить копии к последнему заданию файла
+
+DUPLICATE_POLICIES = (DUPLICATES_SKIP, DUPLICATES_ALLOW, DUPLICATES_MERGE)
+
+MAX_COPIES = 9999
+
+# Приоритет задания: больше - раньше (autoprint.scheduler)
+PRIORITY_NORMAL = 0
+PRIORITY_RUSH = 10
+
+
+def _merge_always(job, apply):
+    apply()
+    return True
+
+
+class Job:
+    """Задание очереди: файл, копии, принтер (None - выбранный в UI), приоритет и пауза"""
+    __slots__ = ('id', 'path', 'copies', 'printer', 'added_at', 'priority', 'paused')
+    
+    def __init__(self, job_id, path, copies=1, printer=None):
+        self.id = job_id
+        self.path = path
+        self.copies = copies
+        self.printer = printer
+        self.added_at = time.monotonic()  # для метрики ожидания в очереди
+        self.priority = PRIORITY_NORMAL
+        self.paused = False
+    
+    def as_tuple(self):
+        """Формат заданий PrintEngine.run: (путь, копии, принтер)"""
+        return self.path, self.copies, self.printer
+    
+    def __repr__(self):
+        return f"Job({self.id}, {self.path!r}, copies={self.copies}, printer={self.printer!r})"
+
+
+class JobQueue:
+    """Упорядоченная очередь на dict: порядок вставки сохраняется, операции по id - O(1)"""
+    
+    def __init__(self, duplicates=DUPLICATES_SKIP, journal=None, merge=None):
+        if duplicates not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unbekannte Duplikat-Regel: {duplicates}")
+        self.duplicates = duplicates
+        # JobJournal или None: каждое изменение очереди уходит в журнал без ожидания диска
+        self.journal = journal
+        # merge(задание, apply) -> bool: вызывает apply(), если к заданию ещё можно прибавить копии
+        # (оно не взято в печать); иначе копии встают отдельным заданием. None - прибавлять всегда
+        self.merge = merge
+        self.lock = threading.RLock()
+        self._jobs = {}  # id -> Job, в порядке добавления
+        self._by_path = {}  # путь -> {id: None}, тоже в порядке добавления
+        self._next_id = 1
+    
+    def __len__(self):
+        return len(self._jobs)
+    
+    def __bool__(self):
+        return bool(self._jobs)
+    
+    def __contains__(self, path):
+        return path in self._by_path
+    
+    def __iter__(self):
+        # Снимок, чтобы очередь можно было менять во время обхода
+        return iter(self.jobs())
+    
+    def jobs(self):
+        with self.lock:
+            return list(self._jobs.values())
+    
+    def snapshot(self):
+        """Задания в формате PrintEngine.run"""
+        with self.lock:
+            return [job.as_tuple() for job in self._jobs.values()]
+    
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+    
+    def find(self, path):
+        """Первое задание для файла или None"""
+        with self.lock:
+            ids = self._by_path.get(path)
+            return self._jobs[next(iter(ids))] if ids else None
+    
+    def first(self):
+        with self.lock:
+            return next(iter(self._jobs.values()), None)
+    
+    def add(self, path, copies=1, printer=None):
+        """Добавляет задание; возвращает новое (или дополненное) задание, None - пропущено"""
+        with self.lock:
+            return self._add(path, copies, printer)
+    
+    def add_many(self, entries):
+        """Добавляет (путь, копии[, принтер]) за один захват блокировки; возвращает новые задания"""
+        added = {}
+        with self.lock:
+            for entry in entries:
+                job = self._add(*entry)
+                if job is not None:
+                    added[job.id] = job
+            return list(added.values())
+    
+    def _add(self, path, copies=1, printer=None):
+        ids = self._by_path.get(path)
+        if ids:
+            if self.duplicates == DUPLICATES_SKIP:
+                return None
+            if self.duplicates == DUPLICATES_MERGE:
+                job = self._jobs[next(reversed(ids))]
+                
+                def apply():
+                    job.copies = min(job.copies + copies, MAX_COPIES)
+                
+                if (self.merge or _merge_always)(job, apply):
+                    if self.journal is not None:
+                        self.journal.copies_changed(job)
+                    return job
+        
+        job = self._insert(Job(self._next_id, path, min(copies, MAX_COPIES), printer))
+        if self.journal is not None:
+            self.journal.added((job,))
+        return job
+    
+    def _insert(self, job):
+        self._jobs[job.id] = job
+        self._by_path.setdefault(job.path, {})[job.id] = None
+        self._next_id = max(self._next_id, job.id + 1)
+        return job
+    
+    def restore(self, entries, next_id=1):
+        """Возвращает задания (id, путь, копии, принтер) из журнала с прежними id; в журнал не пишет"""
+        with self.lock:
+            self._next_id = max(self._next_id, next_id)
+            return [
+                self._insert(Job(job_id, path, copies, printer))
+                for job_id, path, copies, printer in entries if job_id not in self._jobs
+            ]
+    
+    def remove(self, job_id):
+        """Удаляет задание по id; возвращает его или None"""
+        with self.lock:
+            job = self._jobs.pop(job_id, None)
+            if job is not None:
+                ids = self._by_path[job.path]
+                del ids[job_id]
+                if not ids:
+                    del self._by_path[job.path]
+                if self.journal is not None:
+                    self.journal.removed((job_id,))
+            return job
+    
+    def remove_many(self, job_ids):
+        with self.lock:
+            return [job for job in map(self.remove, job_ids) if job is not None]
+    
+    def set_copies(self, job_id, copies):
+        """Меняет копии задания (1..9999); возвращает задание или None"""
+        with self.lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.copies = max(1, min(copies, MAX_COPIES))
+                if self.journal is not None:
+                    self.journal.copies_changed(job)
+            return job
+    
+    def set_priority(self, job_id, priority):
+        """Приоритет задания (в журнал не пишется: после перезапуска - обычный); возвращает задание или None"""
+        with self.lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.priority = priority
+            return job
+    
+    def set_paused(self, job_id, paused):
+        """Приостановленное задание остаётся в очереди, но не печатается до снятия паузы"""
+        with self.lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.paused = paused
+            return job
+    
+    def clear(self):
+        with self.lock:
+            if self.journal is not None:
+                self.journal.removed(list(self._jobs))
+            self._jobs.clear()
+            self._by_path.clear()
@@ -0,0 +1,229 @@
+"""Журнал заданий в SQLite (WAL): очередь переживает падение, незавершённое возвращается при старте"""
+import os
+import time
+import queue
+import sqlite3
+import threading
+
+# Состояния в журнале; промежуточные совпадают с состояниями бэкенда
+STATE_QUEUED = "queued"
+STATE_SENDING = "spooling"
+STATE_SPOOLED = "spooled"
+STATE_PRINTED = "printed"
+STATE_FAILED = "error"
+STATE_MISSING = "missing"
+STATE_REMOVED = "removed"
+
+# Дошли до спулера до падения: повторная печать может дать дубликат
+SENT_STATES = (STATE_SENDING, STATE_SPOOLED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    copies INTEGER NOT NULL,
+    printer TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    job_id INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    at REAL NOT NULL,
+    printer TEXT,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS events_at ON events (at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def default_journal_path():
+    return os.environ.get("AUTOPRINT_JOURNAL", "autoprint_journal.db")
+
+
+class JobJournal:
+    """Таблица jobs повторяет очередь, events - история переходов; запись пачками в фоновом потоке"""
+    
+    def __init__(self, path=None, commit_interval=0.05, max_batch=1000, keep_days=30):
+        self.path = str(path or default_journal_path())
+        # Сколько ждать соседние записи, прежде чем закоммитить пачку
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.keep_days = keep_days
+        self.commits = 0
+        self.records = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._next_id = 1
+        self.error = None
+    
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # В WAL коммит с NORMAL переживает падение процесса; fsync - на контрольной точке
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+    
+    def open(self):
+        """Создаёт схему, чистит старую историю и запускает поток записи; возвращает self"""
+        connection = self._connect()
+        with connection:
+            connection.executescript(SCHEMA)
+            connection.execute(
+                "DELETE FROM events WHERE at < ?", (time.time() - self.keep_days * 86400,)
+            )
+            row = connection.execute(
+                "SELECT MAX(COALESCE((SELECT value FROM meta WHERE key = 'next_id'), 1),"
+                " COALESCE((SELECT MAX(id) FROM jobs), 0) + 1)"
+            ).fetchone()
+        self._next_id = row[0]
+        self._thread = threading.Thread(target=self._loop, args=(connection,), daemon=True)
+        self._thread.start()
+        return self
+    
+    @property
+    def next_id(self):
+        """Первый свободный id: id заданий не повторяются между запусками"""
+        return self._next_id
+    
+    def unfinished(self):
+        """Задания, оставшиеся в очереди: (id, путь, копии, принтер, состояние) по порядку id"""
+        connection = self._connect()
+        try:
+            return connection.execute(
+                "SELECT id, path, copies, printer, state FROM jobs ORDER BY id"
+            ).fetchall()
+        finally:
+            connection.close()
+    
+    def history(self, job_id):
+        """Переходы одного задания: (состояние, время, принтер, подробности)"""
+        self.flush()
+        connection = self._connect()
+        try:
+            return connection.execute(
+                "SELECT state, at, printer, detail FROM events WHERE job_id = ? ORDER BY rowid", (job_id,)
+            ).fetchall()
+        finally:
+            connection.close()
+    
+    # Запись: только кладёт в очередь, вызывающий поток не ждёт диска
+    
+    def added(self, jobs):
+        now = time.time()
+        for job in jobs:
+            self._queue.put(('add', job.id, job.path, job.copies, job.printer, now))
+    
+    def copies_changed(self, job):
+        self._queue.put(('copies', job.id, job.copies, time.time()))
+    
+    def state(self, job_id, state, printer=None, detail=None):
+        self._queue.put(('state', job_id, state, printer, detail, time.time()))
+    
+    def removed(self, job_ids):
+        """Задания ушли из очереди: строка удаляется, в истории остаётся отметка"""
+        now = time.time()
+        for job_id in job_ids:
+            self._queue.put(('remove', job_id, now))
+    
+    def flush(self, timeout=5.0):
+        """Ждёт, пока всё поставленное до вызова будет закоммичено"""
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        return done.wait(timeout)
+    
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(5.0)
+        self._thread = None
+    
+    def _loop(self, connection):
+        try:
+            while True:
+                batch = [self._queue.get()]
+                # Групповой коммит: собираем всё, что придёт за commit_interval
+                deadline = time.monotonic() + self.commit_interval
+                # Закрытие и flush коммитятся сразу, не дожидаясь конца интервала
+                while batch[-1] is not None and batch[-1][0] != 'flush' and len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                
+                stop = batch[-1] is None
+                self._write(connection, [op for op in batch if op is not None])
+                if stop:
+                    break
+        finally:
+            connection.close()
+    
+    def _write(self, connection, batch):
+        waiters = []
+        try:
+            with connection:
+                for op in batch:
+                    kind = op[0]
+                    if kind == 'flush':
+                        waiters.append(op[1])
+                        continue
+                    self.records += 1
+                    if kind == 'add':
+                        _, job_id, path, copies, printer, at = op
+                        connection.execute(
+                            "INSERT OR REPLACE INTO jobs (id, path, copies, printer, state, updated)"
+                            " VALUES (?, ?, ?, ?, ?, ?)",
+                            (job_id, path, copies, printer, STATE_QUEUED, at)
+                        )
+                        connection.execute(
+                            "INSERT INTO events (job_id, state, at, printer, detail) VALUES (?, ?, ?, ?, ?)",
+                            (job_id, STATE_QUEUED, at, printer, path)
+                        )
+                        connection.execute(
+                            "INSERT INTO meta (key, value) VALUES ('next_id', ?)"
+                            " ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+                            (job_id + 1,)
+                        )
+                    elif kind == 'copies':
+                        _, job_id, copies, at = op
+                        connection.execute(
+                            "UPDATE jobs SET copies = ?, updated = ? WHERE id = ?", (copies, at, job_id)
+                        )
+                    elif kind == 'state':
+                        _, job_id, state, printer, detail, at = op
+                        attempts = 1 if state == STATE_SENDING else 0
+                        connection.execute(
+                            "UPDATE jobs SET state = ?, attempts = attempts + ?, error = ?, updated = ?"
+                            " WHERE id = ?",
+                            (state, attempts, detail if state == STATE_FAILED else None, at, job_id)
+                        )
+                        connection.execute(
+                            "INSERT INTO events (job_id, state, at, printer, detail) VALUES (?, ?, ?, ?, ?)",
+                            (job_id, state, at, printer, detail)
+                        )
+                    elif kind == 'remove':
+                        _, job_id, at = op
+                        connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                        connection.execute(
+                            "INSERT INTO events (job_id, state, at) VALUES (?, ?, ?)", (job_id, STATE_REMOVED, at)
+                        )
+            self.commits += 1
+        except sqlite3.Error as e:
+            # Журнал не должен останавливать печать: ошибку видно в self.error
+            self.error = str(e)
+            print(f"Journal error: {e}")
+        finally:
+            for waiter in waiters:
+                waiter.set()
@@ -0,0 +1,198 @@
+"""Потоковый импорт манифестов (CSV / JSON / JSON Lines) с тысячами заданий"""
+import os
+import csv
+import json
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from autoprint import SUPPORTED_EXTENSIONS
+
+PATH_KEYS = ('path', 'file', 'file_path', 'datei')
+COPIES_KEYS = ('copies', 'qty', 'quantity', 'kopien')
+PRINTER_KEYS = ('printer', 'drucker')
+
+MAX_COPIES = 9999
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+class ManifestEntry:
+    """Одна строка манифеста"""
+    __slots__ = ('path', 'copies', 'printer', 'line')
+    
+    def __init__(self, path, copies, printer=None, line=0):
+        self.path = path
+        self.copies = copies
+        self.printer = printer
+        self.line = line
+
+
+def _pick(record, keys):
+    for key in keys:
+        value = record.get(key)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _make_entry(path, copies, printer, line, base_dir, default_copies):
+    if not path:
+        raise ValueError(f"Zeile {line}: kein Dateipfad")
+    path = str(path).strip()
+    if not os.path.isabs(path):
+        path = os.path.join(base_dir, path)
+    
+    if copies in (None, ''):
+        copies = default_copies
+    try:
+        copies = int(copies)
+    except (TypeError, ValueError):
+        raise ValueError(f"Zeile {line}: ungültige Kopienanzahl {copies!r}")
+    if copies < 1:
+        raise ValueError(f"Zeile {line}: ungültige Kopienanzahl {copies}")
+    
+    printer = str(printer).strip() if printer else None
+    return ManifestEntry(os.path.normpath(path), min(copies, MAX_COPIES), printer or None, line)
+
+
+def _iter_csv(f):
+    # Разделитель определяем по первой строке: ',' ';' или табуляция
+    sample = f.readline()
+    delimiter = max((',', ';', '\t'), key=sample.count)
+    rows = csv.reader(_chain_first(sample, f), delimiter=delimiter)
+    
+    header = None
+    for line, row in enumerate(rows, 1):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if line == 1:
+            lowered = [cell.strip().lower() for cell in row]
+            if any(key in lowered for key in PATH_KEYS):
+                header = lowered
+                continue
+        
+        if header:
+            record = dict(zip(header, row))
+            yield line, _pick(record, PATH_KEYS), _pick(record, COPIES_KEYS), _pick(record, PRINTER_KEYS)
+        else:
+            row = row + [None] * (3 - len(row))
+            yield line, row[0], row[1], row[2]
+
+
+def _chain_first(first_line, f):
+    yield first_line
+    yield from f
+
+
+def _iter_json(f):
+    """Читает JSON-массив объектов или JSON Lines кусками, не загружая файл целиком"""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    index = 0
+    
+    while True:
+        # Пропускаем пробелы и разделители массива между объектами
+        while pos < len(buf) and buf[pos] in " \t\r\n,[]":
+            pos += 1
+        
+        if pos >= len(buf):
+            if eof:
+                return
+            buf = f.read(JSON_CHUNK_SIZE)
+            pos = 0
+            eof = not buf
+            continue
+        
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError(f"Ungültiges JSON im Manifest (Eintrag {index + 1})")
+            chunk = f.read(JSON_CHUNK_SIZE)
+            buf = buf[pos:] + chunk
+            pos = 0
+            eof = not chunk
+            continue
+        
+        pos = end
+        index += 1
+        if isinstance(value, str):
+            yield index, value, None, None
+        elif isinstance(value, dict):
+            record = {str(k).lower(): v for k, v in value.items()}
+            yield index, _pick(record, PATH_KEYS), _pick(record, COPIES_KEYS), _pick(record, PRINTER_KEYS)
+        else:
+            raise ValueError(f"Eintrag {index}: Objekt erwartet")
+
+
+def iter_manifest(manifest_path, default_copies=1, errors=None):
+    """Лениво отдаёт ManifestEntry; ошибочные строки складывает в errors"""
+    manifest_path = Path(manifest_path)
+    base_dir = str(manifest_path.parent)
+    is_json = manifest_path.suffix.lower() in ('.json', '.jsonl', '.ndjson')
+    
+    with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as f:
+        rows = _iter_json(f) if is_json else _iter_csv(f)
+        for line, path, copies, printer in rows:
+            try:
+                yield _make_entry(path, copies, printer, line, base_dir, default_copies)
+            except ValueError as e:
+                if errors is None:
+                    raise
+                errors.append(str(e))
+
+
+def _check_entry(entry):
+    if Path(entry.path).suffix.lower() not in SUPPORTED_EXTENSIONS:
+        return "unsupported"
+    if not os.path.isfile(entry.path):
+        return "missing"
+    return None
+
+
+def import_manifest(manifest_path, commit_batch, default_copies=1, batch_size=1000,
+                    workers=16, progress_callback=None):
+    """Импортирует манифест пачками: проверка путей параллельно, commit_batch раз на пачку"""
+    summary = {
+        'manifest': str(manifest_path),
+        'total': 0,
+        'added': 0,
+        'missing': 0,
+        'unsupported': 0,
+        'invalid': 0,
+        'errors': [],
+    }
+    errors = []
+    
+    def flush(batch):
+        # os.path.isfile на сетевом диске медленный, поэтому проверяем пачку в потоках
+        problems = list(executor.map(_check_entry, batch))
+        valid = []
+        for entry, problem in zip(batch, problems):
+            if problem is None:
+                valid.append(entry)
+            else:
+                summary[problem] += 1
+                if len(summary['errors']) < 100:
+                    summary['errors'].append(f"Zeile {entry.line}: {problem}: {entry.path}")
+        if valid:
+            summary['added'] += commit_batch(valid) or 0
+        if progress_callback:
+            progress_callback(summary)
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        batch = []
+        for entry in iter_manifest(manifest_path, default_copies, errors):
+            summary['total'] += 1
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    
+    summary['invalid'] = len(errors)
+    summary['total'] += len(errors)
+    summary['errors'] = errors[:100] + summary['errors']
+    return summary
@@ -0,0 +1,261 @@
+"""Метрики печати: длительность фаз задания и счётчики по принтеру и бэкенду, экспорт Prometheus/JSON"""
+import os
+import json
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Фазы задания: ожидание в очереди, подготовка файла, отправка, приём спулером, печать, всё вместе
+STAGES = ('queue_wait', 'prepare', 'submit', 'spool', 'print', 'total')
+
+# Границы корзин в секундах: от чтения файла до долгой печати
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+COUNTER_HELP = {
+    'jobs': "Aufträge nach erreichtem Zustand (spooled, printed, error, missing)",
+    'pages': "Gedruckte Seiten (Seiten x Kopien)",
+    'copies': "Gedruckte Kopien",
+}
+
+
+class _NullSpan:
+    """Span выключенных метрик: ничего не меряет и не создаётся заново"""
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ('metrics', 'key', 'started')
+    
+    def __init__(self, metrics, key):
+        self.metrics = metrics
+        self.key = key
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics._observe(self.key, time.perf_counter() - self.started)
+        return False
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum')
+    
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+    
+    def quantile(self, q):
+        """Оценка квантиля по корзинам: верхняя граница корзины, в которую он попал"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    """Гистограммы (фаза, принтер, бэкенд) и счётчики; выключенные метрики стоят один if"""
+    
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._histograms = {}  # (фаза, принтер, бэкенд) -> Histogram
+        self._counters = {}  # (имя, принтер, бэкенд, состояние) -> число
+    
+    def span(self, stage, printer, backend):
+        """with metrics.span('submit', принтер, бэкенд): ..."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, (stage, printer or "", backend or ""))
+    
+    def observe(self, stage, seconds, printer, backend):
+        if self.enabled and seconds is not None:
+            self._observe((stage, printer or "", backend or ""), seconds)
+    
+    def inc(self, name, printer, backend, state="", value=1):
+        if not self.enabled:
+            return
+        key = (name, printer or "", backend or "", state or "")
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def _observe(self, key, seconds):
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+    
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+        self.started = time.time()
+    
+    def as_dict(self):
+        """Снимок для JSON: по фазе - число, сумма, среднее и оценки p50/p95"""
+        with self._lock:
+            histograms = [(key, list(h.counts), h.count, h.sum, h.quantile(0.5), h.quantile(0.95))
+                          for key, h in self._histograms.items()]
+            counters = list(self._counters.items())
+        stages = []
+        for (stage, printer, backend), counts, count, total, p50, p95 in sorted(histograms):
+            stages.append({
+                'stage': stage,
+                'printer': printer,
+                'backend': backend,
+                'count': count,
+                'sum': round(total, 6),
+                'mean': round(total / count, 6) if count else None,
+                'p50': p50,
+                'p95': p95,
+                'buckets': dict(zip([str(bound) for bound in BUCKETS] + ["+Inf"], counts)),
+            })
+        return {
+            'started': self.started,
+            'time': time.time(),
+            'stages': stages,
+            'counters': [
+                {'name': name, 'printer': printer, 'backend': backend, 'state': state, 'value': value}
+                for (name, printer, backend, state), value in sorted(counters)
+            ],
+        }
+    
+    def dump(self, path):
+        """Пишет снимок в JSON-файл (через временный файл)"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+    
+    def prometheus_text(self):
+        """Текстовый формат Prometheus 0.0.4"""
+        with self._lock:
+            histograms = sorted((key, list(h.counts), h.count, h.sum) for key, h in self._histograms.items())
+            counters = sorted(self._counters.items())
+        lines = [
+            "# HELP autoprint_stage_seconds Dauer der Druckphasen pro Auftrag",
+            "# TYPE autoprint_stage_seconds histogram",
+        ]
+        for (stage, printer, backend), counts, count, total in histograms:
+            labels = f'stage="{_escape(stage)}",printer="{_escape(printer)}",backend="{_escape(backend)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'autoprint_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'autoprint_stage_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"autoprint_stage_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"autoprint_stage_seconds_count{{{labels}}} {count}")
+        
+        names = sorted({key[0] for key, _ in counters})
+        for name in names:
+            lines.append(f"# HELP autoprint_{name}_total {COUNTER_HELP.get(name, name)}")
+            lines.append(f"# TYPE autoprint_{name}_total counter")
+            for (counter, printer, backend, state), value in counters:
+                if counter != name:
+                    continue
+                labels = f'printer="{_escape(printer)}",backend="{_escape(backend)}"'
+                if state:
+                    labels += f',state="{_escape(state)}"'
+                lines.append(f"autoprint_{name}_total{{{labels}}} {value}")
+        lines.append(f"autoprint_start_time_seconds {self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Общий выключенный экземпляр: по умолчанию движок меряет через него и ничего не копит
+DISABLED = Metrics(enabled=False)
+
+
+class MetricsServer:
+    """Локальный HTTP: /metrics - Prometheus, /metrics.json - JSON"""
+    
+    def __init__(self, metrics, port=9464, host="127.0.0.1"):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+    
+    def start(self):
+        metrics = self.metrics
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = metrics.prometheus_text().encode('utf-8')
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(metrics.as_dict(), ensure_ascii=False).encode('utf-8')
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        # Порт 0 - выбрать свободный; настоящий номер нужен вызывающему
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def metrics_from_env():
+    """AUTOPRINT_METRICS_PORT включает метрики и HTTP, AUTOPRINT_METRICS_JSON - дамп при выходе
+    
+    Неверный или занятый порт не мешает запуску: метрики считаются, HTTP-сервера нет.
+    """
+    port = os.environ.get("AUTOPRINT_METRICS_PORT")
+    json_path = os.environ.get("AUTOPRINT_METRICS_JSON")
+    if not port and not json_path:
+        return DISABLED, None
+    metrics = Metrics()
+    server = None
+    if port:
+        try:
+            server = MetricsServer(metrics, int(port)).start()
+        except (ValueError, OverflowError, OSError) as e:
+            print(f"⚠️ Metrik-Server nicht gestartet (AUTOPRINT_METRICS_PORT={port}): {e}")
+    return metrics, server
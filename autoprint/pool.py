@@ -0,0 +1,300 @@
+"""Пул принтеров: поток-диспетчер на каждый принтер, задания по кругу или по наименьшей загрузке"""
+import os
+import time
+import queue
+import itertools
+import threading
+
+from autoprint.backends import JOB_SPOOLING, JOB_SPOOLED, JOB_PRINTED, JOB_ERROR
+from autoprint.engine import JOB_MISSING, JOB_CANCELLED, JOB_PAUSED, job_entries
+from autoprint.scheduler import JobCancelled, JobPaused
+
+POLICY_ROUND_ROBIN = "round-robin"
+POLICY_LEAST_PAGES = "least-pages"  # меньше всего страниц в работе: очередь потока + спулер
+
+POLICIES = (POLICY_ROUND_ROBIN, POLICY_LEAST_PAGES)
+
+
+class PrinterWorker:
+    """Поток одного принтера: берёт задания из своей короткой очереди и печатает по одному"""
+    
+    def __init__(self, pool, printer_name, prefetch):
+        self.pool = pool
+        self.printer = printer_name
+        # Короткая очередь: задания распределяются ближе к моменту печати
+        self.queue = queue.Queue(maxsize=prefetch)
+        self.queued_pages = 0
+        # Номер последней выдачи: при равной загрузке задание уходит давно не получавшему принтеру
+        self.assigned = 0
+        self.in_flight = []  # (отслеживаемые задания, страницы, индекс, начало) до подтверждения печати
+        self.counters = {
+            'jobs': 0,
+            'copies': 0,
+            'pages': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'paused': 0,
+            'busy_seconds': 0.0,
+        }
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+    
+    def outstanding_pages(self):
+        """Страницы в очереди потока плюс ещё не напечатанные в спулере"""
+        with self.pool.lock:
+            in_flight = list(self.in_flight)
+            queued = self.queued_pages
+        pending = 0
+        for jobs, pages, _, _ in in_flight:
+            if not all(job.reached(JOB_PRINTED) for job in jobs):
+                pending += pages
+        return queued + pending
+    
+    def _loop(self):
+        engine = self.pool.engine
+        # Конвейерный бэкенд отправляет в фоне: spooled - только когда принтер принял задание
+        pending = []
+        last_settle = time.monotonic()
+        while True:
+            # Принятые принтером отчитываем по ходу, не чаще раза в полсекунды
+            if pending and time.monotonic() - last_settle >= 0.5:
+                self._settle(pending)
+                last_settle = time.monotonic()
+            try:
+                item = self.queue.get(timeout=0.5 if pending else None)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            index, file_path, copies, pages, job_started, prepare_seconds, control = item
+            with self.pool.lock:
+                self.queued_pages -= pages
+            engine.metrics.observe('prepare', prepare_seconds, self.printer, engine.backend.name)
+            
+            if self.pool.on_job_start:
+                self.pool.on_job_start(file_path)
+            self.pool.report(index, JOB_SPOOLING, {'printer': self.printer})
+            engine.status(f"🖨️ {self.printer}: {os.path.basename(file_path)} ({copies}x)")
+            
+            started = time.perf_counter()
+            try:
+                jobs = engine.submit_job(file_path, self.printer, copies, control)
+                with self.pool.lock:
+                    self.in_flight.append((jobs, pages, index, job_started))
+                entry = (index, file_path, copies, pages, jobs)
+                if engine.backend.pipelined:
+                    pending.append(entry)
+                else:
+                    self._spooled(*entry)
+            except JobCancelled:
+                with self.pool.lock:
+                    self.counters['cancelled'] += 1
+                engine.job_failed(self.printer, JOB_CANCELLED)
+                self.pool.report(index, JOB_CANCELLED, {'printer': self.printer})
+                engine.status(f"⛔ {self.printer}: abgebrochen {os.path.basename(file_path)}")
+            except JobPaused:
+                with self.pool.lock:
+                    self.counters['paused'] += 1
+                self.pool.report(index, JOB_PAUSED, {'printer': self.printer})
+                engine.status(f"⏸ {self.printer}: angehalten {os.path.basename(file_path)}")
+            except Exception as e:
+                self._failed(index, file_path, str(e))
+            finally:
+                with self.pool.lock:
+                    self.counters['busy_seconds'] += time.perf_counter() - started
+        
+        if pending:
+            engine.status(f"⏳ {self.printer}: warte, bis der Drucker die Aufträge angenommen hat...")
+            self._settle(pending, wait=True)
+    
+    def _settle(self, pending, wait=False):
+        """Отчитывает принятые и не принятые принтером отправки; в pending остаются ещё в пути"""
+        accepted, rejected, waiting = self.pool.engine.settle(pending, wait)
+        pending[:] = waiting
+        for entry in accepted:
+            self._spooled(*entry)
+        for (index, file_path, _, _, jobs), error in rejected:
+            with self.pool.lock:
+                # Не принятое не ждёт печати и не считается загрузкой принтера
+                self.in_flight = [flight for flight in self.in_flight if flight[0] is not jobs]
+            self._failed(index, file_path, error)
+    
+    def _spooled(self, index, file_path, copies, pages, jobs):
+        with self.pool.lock:
+            self.counters['jobs'] += 1
+            self.counters['copies'] += copies
+            self.counters['pages'] += pages
+        self.pool.engine.job_spooled(self.printer, pages, copies)
+        self.pool.report(index, JOB_SPOOLED, {'printer': self.printer, 'pages': pages})
+        if self.pool.on_job_done:
+            self.pool.on_job_done(file_path, self.printer, copies)
+    
+    def _failed(self, index, file_path, error):
+        engine = self.pool.engine
+        with self.pool.lock:
+            self.counters['failed'] += 1
+            self.pool.errors.append({'file': file_path, 'printer': self.printer, 'error': error})
+        engine.job_failed(self.printer, JOB_ERROR)
+        self.pool.report(index, JOB_ERROR, {'printer': self.printer, 'error': error})
+        engine.status(f"❌ Fehler beim Drucken {os.path.basename(file_path)}: {error}")
+        print(f"Print error ({self.printer}): {error}")
+
+
+class PrinterPool:
+    """Раздаёт задания нескольким принтерам через один PrintEngine; сводка как у PrintEngine.run"""
+    
+    def __init__(self, engine, printers, policy=POLICY_LEAST_PAGES, prefetch=2, refresh_interval=0.5):
+        if policy not in POLICIES:
+            raise ValueError(f"Unbekannte Verteilung: {policy}")
+        if not printers:
+            raise ValueError("Mindestens ein Drucker wird benötigt")
+        self.engine = engine
+        self.printers = list(dict.fromkeys(printers))
+        self.policy = policy
+        self.prefetch = prefetch
+        # Как часто спрашивать спулер, сколько страниц ещё не напечатано
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.errors = []
+        self.on_job_start = None
+        self.on_job_done = None
+        self.on_job_state = None
+        self._workers = {}
+        self._assignments = itertools.count(1)
+    
+    def _worker(self, printer_name):
+        worker = self._workers.get(printer_name)
+        if worker is None:
+            worker = PrinterWorker(self, printer_name, self.prefetch)
+            self._workers[printer_name] = worker
+        return worker
+    
+    def _refresh_in_flight(self):
+        """Один опрос спулера на принтер: отмечает напечатанное, чтобы оно не считалось загрузкой"""
+        for worker in self._workers.values():
+            with self.lock:
+                jobs = [job for tracked, _, _, _ in worker.in_flight for job in tracked if not job.reached(JOB_PRINTED)]
+            if jobs:
+                self.engine.tracker.update(jobs)
+    
+    def report(self, index, state, info):
+        if self.on_job_state:
+            self.on_job_state(index, state, info)
+    
+    def _dispatch(self, item, rotation, last_refresh):
+        """Ставит задание в очередь потока выбранного принтера; ждёт, если все очереди полны"""
+        pages = item[3]  # (индекс, путь, копии, страницы, начало, подготовка, JobControl)
+        if self.policy == POLICY_ROUND_ROBIN:
+            worker = self._worker(next(rotation))
+            with self.lock:
+                worker.queued_pages += pages
+            worker.queue.put(item)
+            return last_refresh
+        
+        while True:
+            now = time.monotonic()
+            if now - last_refresh >= self.refresh_interval:
+                self._refresh_in_flight()
+                last_refresh = now
+            free = [self._worker(name) for name in self.printers if not self._worker(name).queue.full()]
+            if free:
+                worker = min(free, key=lambda w: (w.outstanding_pages(), w.assigned))
+                worker.assigned = next(self._assignments)
+                with self.lock:
+                    worker.queued_pages += pages
+                worker.queue.put(item)
+                return last_refresh
+            time.sleep(0.02)
+    
+    def run(self, jobs, on_job_start=None, on_job_done=None, on_job_state=None):
+        """Печатает список (путь, копии[, принтер]) или PriorityScheduler (см. engine.job_entries);
+        принтер из манифеста минует распределение"""
+        entries, _ = job_entries(jobs)
+        self.on_job_start = on_job_start
+        self.on_job_done = on_job_done
+        self.on_job_state = on_job_state
+        self.errors = []
+        started = time.perf_counter()
+        summary = {
+            'printer': ", ".join(self.printers),
+            'printers': {},
+            'policy': self.policy,
+            'backend': self.engine.backend.name,
+            'total': 0,
+            'printed': 0,
+            'failed': 0,
+            'missing': 0,
+            'cancelled': 0,
+            'paused': 0,
+            'copies': 0,
+            'confirmed': 0,
+            'errors': [],
+        }
+        
+        for name in self.printers:
+            self._worker(name)
+        rotation = itertools.cycle(self.printers)
+        last_refresh = 0.0
+        
+        # Из планировщика задание берётся, когда у принтеров есть место: срочное ждёт не дольше prefetch
+        for index, job, control in entries:
+            summary['total'] += 1
+            file_path, copies = job[0], job[1]
+            job_printer = job[2] if len(job) > 2 and job[2] else None
+            job_started = time.monotonic()
+            # Страницы нужны для распределения, поэтому считаются всегда
+            pages = self.engine.prepare(file_path, copies, count_pages=True)
+            if pages is None:
+                self.engine.status(f"⚠️ Datei nicht gefunden: {os.path.basename(file_path)}")
+                summary['missing'] += 1
+                self.engine.job_failed(job_printer, JOB_MISSING)
+                self.report(index, JOB_MISSING, {})
+                continue
+            item = (index, file_path, copies, pages, job_started, time.monotonic() - job_started, control)
+            if job_printer:
+                worker = self._worker(job_printer)
+                with self.lock:
+                    worker.queued_pages += pages
+                worker.queue.put(item)
+            else:
+                last_refresh = self._dispatch(item, rotation, last_refresh)
+        
+        for worker in self._workers.values():
+            worker.queue.put(None)
+        for worker in self._workers.values():
+            worker.thread.join()
+        
+        tracked = [job for worker in self._workers.values() for jobs, _, _, _ in worker.in_flight for job in jobs]
+        if tracked and self.engine.wait_printed:
+            self.engine.status("⏳ Warte auf Bestätigung vom Drucker...")
+            self.engine.tracker.wait(tracked, until=JOB_PRINTED)
+            self.engine.confirm(
+                [(index, jobs, job_started) for worker in self._workers.values()
+                 for jobs, _, index, job_started in worker.in_flight],
+                on_job_state
+            )
+        
+        seconds = time.perf_counter() - started
+        for name, worker in self._workers.items():
+            counters = dict(worker.counters)
+            counters['busy_seconds'] = round(counters['busy_seconds'], 3)
+            counters['confirmed'] = sum(
+                1 for jobs, _, _, _ in worker.in_flight for job in jobs if job.state == JOB_PRINTED
+            )
+            # Пропускная способность за весь прогон, включая ожидание печати
+            counters['pages_per_minute'] = round(counters['pages'] / seconds * 60, 1) if seconds else 0.0
+            counters['latency'] = self.engine.tracker.stats(name)
+            summary['printers'][name] = counters
+            summary['printed'] += counters['jobs']
+            summary['failed'] += counters['failed']
+            summary['cancelled'] += counters['cancelled']
+            summary['paused'] += counters['paused']
+            summary['copies'] += counters['copies']
+        
+        summary['errors'] = self.errors
+        summary['confirmed'] = sum(1 for job in tracked if job.state == JOB_PRINTED)
+        summary['job_errors'] = sum(1 for job in tracked if job.state == JOB_ERROR)
+        summary['latency'] = self.engine.tracker.stats()
+        summary['seconds'] = round(seconds, 3)
+        self._workers = {}
+        return summary
@@ -0,0 +1,276 @@
+"""Журнал печати в JSONL: фоновая запись пачками, ротация по размеру, дневной индекс для статистики"""
+import os
+import json
+import time
+import queue
+import threading
+from pathlib import Path
+from datetime import datetime
+
+from autoprint.backends import JOB_SPOOLED, JOB_PRINTED, JOB_ERROR
+
+LOG_NAME = "print_log.jsonl"
+INDEX_NAME = "print_log_index.json"
+
+# Состояния, при которых страницы считаются напечатанными
+DONE_STATES = (JOB_SPOOLED, JOB_PRINTED)
+
+COUNTERS = ('jobs', 'printed', 'failed', 'copies', 'pages', 'seconds')
+
+
+def default_log_directory():
+    return os.environ.get("AUTOPRINT_LOG_DIR", "print_logs")
+
+
+class PrintLog:
+    """Одна строка JSON на задание; индекс хранит итоги по дням и принтерам и файлы каждого дня"""
+    
+    def __init__(self, directory=None, max_bytes=5 * 1024 * 1024, flush_interval=0.5, max_batch=1000):
+        self.directory = Path(directory or default_log_directory())
+        self.max_bytes = max_bytes
+        # Сколько копить строки перед записью на диск
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.error = None
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._index_lock = threading.RLock()
+        self._index = {'days': {}, 'offset': 0}
+    
+    @property
+    def log_path(self):
+        return self.directory / LOG_NAME
+    
+    @property
+    def index_path(self):
+        return self.directory / INDEX_NAME
+    
+    def open(self):
+        """Читает индекс и запускает поток записи; возвращает self"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError) as e:
+                # Индекс можно собрать заново из файлов журнала
+                print(f"Index des Drucklogs defekt, wird neu aufgebaut: {e}")
+                self.rebuild_index()
+        elif any(self.directory.glob("print_log*.jsonl")):
+            self.rebuild_index()
+        self._catch_up()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+    
+    def log(self, entry):
+        """Ставит запись в очередь записи; время и день добавляются, если их нет"""
+        if self._thread is None:
+            return
+        if 'time' not in entry:
+            entry['time'] = datetime.now().isoformat(timespec='seconds')
+        entry.setdefault('day', entry['time'][:10])
+        self._queue.put(entry)
+    
+    def flush(self, timeout=5.0):
+        """Ждёт, пока всё поставленное до вызова окажется на диске"""
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+    
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(5.0)
+        self._thread = None
+    
+    # Запросы: итоги берутся из индекса, строки - только из файлов нужных дней
+    
+    def days(self, start=None, end=None):
+        """Дни с записями (YYYY-MM-DD), по возрастанию; границы включительно"""
+        with self._index_lock:
+            days = sorted(self._index['days'])
+        return [day for day in days if (start is None or day >= start) and (end is None or day <= end)]
+    
+    def totals(self, start=None, end=None, printer=None):
+        """{день: {принтер: счётчики}} без чтения журнала"""
+        result = {}
+        with self._index_lock:
+            for day in self.days(start, end):
+                printers = self._index['days'][day]['printers']
+                result[day] = {
+                    name: dict(counters) for name, counters in printers.items()
+                    if printer is None or name == printer
+                }
+        return result
+    
+    def pages_per_printer_per_day(self, start=None, end=None):
+        """{принтер: {день: страницы}}"""
+        result = {}
+        for day, printers in self.totals(start, end).items():
+            for name, counters in printers.items():
+                result.setdefault(name, {})[day] = counters['pages']
+        return result
+    
+    def summary(self, start=None, end=None):
+        """Итоги по принтерам за период: {принтер: счётчики}"""
+        result = {}
+        for printers in self.totals(start, end).values():
+            for name, counters in printers.items():
+                total = result.setdefault(name, dict.fromkeys(COUNTERS, 0))
+                for key in COUNTERS:
+                    total[key] += counters.get(key, 0)
+        for total in result.values():
+            total['seconds'] = round(total['seconds'], 3)
+        return result
+    
+    def entries(self, start=None, end=None, printer=None, job_id=None):
+        """Записи за период; читаются только файлы, в которых по индексу есть эти дни"""
+        self.flush()
+        days = set(self.days(start, end))
+        with self._index_lock:
+            files = []
+            for day in sorted(days):
+                for name in self._index['days'][day]['files']:
+                    if name not in files:
+                        files.append(name)
+        for name in files:
+            path = self.directory / name
+            if not path.exists():
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get('day') not in days:
+                        continue
+                    if printer is not None and entry.get('printer') != printer:
+                        continue
+                    if job_id is not None and entry.get('job') != job_id:
+                        continue
+                    yield entry
+    
+    def rebuild_index(self):
+        """Собирает индекс заново по всем файлам журнала (после потери или порчи индекса)"""
+        index = {'days': {}, 'offset': 0}
+        # Старые файлы первыми, текущий - последним
+        names = sorted(path.name for path in self.directory.glob("print_log*.jsonl") if path.name != LOG_NAME)
+        if self.log_path.exists():
+            names.append(LOG_NAME)
+            index['offset'] = self.log_path.stat().st_size
+        for name in names:
+            with open(self.directory / name, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._count(index, json.loads(line), name)
+                    except (ValueError, KeyError):
+                        continue
+        with self._index_lock:
+            self._index = index
+        self._save_index()
+        return index
+    
+    def _catch_up(self):
+        """Досчитывает строки, записанные перед падением, но не попавшие в индекс"""
+        size = self.log_path.stat().st_size if self.log_path.exists() else 0
+        offset = self._index.get('offset', 0)
+        if size == offset:
+            return
+        if size < offset:
+            # Файл моложе индекса (ротация без сохранения индекса) - проще пересобрать
+            self.rebuild_index()
+            return
+        with open(self.log_path, 'rb') as f:
+            f.seek(offset)
+            tail = f.read()
+        with self._index_lock:
+            for line in tail.decode('utf-8', errors='replace').splitlines():
+                try:
+                    self._count(self._index, json.loads(line), LOG_NAME)
+                except (ValueError, KeyError):
+                    continue
+            self._index['offset'] = size
+        self._save_index()
+    
+    def _count(self, index, entry, file_name):
+        day = index['days'].setdefault(entry['day'], {'files': [], 'printers': {}})
+        if file_name not in day['files']:
+            day['files'].append(file_name)
+        counters = day['printers'].setdefault(entry.get('printer') or "?", dict.fromkeys(COUNTERS, 0))
+        counters['jobs'] += 1
+        if entry.get('state') in DONE_STATES:
+            counters['printed'] += 1
+            counters['copies'] += entry.get('copies') or 0
+            counters['pages'] += entry.get('pages') or 0
+        elif entry.get('state') == JOB_ERROR:
+            counters['failed'] += 1
+        counters['seconds'] = round(counters['seconds'] + (entry.get('seconds') or 0), 3)
+    
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # None (закрытие) и flush пишутся сразу, не дожидаясь конца интервала
+            while batch[-1] is not None and len(batch) < self.max_batch:
+                if isinstance(batch[-1], threading.Event):
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            stop = batch[-1] is None
+            self._write([item for item in batch if item is not None])
+            if stop:
+                break
+    
+    def _write(self, batch):
+        waiters = [item for item in batch if isinstance(item, threading.Event)]
+        entries = [item for item in batch if isinstance(item, dict)]
+        try:
+            if entries:
+                if self.log_path.exists() and self.log_path.stat().st_size >= self.max_bytes:
+                    self._rotate()
+                lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+                with open(self.log_path, 'ab') as f:
+                    f.write(lines.encode('utf-8'))
+                    offset = f.tell()
+                with self._index_lock:
+                    for entry in entries:
+                        self._count(self._index, entry, LOG_NAME)
+                    self._index['offset'] = offset
+                self._save_index()
+        except OSError as e:
+            # Журнал не должен останавливать печать: ошибку видно в self.error
+            self.error = str(e)
+            print(f"Drucklog-Fehler: {e}")
+        finally:
+            for waiter in waiters:
+                waiter.set()
+    
+    def _rotate(self):
+        """Текущий файл получает метку времени, индекс переписывается на новое имя"""
+        name = f"print_log.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.jsonl"
+        os.replace(self.log_path, self.directory / name)
+        with self._index_lock:
+            for day in self._index['days'].values():
+                day['files'] = [name if file_name == LOG_NAME else file_name for file_name in day['files']]
+            self._index['offset'] = 0
+        self._save_index()
+    
+    def _save_index(self):
+        with self._index_lock:
+            data = json.dumps(self._index, ensure_ascii=False)
+        temp_path = self.index_path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        # Атомарная замена: после падения остаётся старый или новый индекс, но не половина
+        os.replace(temp_path, self.index_path)
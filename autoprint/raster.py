@@ -0,0 +1,245 @@
+"""Растеризация PDF (PyMuPDF, пул процессов) и картинок (Pillow) с постраничной отправкой в бэкенд"""
+import os
+import atexit
+import threading
+import collections
+import importlib.util
+
+# PyMuPDF импортируется лениво: его загрузка стоит ~150 мс старта CLI
+FITZ_AVAILABLE = importlib.util.find_spec("fitz") is not None
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+DEFAULT_DPI = 300
+MAX_DPI = 600  # страница A4 при 600 dpi в RGB уже ~100 МБ
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+# Кэш открытых документов внутри процесса-рендерера
+_doc_cache = {}
+
+# Декодированные картинки: повторная печать той же кнопки не читает и не масштабирует файл заново
+IMAGE_CACHE_BYTES = 256 * 1024 * 1024
+_image_cache = collections.OrderedDict()
+_image_cache_bytes = 0
+_image_lock = threading.Lock()
+
+
+class RasterPage:
+    """Отрендеренная страница: сырые сэмплы RGB или Gray без альфа-канала"""
+    __slots__ = ('number', 'width', 'height', 'channels', 'dpi', 'samples')
+    
+    def __init__(self, number, width, height, channels, dpi, samples):
+        self.number = number
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.dpi = dpi
+        self.samples = samples
+    
+    @property
+    def size_inches(self):
+        return self.width / self.dpi, self.height / self.dpi
+
+
+def _open_cached(file_path):
+    mtime = os.path.getmtime(file_path)
+    cached = _doc_cache.get(file_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    # Держим открытым только последний документ, чтобы не расти по памяти
+    for _, doc in _doc_cache.values():
+        doc.close()
+    _doc_cache.clear()
+    import fitz
+    doc = fitz.open(file_path)
+    _doc_cache[file_path] = (mtime, doc)
+    return doc
+
+
+def render_page(file_path, number, dpi, gray=False):
+    """Рендерит одну страницу (выполняется в процессе пула)"""
+    import fitz
+    doc = _open_cached(file_path)
+    page = doc.load_page(number)
+    colorspace = fitz.csGRAY if gray else fitz.csRGB
+    pix = page.get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+    return number, pix.width, pix.height, pix.n, pix.samples
+
+
+def get_render_pool(workers=None):
+    """Общий пул процессов; создаётся один раз, чтобы не платить за запуск на каждом задании"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            _pool_workers = workers or min(4, os.cpu_count() or 1)
+            _pool = ProcessPoolExecutor(max_workers=_pool_workers)
+            atexit.register(shutdown_render_pool)
+        return _pool
+
+
+def shutdown_render_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def page_count(file_path):
+    import fitz
+    doc = fitz.open(file_path)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+def iter_rendered_pages(file_path, dpi, gray=False, max_in_flight=None):
+    """Отдаёт страницы по порядку; в памяти не больше max_in_flight страниц"""
+    pool = get_render_pool()
+    max_in_flight = max_in_flight or _pool_workers + 1
+    pending = collections.deque()
+    
+    for number in range(page_count(file_path)):
+        pending.append(pool.submit(render_page, file_path, number, dpi, gray))
+        if len(pending) >= max_in_flight:
+            yield _to_page(pending.popleft(), dpi)
+    
+    while pending:
+        yield _to_page(pending.popleft(), dpi)
+
+
+def _to_page(future, dpi):
+    number, width, height, channels, samples = future.result()
+    return RasterPage(number, width, height, channels, dpi, samples)
+
+
+def can_rasterize(backend):
+    return FITZ_AVAILABLE and getattr(backend, 'supports_raster', False)
+
+
+def _no_checkpoint():
+    pass
+
+
+def _repeats(job, copies):
+    """Сколько раз слать страницы в задание: копии, которые драйвер не взял на себя"""
+    return 1 if job.copies == copies else copies
+
+
+def print_pdf_raster(backend, file_path, printer_name, copies, status_callback=None, printer_info=None,
+                     driver_copies=False, checkpoint=None):
+    """Печатает PDF без Adobe: рендер на DPI принтера и поток страниц в одно задание
+    
+    driver_copies - копии ставятся в DEVMODE/тикет задания, страницы уходят один раз.
+    checkpoint() вызывается перед каждой страницей: ждёт паузу, при отмене бросает исключение,
+    и задание отменяется целиком.
+    """
+    checkpoint = checkpoint or _no_checkpoint
+    title = os.path.basename(file_path)
+    job = backend.open_raster_job(printer_name, title, printer_info, copies if driver_copies else 1)
+    try:
+        repeats = _repeats(job, copies)
+        dpi = min(job.dpi or DEFAULT_DPI, MAX_DPI)
+        gray = job.color is False
+        pages = page_count(file_path)
+        
+        if pages == 1:
+            # Одностраничный файл (кнопки): рендерим один раз, повторяем страницу
+            page = next(iter_rendered_pages(file_path, dpi, gray))
+            for i in range(repeats):
+                if repeats > 1 and status_callback:
+                    status_callback(f"🔄 Drucke PDF Kopie {i + 1}/{repeats}...")
+                checkpoint()
+                job.add_page(page)
+        else:
+            # Многостраничный: каждая копия заново, чтобы не держать весь документ в памяти
+            for i in range(repeats):
+                if repeats > 1 and status_callback:
+                    status_callback(f"🔄 Drucke PDF Kopie {i + 1}/{repeats}...")
+                for page in iter_rendered_pages(file_path, dpi, gray):
+                    checkpoint()
+                    job.add_page(page)
+        
+        job.close()
+        return job.job_ids
+    
+    except BaseException:
+        job.abort()
+        raise
+
+
+def can_print_images(backend):
+    return PIL_AVAILABLE and getattr(backend, 'supports_raster', False)
+
+
+def load_image_page(file_path, dpi, printable=None, gray=False):
+    """Декодирует картинку один раз и уменьшает до печатной области; повторные вызовы берут кэш"""
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, dpi, printable, gray)
+    with _image_lock:
+        page = _image_cache.get(key)
+        if page is not None:
+            _image_cache.move_to_end(key)
+            return page
+    
+    from PIL import Image, ImageOps
+    with Image.open(file_path) as image:
+        # Фото с телефона хранят поворот в EXIF - программа просмотра его учитывала
+        image = ImageOps.exif_transpose(image)
+        mode = "L" if gray else "RGB"
+        if image.mode != mode:
+            image = image.convert(mode)
+        if printable:
+            # Больше печатной области при DPI принтера всё равно не напечатать: уменьшаем здесь,
+            # а не в драйвере; меньшие картинки растягивает задание при выводе
+            scale = min(printable[0] / image.width, printable[1] / image.height)
+            if scale < 1:
+                size = (max(int(image.width * scale), 1), max(int(image.height * scale), 1))
+                image = image.resize(size, Image.LANCZOS)
+        page = RasterPage(0, image.width, image.height, 1 if gray else 3, dpi, image.tobytes())
+    
+    global _image_cache_bytes
+    with _image_lock:
+        if key not in _image_cache:
+            _image_cache[key] = page
+            _image_cache_bytes += len(page.samples)
+        while _image_cache_bytes > IMAGE_CACHE_BYTES and len(_image_cache) > 1:
+            _, old = _image_cache.popitem(last=False)
+            _image_cache_bytes -= len(old.samples)
+    return page
+
+
+def clear_image_cache():
+    global _image_cache_bytes
+    with _image_lock:
+        _image_cache.clear()
+        _image_cache_bytes = 0
+
+
+def print_image_raster(backend, file_path, printer_name, copies, status_callback=None, printer_info=None,
+                       driver_copies=False, checkpoint=None):
+    """Печатает JPG/PNG/BMP без программы просмотра: одно задание, копии - повтор одной страницы
+    или, при driver_copies, копии драйвера; checkpoint - как в print_pdf_raster"""
+    checkpoint = checkpoint or _no_checkpoint
+    job = backend.open_raster_job(
+        printer_name, os.path.basename(file_path), printer_info, copies if driver_copies else 1
+    )
+    try:
+        dpi = min(job.dpi or DEFAULT_DPI, MAX_DPI)
+        page = load_image_page(file_path, dpi, job.printable, job.color is False)
+        repeats = _repeats(job, copies)
+        for i in range(repeats):
+            if repeats > 1 and status_callback:
+                status_callback(f"🔄 Drucke Bild Kopie {i + 1}/{repeats}...")
+            checkpoint()
+            job.add_page(page)
+        job.close()
+        return job.job_ids
+    
+    except BaseException:
+        job.abort()
+        raise
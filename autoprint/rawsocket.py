@@ -0,0 +1,366 @@
+"""RAW-печать в порт 9100 (JetDirect): пул постоянных соединений, PJL-обёртка и локальный приёмник для проверок"""
+import os
+import re
+import time
+import select
+import socket
+import argparse
+import threading
+import collections
+import socketserver
+from pathlib import Path
+
+RAW_PORT = 9100
+
+# Universal Exit Language: граница заданий PJL внутри одного соединения
+UEL = b"\x1b%-12345X"
+
+# Больше копий @PJL SET QTY не принимает
+PJL_MAX_COPIES = 999
+
+# Языки, которые принтер разбирает сам; картинки в этот список не входят
+PJL_LANGUAGES = {
+    '.pdf': "PDF",
+    '.ps': "POSTSCRIPT",
+    '.pcl': "PCL",
+    '.prn': "PCL",
+}
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def parse_printers(spec):
+    """'Name=host[:port];Name2=host' (или список/словарь) -> {имя: (host, port)}"""
+    if not spec:
+        return {}
+    if isinstance(spec, dict):
+        items = list(spec.items())
+    else:
+        if isinstance(spec, str):
+            spec = re.split(r"[;,]", spec)
+        items = []
+        for part in spec:
+            part = part.strip()
+            if not part:
+                continue
+            if "=" not in part:
+                raise ValueError(f"RAW-Drucker erwartet Name=Host[:Port]: {part}")
+            items.append(tuple(item.strip() for item in part.split("=", 1)))
+    
+    printers = {}
+    for name, address in items:
+        if isinstance(address, tuple):
+            printers[name] = (address[0], int(address[1]))
+            continue
+        host, _, port = address.rpartition(":")
+        if not host or not port.isdigit():
+            host, port = address, RAW_PORT
+        printers[name] = (host, int(port))
+    return printers
+
+
+def pjl_language(file_path):
+    return PJL_LANGUAGES.get(os.path.splitext(str(file_path))[1].lower())
+
+
+def _pjl_name(name):
+    return str(name).replace('"', "'").encode('ascii', errors='replace')
+
+
+def pjl_header(job_name, language, copies=1):
+    """Начало задания: UEL, имя, копии и язык данных
+    
+    Копии ставятся через QTY - разобранными по экземплярам; COPIES повторял бы каждую страницу подряд.
+    """
+    name = _pjl_name(job_name)
+    return (
+        UEL + b"@PJL\r\n"
+        + b'@PJL JOB NAME="' + name + b'"\r\n'
+        + b"@PJL SET QTY=%d\r\n" % copies
+        + b"@PJL ENTER LANGUAGE=" + language.encode('ascii') + b"\r\n"
+    )
+
+
+def pjl_trailer(job_name):
+    """Конец задания: после него в том же соединении можно слать следующее"""
+    return UEL + b'@PJL EOJ NAME="' + _pjl_name(job_name) + b'"\r\n' + UEL
+
+
+def send_part(sock, part):
+    """Путь - файл целиком через sendfile, байты - через memoryview; возвращает число байт"""
+    if isinstance(part, (str, os.PathLike)):
+        with open(part, 'rb') as f:
+            if hasattr(os, 'sendfile'):
+                # Ядро копирует файл прямо в сокет, без буферов Python
+                return sock.sendfile(f)
+            # Windows: socket.sendfile шлёт по 8 КБ, читаем сами крупными кусками в один буфер
+            buffer = bytearray(CHUNK_SIZE)
+            view = memoryview(buffer)
+            sent = 0
+            while True:
+                count = f.readinto(buffer)
+                if not count:
+                    return sent
+                sock.sendall(view[:count])
+                sent += count
+    sock.sendall(memoryview(part))
+    return len(part)
+
+
+def is_alive(sock):
+    """Соединение не закрыто принтером: в буфере чтения нет EOF и ошибки"""
+    try:
+        readable, _, errored = select.select([sock], [], [sock], 0)
+    except (OSError, ValueError):
+        return False
+    if errored:
+        return False
+    if not readable:
+        return True
+    # Принтер что-то прислал (статус PJL) или закрыл соединение: вычитываем без ожидания
+    timeout = sock.gettimeout()
+    sock.setblocking(False)
+    try:
+        while True:
+            if not sock.recv(4096):
+                return False
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.settimeout(timeout)
+
+
+class ConnectionPool:
+    """Постоянные соединения к одному принтеру; перед повторной выдачей каждое проверяется"""
+    
+    def __init__(self, host, port=RAW_PORT, size=2, timeout=30.0, connect_timeout=5.0, idle_seconds=60.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        # Дольше простоявшее соединение принтер мог уже закрыть по своему таймауту
+        self.idle_seconds = idle_seconds
+        self.opened = 0
+        self.reused = 0
+        self._idle = collections.deque()  # (сокет, время возврата)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+    
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        sock.settimeout(self.timeout)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        with self._lock:
+            self.opened += 1
+        return sock
+    
+    def acquire(self):
+        """Свободное живое соединение или новое; (сокет, было ли переиспользовано)"""
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    sock, released_at = self._idle.pop()
+                if time.monotonic() - released_at < self.idle_seconds and is_alive(sock):
+                    with self._lock:
+                        self.reused += 1
+                    return sock, True
+                sock.close()
+            return self._connect(), False
+        except BaseException:
+            self._slots.release()
+            raise
+    
+    def release(self, sock, reuse=True):
+        with self._lock:
+            if reuse and not self._closed:
+                self._idle.append((sock, time.monotonic()))
+                sock = None
+        if sock is not None:
+            sock.close()
+        self._slots.release()
+    
+    def send(self, parts, reuse=True):
+        """Шлёт части одного задания подряд; возвращает число байт
+        
+        Если переиспользованное соединение оборвалось, задание один раз
+        повторяется в новом: принтер отбрасывает недописанное задание PJL.
+        """
+        for attempt in range(2):
+            sock, reused = self.acquire()
+            sent = 0
+            try:
+                for part in parts:
+                    sent += send_part(sock, part)
+            except OSError:
+                self.release(sock, reuse=False)
+                if reused and attempt == 0:
+                    continue
+                raise
+            self.release(sock, reuse)
+            return sent
+    
+    def check(self):
+        """Проверка связи: берёт (и тем прогревает) соединение; True, если принтер доступен"""
+        try:
+            sock, _ = self.acquire()
+        except OSError:
+            return False
+        self.release(sock)
+        return True
+    
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for sock, _ in idle:
+            sock.close()
+
+
+class RawSink:
+    """Локальный приёмник порта 9100 для проверок: разбирает задания PJL и пишет их данные в папку"""
+    
+    def __init__(self, directory=None, host="127.0.0.1", port=0):
+        self.directory = Path(directory) if directory else None
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.bytes = 0
+        self.jobs = []  # {'name', 'copies', 'language', 'bytes', 'connection'}
+        self._condition = threading.Condition()
+        self._server = None
+        self._thread = None
+    
+    def start(self):
+        sink = self
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                sink._receive(self.request)
+        
+        self._server = socketserver.ThreadingTCPServer((self.host, self.port), Handler, bind_and_activate=False)
+        self._server.allow_reuse_address = True
+        self._server.daemon_threads = True
+        # Очередь accept по умолчанию - 5: при потоке коротких соединений клиенты ждут повтора SYN
+        self._server.request_queue_size = 128
+        self._server.server_bind()
+        self._server.server_activate()
+        # Порт 0 - выбрать свободный; настоящий номер нужен вызывающему
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def wait_jobs(self, count, timeout=10.0):
+        """Ждёт, пока придёт count заданий; True, если дождались"""
+        with self._condition:
+            return self._condition.wait_for(lambda: len(self.jobs) >= count, timeout)
+    
+    def _receive(self, sock):
+        with self._condition:
+            self.connections += 1
+            connection = self.connections
+        buffer = bytearray()
+        scan_from = 0
+        chunk = bytearray(CHUNK_SIZE)
+        while True:
+            try:
+                count = sock.recv_into(chunk)
+            except OSError:
+                break
+            if not count:
+                break
+            buffer += memoryview(chunk)[:count]
+            with self._condition:
+                self.bytes += count
+            # Конец задания ищем только в новых байтах, иначе большой файл разбирается за квадрат
+            while True:
+                end = self._job_end(buffer, scan_from)
+                if end is None:
+                    scan_from = max(len(buffer) - 64, 0)
+                    break
+                self._store(bytes(buffer[:end]), connection)
+                del buffer[:end]
+                scan_from = 0
+        if buffer.replace(UEL, b"").strip():
+            # Без PJL заданием считается всё соединение
+            self._store(bytes(buffer), connection)
+    
+    def _job_end(self, buffer, start):
+        position = buffer.find(b"@PJL EOJ", start)
+        if position < 0:
+            return None
+        line_end = buffer.find(b"\n", position)
+        if line_end < 0 or len(buffer) < line_end + 1 + len(UEL):
+            return None
+        end = line_end + 1
+        if buffer[end:end + len(UEL)] == UEL:
+            end += len(UEL)
+        return end
+    
+    def _store(self, data, connection):
+        name = re.search(rb'@PJL JOB NAME="([^"]*)"', data[:1024])
+        copies = re.search(rb"@PJL SET (?:QTY|COPIES)=(\d+)", data[:1024])
+        language = re.search(rb"@PJL ENTER LANGUAGE=(\w+)\r?\n", data[:1024])
+        payload = data
+        if language:
+            payload = data[language.end():]
+            trailer = payload.rfind(UEL + b"@PJL EOJ")
+            if trailer >= 0:
+                payload = payload[:trailer]
+        job = {
+            'name': name.group(1).decode('ascii', errors='replace') if name else f"conn-{connection}",
+            'copies': int(copies.group(1)) if copies else 1,
+            'language': language.group(1).decode('ascii') if language else None,
+            'bytes': len(payload),
+            'connection': connection,
+        }
+        if self.directory is not None:
+            file_name = re.sub(r"[^\w.-]", "_", job['name'])
+            with open(self.directory / f"{file_name}.{(job['language'] or 'raw').lower()}", 'wb') as f:
+                f.write(payload)
+        with self._condition:
+            self.jobs.append(job)
+            self._condition.notify_all()
+
+
+def main(argv=None):
+    """python -m autoprint.rawsocket: приёмник для проверки RAW-бэкенда без принтера"""
+    parser = argparse.ArgumentParser(description="Lokaler RAW-Empfänger (Port 9100) zum Testen")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=RAW_PORT)
+    parser.add_argument("--dir", help="Ordner für empfangene Druckdaten")
+    args = parser.parse_args(argv)
+    
+    sink = RawSink(args.dir, args.host, args.port).start()
+    print(f"RAW-Empfänger auf {sink.host}:{sink.port}")
+    seen = 0
+    try:
+        while True:
+            sink.wait_jobs(seen + 1, timeout=1.0)
+            for job in sink.jobs[seen:]:
+                print(f"{job['name']}: {job['language'] or 'raw'}, {job['copies']}x, {job['bytes']} Bytes "
+                      f"(Verbindung {job['connection']})")
+            seen = len(sink.jobs)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Реестр принтеров: кэш статуса, настроек и возможностей с TTL и фоновым обновлением"""
+import time
+import threading
+
+
+class PrinterRegistry:
+    """Кэширует printer_info/capabilities бэкенда; изменения отдаёт в on_change(diff)"""
+    
+    def __init__(self, backend, ttl=30.0, refresh_interval=10.0, on_change=None):
+        self.backend = backend
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.on_change = on_change
+        
+        self._printers = None  # None - список ещё не загружали
+        self._default = None
+        self._entries = {}  # имя -> {'info', 'capabilities', 'updated'}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._requested = set()
+        self._enumerate_requested = True
+        self._last_enumerate = None
+        self._thread = None
+    
+    def start(self):
+        """Запускает фоновый поток: первая загрузка сразу, дальше раз в refresh_interval"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+            self._wakeup.set()
+    
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        self._thread = None
+    
+    @property
+    def running(self):
+        return self._thread is not None and not self._stop.is_set()
+    
+    @property
+    def loaded(self):
+        return self._printers is not None
+    
+    def printers(self):
+        with self._lock:
+            return list(self._printers or [])
+    
+    def default_printer(self):
+        return self._default
+    
+    def get(self, printer_name, block=True):
+        """Закэшированная информация о принтере; при block=False не ходит в спулер"""
+        with self._lock:
+            entry = self._entries.get(printer_name)
+        if entry is not None:
+            if time.monotonic() - entry['updated'] > self.ttl:
+                self.request_refresh(printer_name)
+            return entry['info']
+        if not block:
+            self.request_refresh(printer_name)
+            return None
+        self._refresh_printer(printer_name)
+        with self._lock:
+            entry = self._entries.get(printer_name)
+        return entry['info'] if entry else None
+    
+    def capabilities(self, printer_name, block=True):
+        with self._lock:
+            entry = self._entries.get(printer_name)
+        if entry is None and block:
+            self._refresh_printer(printer_name)
+            with self._lock:
+                entry = self._entries.get(printer_name)
+        return entry['capabilities'] if entry else {}
+    
+    def request_refresh(self, printer_name=None):
+        """Просит фоновый поток обновить принтер; None - список и все принтеры, мимо TTL"""
+        with self._lock:
+            if printer_name is None:
+                self._enumerate_requested = True
+            else:
+                self._requested.add(printer_name)
+        self._wakeup.set()
+    
+    def refresh(self):
+        """Синхронно перечитывает список и все принтеры; для CLI и тестов"""
+        self._enumerate(notify=True)
+        for name in self.printers():
+            self._refresh_printer(name)
+    
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.refresh_interval)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            
+            with self._lock:
+                enumerate_all = self._enumerate_requested
+                requested = set(self._requested)
+                self._enumerate_requested = False
+                self._requested.clear()
+            
+            try:
+                now = time.monotonic()
+                if enumerate_all or self._last_enumerate is None or now - self._last_enumerate > self.ttl:
+                    # Явный запрос отвечает всегда, плановый - только если список изменился
+                    self._enumerate(notify=enumerate_all)
+                # Обновляем запрошенные и устаревшие, остальное берётся из кэша
+                with self._lock:
+                    stale = [
+                        name for name in (self._printers or [])
+                        if enumerate_all or name not in self._entries
+                        or now - self._entries[name]['updated'] > self.ttl
+                    ]
+                for name in sorted(requested | set(stale)):
+                    self._refresh_printer(name)
+            except Exception as e:
+                print(f"Fehler beim Aktualisieren der Drucker: {e}")
+    
+    def _enumerate(self, notify=False):
+        self._last_enumerate = time.monotonic()
+        try:
+            printers = self.backend.list_printers()
+            default = self.backend.default_printer()
+        except Exception as e:
+            self._emit({
+                'printers': self.printers(),
+                'default': self._default,
+                'added': [],
+                'removed': [],
+                'changed': {},
+                'error': e,
+            })
+            return
+        
+        with self._lock:
+            old = set(self._printers or [])
+            self._printers = list(printers)
+            self._default = default
+            for name in old - set(printers):
+                self._entries.pop(name, None)
+        
+        added = [name for name in printers if name not in old]
+        removed = sorted(old - set(printers))
+        if notify or added or removed:
+            self._emit({
+                'printers': list(printers),
+                'default': default,
+                'added': added,
+                'removed': removed,
+                'changed': {},
+            })
+    
+    def _refresh_printer(self, printer_name):
+        try:
+            info = self.backend.printer_info(printer_name)
+            capabilities = self.backend.printer_capabilities(printer_name)
+        except Exception as e:
+            print(f"Fehler beim Abrufen der Druckerinfo: {e}")
+            info = None
+            capabilities = {}
+        if info is None:
+            # Не смогли спросить - минимальная запись, чтобы UI не ждал вечно
+            info = {'name': printer_name, 'status': None, 'status_code': None,
+                    'paper': None, 'orientation': None, 'dpi': None, 'color': None}
+        
+        with self._lock:
+            previous = self._entries.get(printer_name)
+            self._entries[printer_name] = {
+                'info': info,
+                'capabilities': capabilities,
+                'updated': time.monotonic(),
+            }
+        if previous is None or previous['info'] != info or previous['capabilities'] != capabilities:
+            self._emit({
+                'printers': self.printers(),
+                'default': self._default,
+                'added': [],
+                'removed': [],
+                'changed': {printer_name: info},
+            })
+    
+    def _emit(self, diff):
+        if self.on_change:
+            try:
+                self.on_change(diff)
+            except Exception as e:
+                print(f"Fehler im Drucker-Callback: {e}")
@@ -0,0 +1,261 @@
+"""Планировщик печати: задания по приоритету со старением, отмена и пауза по id, в том числе во время печати"""
+import time
+import heapq
+import functools
+import itertools
+import threading
+
+# За столько секунд ожидания задание поднимается на один уровень приоритета
+AGING_SECONDS = 60.0
+
+# Состояния записи планировщика
+QUEUED = "queued"
+PAUSED = "paused"
+ACTIVE = "active"
+CANCELLED = "cancelled"
+
+
+class JobInterrupted(Exception):
+    """Печать задания прервана планировщиком"""
+
+
+class JobCancelled(JobInterrupted):
+    """Задание отменено между страницами или копиями; уже отправленное в спулер не отзывается"""
+
+
+class JobPaused(JobInterrupted):
+    """Задание поставлено на паузу до первой отправки в спулер или между страницами растра:
+    начатое задание спулера отменено, само задание ждёт в очереди до resume"""
+
+
+class JobControl:
+    """Отмена и пауза для потока, который печатает задание: checkpoint() между страницами и копиями
+    
+    Пауза не держит поток: checkpoint бросает JobPaused, поток берёт следующее задание, а
+    on_pause возвращает это в планировщик приостановленным.
+    """
+    
+    def __init__(self, on_pause=None):
+        self.cancelled = False
+        self.paused = False
+        self.on_pause = on_pause
+    
+    def cancel(self):
+        self.cancelled = True
+    
+    def pause(self):
+        self.paused = True
+    
+    def resume(self):
+        self.paused = False
+    
+    def checkpoint(self, pause=True):
+        """JobCancelled, если задание отменили; JobPaused, если на паузе и pause=True -
+        False там, где часть копий уже в спулере и повтор задания их бы удвоил"""
+        if self.cancelled:
+            raise JobCancelled("Auftrag abgebrochen")
+        if pause and self.paused:
+            if self.on_pause is not None:
+                self.on_pause()
+            raise JobPaused("Auftrag angehalten")
+
+
+class _Entry:
+    __slots__ = ('job', 'priority', 'enqueued', 'version', 'state', 'control')
+    
+    def __init__(self, job, priority, enqueued, on_pause=None):
+        self.job = job
+        self.priority = priority
+        self.enqueued = enqueued
+        self.version = 0
+        self.state = QUEUED
+        self.control = JobControl(on_pause)
+
+
+class PriorityScheduler:
+    """Куча заданий: push, pop, смена приоритета, отмена и пауза - O(log n)
+    
+    Старение без пересчёта кучи: эффективный приоритет priority + ожидание / aging_seconds
+    упорядочивает задания так же, как постоянный ключ enqueued / aging_seconds - priority.
+    Изменённые и отменённые записи не вынимаются из кучи, а пропускаются при pop (по версии).
+    Задания - объекты с id, path, copies, printer и priority (job_queue.Job).
+    """
+    
+    def __init__(self, aging_seconds=AGING_SECONDS, clock=None):
+        self.aging_seconds = aging_seconds
+        self.clock = clock or time.monotonic
+        self._heap = []
+        self._entries = {}  # id -> _Entry
+        self._discarded = set()  # id забытых заданий: повторный push не печатает их снова
+        self._queued = 0
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        """Заданий, ждущих печати (без приостановленных)"""
+        return self._queued
+    
+    def _key(self, entry):
+        return entry.enqueued / self.aging_seconds - entry.priority
+    
+    def _heappush(self, entry):
+        heapq.heappush(self._heap, (self._key(entry), next(self._seq), entry.version, entry.job.id))
+        self._queued += 1
+        # Устаревших записей больше половины - куча пересобирается из живых за O(n)
+        if len(self._heap) > 2 * self._queued + 64:
+            self._heap = [item for item in self._heap if self._live(item)]
+            heapq.heapify(self._heap)
+    
+    def _live(self, item):
+        entry = self._entries.get(item[3])
+        return entry is not None and entry.state == QUEUED and entry.version == item[2]
+    
+    def push(self, job, paused=False, enqueued=None):
+        """Ставит задание; enqueued - время постановки (monotonic) для старения, по умолчанию сейчас.
+        Уже известное задание не ставится второй раз; для забытого (discard) возвращает None"""
+        with self._lock:
+            if job.id in self._discarded:
+                return None
+            entry = self._entries.get(job.id)
+            if entry is not None:
+                return entry.control
+            entry = _Entry(
+                job, job.priority, self.clock() if enqueued is None else enqueued,
+                functools.partial(self._paused, job.id)
+            )
+            self._entries[job.id] = entry
+            if paused:
+                entry.state = PAUSED
+            else:
+                self._heappush(entry)
+            return entry.control
+    
+    def push_many(self, jobs):
+        """Ставит задания очереди; приостановленные в очереди встают на паузу и здесь"""
+        for job in jobs:
+            self.push(job, job.paused)
+    
+    def pop(self):
+        """Задание с наибольшим эффективным приоритетом -> (job, JobControl); None - ждущих нет"""
+        with self._lock:
+            while self._heap:
+                item = heapq.heappop(self._heap)
+                if not self._live(item):
+                    continue
+                entry = self._entries[item[3]]
+                entry.state = ACTIVE
+                self._queued -= 1
+                return entry.job, entry.control
+            return None
+    
+    def drain(self):
+        """Все ждущие задания по порядку печати; для режимов, которым нужен весь список сразу"""
+        drained = []
+        while True:
+            item = self.pop()
+            if item is None:
+                return drained
+            drained.append(item)
+    
+    def entries(self):
+        """Для PrintEngine.run/PrinterPool.run: (id, (путь, копии, принтер), JobControl) по мере печати;
+        задания, добавленные во время печати, тоже попадают в обход"""
+        while True:
+            item = self.pop()
+            if item is None:
+                return
+            job, control = item
+            yield job.id, job.as_tuple(), control
+    
+    def job(self, job_id):
+        entry = self._entries.get(job_id)
+        return entry.job if entry else None
+    
+    def state(self, job_id):
+        entry = self._entries.get(job_id)
+        return entry.state if entry else None
+    
+    def set_priority(self, job_id, priority):
+        """Новый приоритет; ждущее задание переставляется в куче с прежним временем постановки"""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return False
+            entry.priority = priority
+            if entry.state == QUEUED:
+                entry.version += 1
+                self._queued -= 1
+                self._heappush(entry)
+            return True
+    
+    def cancel(self, job_id):
+        """Отменяет задание: ждущее не будет напечатано, печатаемое остановится на следующей странице
+        или копии; возвращает прежнее состояние или None"""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None or entry.state == CANCELLED:
+                return None
+            state = entry.state
+            if state == QUEUED:
+                self._queued -= 1
+            entry.state = CANCELLED
+            entry.control.cancel()
+            return state
+    
+    def _paused(self, job_id):
+        """Печатаемое задание остановилось на паузе: дальше оно ждёт resume, как не начатое"""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is not None and entry.state == ACTIVE and entry.control.paused:
+                entry.state = PAUSED
+    
+    def pause(self, job_id):
+        """Ждущее задание пропускается до resume, печатаемое возвращается в очередь на следующей
+        странице растра или перед отправкой (см. JobControl.checkpoint)"""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return False
+            if entry.state == QUEUED:
+                entry.state = PAUSED
+                self._queued -= 1
+            elif entry.state == ACTIVE:
+                entry.control.pause()
+            else:
+                return False
+            return True
+    
+    def resume(self, job_id):
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return False
+            if entry.state == PAUSED:
+                # Время ожидания до паузы сохраняется: старение продолжается с того же места
+                entry.control.resume()
+                entry.state = QUEUED
+                entry.version += 1
+                self._heappush(entry)
+            elif entry.state == ACTIVE:
+                entry.control.resume()
+            else:
+                return False
+            return True
+    
+    def update_waiting(self, job_id, update):
+        """Вызывает update() под блокировкой, если задание ещё ждёт печати (в очереди или на паузе);
+        True - вызвано. Взятое в печать задание уже прочитало копии, менять его поздно"""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None or entry.state not in (QUEUED, PAUSED):
+                return False
+            update()
+            return True
+    
+    def discard(self, job_id):
+        """Забывает задание, ушедшее в спулер или завершённое: пауза и отмена к нему больше не относятся"""
+        with self._lock:
+            self._discarded.add(job_id)
+            entry = self._entries.pop(job_id, None)
+            if entry is not None and entry.state == QUEUED:
+                self._queued -= 1
@@ -0,0 +1,250 @@
+"""Превью файлов очереди: рендер в пуле процессов сразу в нужном размере, кэш в памяти и на диске"""
+import os
+import time
+import hashlib
+import tempfile
+import threading
+import collections
+import importlib.util
+
+from autoprint import raster
+
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class Thumbnail:
+    """Готовое превью: сырые сэмплы RGB или Gray, уже вписанные в заданный размер"""
+    __slots__ = ('width', 'height', 'channels', 'samples')
+    
+    def __init__(self, width, height, channels, samples):
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.samples = samples
+
+
+def _fit_zoom(width, height, max_width, max_height):
+    return min(max_width / width, max_height / height)
+
+
+def render_thumbnail(file_path, max_width, max_height):
+    """Рендерит превью (выполняется в процессе пула); None - формат не поддерживается"""
+    ext = os.path.splitext(file_path)[1].lower()
+    
+    if ext in IMAGE_EXTENSIONS and PIL_AVAILABLE:
+        from PIL import Image
+        with Image.open(file_path) as image:
+            # JPEG декодируется сразу в уменьшенном масштабе
+            image.draft("RGB", (max_width, max_height))
+            image = image.convert("RGB")
+            image.thumbnail((max_width, max_height))
+            return image.width, image.height, 3, image.tobytes()
+    
+    if (ext == '.pdf' or ext in IMAGE_EXTENSIONS) and raster.FITZ_AVAILABLE:
+        import fitz
+        doc = fitz.open(file_path)
+        try:
+            page = doc.load_page(0)
+            zoom = _fit_zoom(page.rect.width, page.rect.height, max_width, max_height)
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            return pix.width, pix.height, pix.n, pix.samples
+        finally:
+            doc.close()
+    
+    return None
+
+
+def file_key(file_path, size):
+    """Ключ кэша: путь, размер файла, mtime и размер превью"""
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns) + tuple(size)
+
+
+def cache_path(directory, key):
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    return os.path.join(directory, digest[:2], digest + ".ppm")
+
+
+def load_cached(path):
+    """Превью из PPM-файла кэша или None"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    # Заголовок пишем сами: "P6 ширина высота 255\n"
+    header, _, samples = data.partition(b"\n")
+    try:
+        kind, width, height, _ = header.split()
+        width, height = int(width), int(height)
+    except ValueError:
+        return None
+    channels = 1 if kind == b"P5" else 3
+    if len(samples) != width * height * channels:
+        return None
+    # Время использования: очистка кэша удаляет давно не нужные
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return width, height, channels, samples
+
+
+def store_cached(path, result):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        width, height, channels, samples = result
+        kind = b"P5" if channels == 1 else b"P6"
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(kind + b" %d %d 255\n" % (width, height))
+            f.write(samples)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Vorschau-Cache nicht schreibbar: {e}")
+
+
+def load_thumbnail(file_path, max_width, max_height, directory, known=None):
+    """Выполняется в пуле: stat, кэш на диске, при промахе - рендер и запись в кэш
+    
+    Возвращает (ключ, превью или None, откуда): "same" - файл не менялся с known, превью не читалось;
+    "disk" - из кэша; "render" - отрендерено. На сетевом диске всё это идёт мимо GUI-потока.
+    """
+    key = file_key(file_path, (max_width, max_height))
+    if key == known:
+        return key, None, "same"
+    path = cache_path(directory, key)
+    result = load_cached(path)
+    if result is not None:
+        return key, result, "disk"
+    result = render_thumbnail(file_path, max_width, max_height)
+    if result is not None:
+        store_cached(path, result)
+    return key, result, "render"
+
+
+def prune_cache(directory, max_bytes, max_age_days):
+    """Удаляет превью старше max_age_days и самые давние сверх max_bytes; возвращает число удалённых"""
+    files = []
+    try:
+        for folder in os.scandir(directory):
+            if not folder.is_dir(follow_symlinks=False):
+                continue
+            for entry in os.scandir(folder.path):
+                stat = entry.stat(follow_symlinks=False)
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+    except OSError:
+        return 0
+    files.sort(reverse=True)
+    oldest = time.time() - max_age_days * 86400
+    total = 0
+    removed = 0
+    for mtime, size, path in files:
+        total += size
+        if mtime >= oldest and total <= max_bytes:
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+class ThumbnailCache:
+    """LRU в памяти + PPM-файлы на диске; ключ - путь, размер файла, mtime и размер превью
+    
+    get() читает только память и не трогает диск: из GUI-потока его можно звать без задержек
+    SMB. stat, чтение кэша и рендер идут в пуле процессов через request(). Кэш на диске
+    ограничен max_disk_mb и max_age_days и чистится в фоне при запуске и каждые prune_every рендеров.
+    """
+    
+    def __init__(self, size=(210, 300), directory=None, memory_items=256, max_disk_mb=200, max_age_days=30,
+                 prune_every=500):
+        if directory is None:
+            directory = os.environ.get(
+                "AUTOPRINT_THUMB_DIR",
+                os.path.join(tempfile.gettempdir(), "autoprint_thumbs")
+            )
+        self.directory = directory
+        self.size = size
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_mb * 1024 * 1024
+        self.max_age_days = max_age_days
+        self.prune_every = prune_every
+        self._memory = collections.OrderedDict()  # абсолютный путь -> (ключ, превью)
+        self._pending = {}  # путь -> колбэки, ждущие ту же проверку
+        self._rendered = 0
+        self._lock = threading.Lock()
+        self.prune()
+    
+    def prune(self):
+        """Чистит кэш на диске в фоновом потоке"""
+        threading.Thread(
+            target=prune_cache, args=(self.directory, self.max_disk_bytes, self.max_age_days), daemon=True
+        ).start()
+    
+    def get(self, file_path):
+        """Превью из памяти или None; диск не трогает - файл мог измениться, это проверит request()"""
+        entry = self._from_memory(os.path.abspath(file_path))
+        return entry[1] if entry else None
+    
+    def request(self, file_path, callback):
+        """Отдаёт превью в callback(path, thumbnail) из чужого потока: stat, диск и рендер - в пуле
+        
+        Превью в памяти для неизменённого файла отдаётся без чтения диска.
+        """
+        path = os.path.abspath(file_path)
+        with self._lock:
+            if path in self._pending:
+                self._pending[path].append(callback)
+                return
+            self._pending[path] = [callback]
+        
+        entry = self._from_memory(path)
+        width, height = self.size
+        future = raster.get_render_pool().submit(
+            load_thumbnail, path, width, height, self.directory, entry[0] if entry else None
+        )
+        future.add_done_callback(lambda f: self._finished(file_path, path, f, entry))
+    
+    def _finished(self, file_path, path, future, entry):
+        thumbnail = None
+        try:
+            key, result, source = future.result()
+            if source == "same":
+                thumbnail = entry[1]
+            elif result is not None:
+                thumbnail = Thumbnail(*result)
+                self._remember(path, key, thumbnail)
+            if source == "render":
+                with self._lock:
+                    self._rendered += 1
+                    prune = self._rendered % self.prune_every == 0
+                if prune:
+                    self.prune()
+        except OSError:
+            pass
+        except Exception as e:
+            print(f"Vorschau Fehler: {e}")
+        
+        with self._lock:
+            callbacks = self._pending.pop(path, [])
+        for callback in callbacks:
+            callback(file_path, thumbnail)
+    
+    def _from_memory(self, path):
+        with self._lock:
+            entry = self._memory.get(path)
+            if entry is not None:
+                self._memory.move_to_end(path)
+            return entry
+    
+    def _remember(self, path, key, thumbnail):
+        with self._lock:
+            self._memory[path] = (key, thumbnail)
+            self._memory.move_to_end(path)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
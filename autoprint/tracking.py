@@ -0,0 +1,177 @@
+"""Отслеживание заданий по очереди спулера вместо фиксированных пауз"""
+import time
+import threading
+import collections
+
+from autoprint.backends import JOB_SPOOLED, JOB_PRINTING, JOB_PRINTED, JOB_ERROR
+
+SPOOLED_STATES = (JOB_SPOOLED, JOB_PRINTING, JOB_PRINTED, JOB_ERROR)
+DONE_STATES = (JOB_PRINTED, JOB_ERROR)
+
+
+class TrackedJob:
+    """Задание, за которым следим: по id спулера или по имени документа"""
+    __slots__ = ('job_id', 'printer', 'document', 'state', 'seen', 'error',
+                 'submitted_at', 'spooled_at', 'done_at')
+    
+    def __init__(self, printer, job_id=None, document=None):
+        self.job_id = job_id
+        self.printer = printer
+        self.document = document
+        self.state = None
+        self.seen = False
+        self.error = None  # текст ошибки от бэкенда, если задание не дошло до принтера
+        self.submitted_at = time.monotonic()
+        self.spooled_at = None
+        self.done_at = None
+    
+    @property
+    def spool_latency(self):
+        if self.spooled_at is None:
+            return None
+        return self.spooled_at - self.submitted_at
+    
+    @property
+    def latency(self):
+        if self.done_at is None:
+            return None
+        return self.done_at - self.submitted_at
+    
+    def reached(self, until):
+        if until == JOB_SPOOLED:
+            return self.state in SPOOLED_STATES
+        return self.state in DONE_STATES
+
+
+class JobTracker:
+    """Опрашивает backend.poll() с адаптивным интервалом и таймаутом, копит задержки"""
+    
+    def __init__(self, backend, min_interval=0.05, max_interval=1.0,
+                 spool_timeout=30.0, print_timeout=600.0, history=200):
+        self.backend = backend
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.spool_timeout = spool_timeout
+        self.print_timeout = print_timeout
+        self._claimed = set()
+        self._ewma = {}
+        self._latencies = collections.defaultdict(lambda: collections.deque(maxlen=history))
+        self._lock = threading.Lock()
+    
+    def track(self, printer, job_ids, document=None):
+        """Начинает слежение; без id ищем задание по имени документа"""
+        if job_ids:
+            return [TrackedJob(printer, job_id, document) for job_id in job_ids]
+        return [TrackedJob(printer, None, document)]
+    
+    def timeout_for(self, printer, until):
+        """Таймаут по истории принтера: 4x сглаженной задержки, но в разумных пределах"""
+        base = self.spool_timeout if until == JOB_SPOOLED else self.print_timeout
+        ewma = self._ewma.get((printer, until))
+        if ewma is None:
+            return base
+        return min(max(ewma * 4, self.min_interval * 20), base)
+    
+    def wait(self, jobs, until=JOB_SPOOLED, timeout=None, cancel_event=None):
+        """Ждёт, пока все задания дойдут до until; True, если дождались"""
+        jobs = [job for job in jobs if not job.reached(until)]
+        if not jobs:
+            return True
+        
+        if timeout is None:
+            timeout = max(self.timeout_for(job.printer, until) for job in jobs)
+        deadline = time.monotonic() + timeout
+        interval = self.min_interval
+        
+        while True:
+            changed = self.update(jobs)
+            jobs = [job for job in jobs if not job.reached(until)]
+            if not jobs:
+                return True
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+            
+            now = time.monotonic()
+            if now >= deadline:
+                return False
+            # Изменения есть - опрашиваем чаще, тишина - реже
+            interval = self.min_interval if changed else min(interval * 1.5, self.max_interval)
+            time.sleep(min(interval, deadline - now))
+    
+    def update(self, jobs):
+        """Один опрос спулера на принтер; возвращает True, если что-то изменилось"""
+        changed = False
+        by_printer = collections.defaultdict(list)
+        for job in jobs:
+            by_printer[job.printer].append(job)
+        
+        for printer, printer_jobs in by_printer.items():
+            try:
+                active = self.backend.poll(printer)
+            except Exception as e:
+                print(f"Fehler beim Abfragen der Druckaufträge: {e}")
+                continue
+            by_id = {entry['id']: entry for entry in active}
+            
+            for job in printer_jobs:
+                entry = by_id.get(job.job_id) if job.job_id is not None else self._match(job, active)
+                if entry is not None:
+                    job.seen = True
+                    state = entry['state']
+                    job.error = entry.get('error') or job.error
+                elif job.seen or job.job_id is not None:
+                    # Исчезло из очереди после отправки - значит напечатано
+                    state = JOB_PRINTED
+                else:
+                    continue
+                
+                if state != job.state:
+                    self._set_state(job, state)
+                    changed = True
+        return changed
+    
+    def _match(self, job, active):
+        """Привязывает задание к первому свободному заданию спулера с тем же документом"""
+        for entry in active:
+            document = entry.get('document') or ""
+            key = (job.printer, entry['id'])
+            if job.document and job.document in document and key not in self._claimed:
+                self._claimed.add(key)
+                job.job_id = entry['id']
+                return entry
+        return None
+    
+    def _set_state(self, job, state):
+        now = time.monotonic()
+        job.state = state
+        if state in SPOOLED_STATES and job.spooled_at is None:
+            job.spooled_at = now
+            self._record(job.printer, JOB_SPOOLED, job.spool_latency)
+        if state in DONE_STATES and job.done_at is None:
+            job.done_at = now
+            self._claimed.discard((job.printer, job.job_id))
+            self._record(job.printer, JOB_PRINTED, job.latency)
+    
+    def _record(self, printer, until, latency):
+        with self._lock:
+            previous = self._ewma.get((printer, until))
+            self._ewma[(printer, until)] = latency if previous is None else previous * 0.8 + latency * 0.2
+            if until == JOB_PRINTED:
+                self._latencies[printer].append(latency)
+    
+    def stats(self, printer=None):
+        """Задержки submit -> напечатано: количество, среднее, медиана, максимум"""
+        with self._lock:
+            if printer is None:
+                values = [v for deque in self._latencies.values() for v in deque]
+            else:
+                values = list(self._latencies.get(printer, ()))
+        if not values:
+            return {'count': 0}
+        values.sort()
+        return {
+            'count': len(values),
+            'avg': round(sum(values) / len(values), 3),
+            'p50': round(values[len(values) // 2], 3),
+            'max': round(values[-1], 3),
+        }
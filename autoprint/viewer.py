@@ -0,0 +1,198 @@
+"""Резидентная программа просмотра для печати PDF: один процесс на все задания вместо запуска на каждую копию
+
+Adobe Reader передаёт «/t файл принтер» уже запущенному экземпляру и сразу выходит, поэтому
+ViewerSupervisor держит один экземпляр запущенным, запоминает его PID и трогает только свои
+процессы: Adobe, открытый пользователем, остаётся как был. python -m autoprint.viewer -
+программа-заглушка с тем же поведением для проверок без Windows.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+
+# Аргументы Adobe Reader: фоновый запуск без заставки и печать на заданный принтер
+ADOBE_RESIDENT_ARGS = ("/s", "/h")
+ADOBE_PRINT_ARGS = ("/t", "{file}", "{printer}")
+
+
+def _hidden():
+    """Параметры Popen, чтобы на Windows не мелькали окна"""
+    if sys.platform != "win32":
+        return {}
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    startupinfo.wShowWindow = subprocess.SW_HIDE
+    return {'startupinfo': startupinfo, 'creationflags': subprocess.CREATE_NO_WINDOW}
+
+
+class ViewerSupervisor:
+    """Держит один экземпляр программы просмотра: запуск при первой печати, перезапуск только
+    после сбоя, завершение в close()"""
+    
+    def __init__(self, command, resident_args=ADOBE_RESIDENT_ARGS, print_args=ADOBE_PRINT_ARGS,
+                 start_seconds=2.0, request_timeout=30.0):
+        self.command = [command] if isinstance(command, str) else list(command)
+        self.resident_args = list(resident_args)
+        self.print_args = list(print_args)
+        # Сколько ждать после запуска, пока программа начнёт принимать запросы
+        self.start_seconds = start_seconds
+        # Сколько ждать выхода процесса-запроса после того, как задание пришло в спулер
+        self.request_timeout = request_timeout
+        self.process = None
+        self.starts = 0
+        self.restarts = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+    
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+    
+    def _spawn(self, args):
+        # Вывод не читается никем: DEVNULL вместо PIPE, иначе процесс встанет на полном буфере
+        return subprocess.Popen(
+            self.command + args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **_hidden()
+        )
+    
+    def ensure(self):
+        """Запускает программу, если её нет; упавшая запускается заново и считается перезапуском"""
+        if self.running():
+            return
+        if self.process is not None:
+            print(f"Druckprogramm (PID {self.process.pid}) beendet mit Code {self.process.returncode}, "
+                  f"starte neu")
+            self.process = None
+            self.restarts += 1
+        self.process = self._spawn(self.resident_args)
+        self.starts += 1
+        time.sleep(self.start_seconds)
+    
+    def print_file(self, file_path, printer_name, wait):
+        """Отдаёт файл программе и ждёт его через wait(): id задания спулера или None
+        
+        None значит, что программа задание не напечатала: она перезапускается к следующему вызову.
+        """
+        with self._lock:
+            self.ensure()
+            args = [arg.format(file=file_path, printer=printer_name) for arg in self.print_args]
+            request = self._spawn(args)
+            try:
+                result = wait()
+            finally:
+                self._reap(request)
+            if result is None:
+                # Программа задание не отдала: завершаем её, следующий вызов запустит новую
+                self._stop()
+                self.restarts += 1
+            return result
+    
+    def _reap(self, request):
+        """Дожидается процесса-запроса; зависший завершается по своему PID"""
+        try:
+            request.wait(self.request_timeout)
+        except subprocess.TimeoutExpired:
+            request.kill()
+            request.wait()
+    
+    def _stop(self):
+        process, self.process = self.process, None
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(5.0)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    
+    def close(self):
+        with self._lock:
+            self._stop()
+
+
+class StandInViewer:
+    """Заглушка программы просмотра: резидентный экземпляр слушает локальный порт,
+    запрос «/t файл принтер» передаёт ему файл, как Adobe через DDE, и выходит"""
+    
+    def __init__(self, directory, startup=0.0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Имитация загрузки программы перед первым заданием
+        self.startup = startup
+        self.port_file = self.directory / "viewer.port"
+    
+    def print(self, file_path, printer_name):
+        """«Печатает»: копия файла в printed/ и строка в printed.jsonl с PID печатавшего процесса"""
+        printed = self.directory / "printed"
+        printed.mkdir(exist_ok=True)
+        target = printed / f"{time.time_ns()}_{os.path.basename(file_path)}"
+        shutil.copyfile(file_path, target)
+        with open(self.directory / "printed.jsonl", 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'file': str(file_path),
+                'printer': printer_name,
+                'pid': os.getpid(),
+                'payload': target.name,
+            }, ensure_ascii=False) + "\n")
+    
+    def resident(self):
+        time.sleep(self.startup)
+        server = socket.create_server(("127.0.0.1", 0))
+        temporary = self.port_file.with_suffix(".tmp")
+        temporary.write_text(str(server.getsockname()[1]))
+        os.replace(temporary, self.port_file)
+        with server:
+            while True:
+                connection, _ = server.accept()
+                with connection, connection.makefile('rwb') as stream:
+                    request = json.loads(stream.readline())
+                    self.print(request['file'], request['printer'])
+                    stream.write(b"ok\n")
+    
+    def request(self, file_path, printer_name):
+        """Передаёт задание резидентному экземпляру; без него печатает сам, как новый экземпляр"""
+        try:
+            port = int(self.port_file.read_text())
+            with socket.create_connection(("127.0.0.1", port), timeout=10.0) as connection:
+                with connection.makefile('rwb') as stream:
+                    stream.write(json.dumps({'file': str(file_path), 'printer': printer_name}).encode() + b"\n")
+                    stream.flush()
+                    if stream.readline().strip() == b"ok":
+                        return
+        except (OSError, ValueError):
+            pass
+        time.sleep(self.startup)
+        self.print(file_path, printer_name)
+
+
+def main(argv=None):
+    """python -m autoprint.viewer [/t ФАЙЛ ПРИНТЕР]: программа-заглушка для ViewerSupervisor"""
+    parser = argparse.ArgumentParser(description="Druckprogramm-Attrappe zum Testen ohne Adobe Reader")
+    parser.add_argument("--dir", required=True, help="Ordner für Port-Datei und gedruckte Dateien")
+    parser.add_argument("--startup", type=float, default=0.0, help="Simulierte Startzeit in Sekunden")
+    parser.add_argument("request", nargs="*", help="/t DATEI DRUCKER - Datei drucken")
+    args = parser.parse_args(argv)
+    
+    viewer = StandInViewer(args.dir, args.startup)
+    if not args.request:
+        viewer.resident()
+    elif args.request[0] == "/t" and len(args.request) == 3:
+        viewer.request(args.request[1], args.request[2])
+    else:
+        parser.error("erwartet: /t DATEI DRUCKER")
+
+
+if __name__ == "__main__":
+    main()
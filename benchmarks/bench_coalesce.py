@@ -0,0 +1,81 @@
+"""Замер склейки: каждое задание отдельно против общих PDF на IPP-заглушке с задержкой на запрос
+
+Запуск из корня репозитория: python benchmarks/bench_coalesce.py [--jobs 200] [--copies 2] [--latency 0.02]
+Задержка заглушки - накладные расходы принтера на задание (приём, разбор, разделитель);
+время склейки входит в замер.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoprint.backends import IppBackend
+from autoprint.coalesce import run_coalesced
+from autoprint.engine import PrintEngine
+from autoprint.ipp import IppStubServer
+
+
+def make_files(directory, count):
+    """Маленькие PDF по 1-3 страницы и PNG-кнопки вперемешку, как в папке заказов"""
+    import fitz
+    from PIL import Image
+    paths = []
+    for i in range(count):
+        if i % 3 == 2:
+            path = os.path.join(directory, f"Button{i:04d}.png")
+            Image.new("RGB", (600, 600), (i * 37 % 256, 120, 200)).save(path)
+        else:
+            path = os.path.join(directory, f"Auftrag{i:04d}.pdf")
+            doc = fitz.open()
+            for page_number in range(i % 3 + 1):
+                doc.new_page(width=298, height=420).insert_text((30, 60), f"Auftrag {i} Seite {page_number + 1}")
+            doc.save(path)
+            doc.close()
+        paths.append(path)
+    return paths
+
+
+def bench(jobs, latency, coalesce):
+    stub = IppStubServer(latency=latency).start()
+    backend = IppBackend({'IPP': stub.uri})
+    engine = PrintEngine(backend, wait_printed=False)
+    try:
+        started = time.perf_counter()
+        if coalesce:
+            summary = run_coalesced(lambda jobs, **callbacks: engine.run(jobs, 'IPP', **callbacks), jobs)
+        else:
+            summary = engine.run(jobs, 'IPP')
+        seconds = time.perf_counter() - started
+        return seconds, summary['printed'], len(stub.jobs), stub.requests
+    finally:
+        backend.close()
+        stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Sammelaufträge")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--copies", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.02, help="Antwortverzögerung des Stubs in Sekunden")
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix="autoprint_coalesce_")
+    try:
+        jobs = [(path, args.copies) for path in make_files(workdir, args.jobs)]
+        print(f"{'Modus':>15} {'Sekunden':>9} {'Dateien/s':>10} {'Gesendet':>9} {'Aufträge':>9} {'Anfragen':>9}")
+        baseline = None
+        for title, coalesce in (("einzeln", False), ("zusammengefasst", True)):
+            seconds, printed, submitted, requests = bench(jobs, args.latency, coalesce)
+            baseline = baseline or seconds
+            print(f"{title:>15} {seconds:9.2f} {len(jobs) / seconds:10.1f} {printed:>9} {submitted:>9} "
+                  f"{requests:>9}  (x{baseline / seconds:.1f})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Замер копий драйвера: копии в тикете задания против повторной отправки файла на каждую копию
+
+Запуск из корня репозитория: python benchmarks/bench_driver_copies.py [--copies 500] [--latency 0.02]
+Файловый бэкенд показывает, сколько байт уходит в спул; IPP-заглушка с задержкой - сколько
+заданий и запросов получает принтер. max_copies=1 - принтер без своих копий, как раньше.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoprint.backends import FileSinkBackend, IppBackend
+from autoprint.engine import PrintEngine
+from autoprint.ipp import IppStubServer
+
+
+def make_files(directory):
+    """Кнопка PNG и PDF на 4 страницы - типичный заказ на сотни копий"""
+    import fitz
+    from PIL import Image
+    image = os.path.join(directory, "Button.png")
+    Image.new("RGB", (600, 600), (200, 40, 90)).save(image)
+    pdf = os.path.join(directory, "Flyer.pdf")
+    doc = fitz.open()
+    for number in range(4):
+        doc.new_page(width=595, height=842).insert_text((60, 80), f"Flyer Seite {number + 1}")
+    doc.save(pdf)
+    doc.close()
+    return [image, pdf]
+
+
+def bench_file(jobs, max_copies, directory):
+    sink = os.path.join(directory, f"sink_{max_copies}")
+    backend = FileSinkBackend(sink, max_copies=max_copies)
+    # Файлы уходят как есть, как через Adobe/программу просмотра: видно, сколько раз спулится файл
+    engine = PrintEngine(backend, wait_printed=False, rasterize_pdf=False, rasterize_images=False)
+    started = time.perf_counter()
+    engine.run(jobs, "FileSink")
+    seconds = time.perf_counter() - started
+    with open(os.path.join(sink, "FileSink", "jobs.jsonl"), encoding='utf-8') as f:
+        spooled = [json.loads(line) for line in f]
+    return seconds, len(spooled), sum(job['bytes'] for job in spooled)
+
+
+def bench_ipp(jobs, max_copies, latency):
+    stub = IppStubServer(latency=latency, max_copies=max_copies).start()
+    backend = IppBackend({'IPP': stub.uri})
+    engine = PrintEngine(backend, wait_printed=False)
+    try:
+        started = time.perf_counter()
+        engine.run(jobs, 'IPP')
+        seconds = time.perf_counter() - started
+        return seconds, len(stub.jobs), stub.requests
+    finally:
+        backend.close()
+        stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Treiberkopien")
+    parser.add_argument("--copies", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02, help="Antwortverzögerung des Stubs in Sekunden")
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix="autoprint_copies_")
+    try:
+        jobs = [(path, args.copies) for path in make_files(workdir)]
+        print(f"{len(jobs)} Dateien x {args.copies} Kopien")
+        print(f"{'Modus':>18} {'Sekunden':>9} {'Aufträge':>9} {'Spool KB':>9}")
+        baseline = None
+        for title, max_copies in (("je Kopie", 1), ("Treiberkopien", 999)):
+            seconds, spooled, size = bench_file(jobs, max_copies, workdir)
+            baseline = baseline or seconds
+            print(f"{'file ' + title:>18} {seconds:9.2f} {spooled:>9} {size / 1e3:9.1f}  (x{baseline / seconds:.0f})")
+        print(f"{'Modus':>18} {'Sekunden':>9} {'Aufträge':>9} {'Anfragen':>9}")
+        baseline = None
+        for title, max_copies in (("je Kopie", 1), ("Treiberkopien", 999)):
+            seconds, submitted, requests = bench_ipp(jobs, max_copies, args.latency)
+            baseline = baseline or seconds
+            print(f"{'ipp ' + title:>18} {seconds:9.2f} {submitted:>9} {requests:>9}  (x{baseline / seconds:.0f})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
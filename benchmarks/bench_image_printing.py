@@ -0,0 +1,92 @@
+"""Замер печати картинок: декодирование на каждую копию против одного задания с копиями и кэша
+
+Запуск из корня репозитория: python benchmarks/bench_image_printing.py [--copies 200] [--size 3000x2000]
+Задание ничего не пишет: меряется только подготовка страницы, а не диск или драйвер.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoprint import raster
+from autoprint.backends import PrinterBackend, RasterJob
+
+
+class NullRasterJob(RasterJob):
+    def __init__(self, printer_name, title):
+        RasterJob.__init__(self, printer_name, title, dpi=600, color=True)
+        # A4 при 600 dpi
+        self.printable = (4960, 7016)
+    
+    def add_page(self, page):
+        self.pages += 1
+    
+    def close(self):
+        self.job_ids = [f"{self.title}-{self.pages}"]
+
+
+class NullBackend(PrinterBackend):
+    name = "null"
+    supports_raster = True
+    
+    def open_raster_job(self, printer_name, title, info=None, copies=1):
+        return NullRasterJob(printer_name, title)
+
+
+def per_copy(backend, path, copies):
+    """Как раньше через программу просмотра: каждая копия - своё задание и своё декодирование"""
+    for _ in range(copies):
+        raster.clear_image_cache()
+        raster.print_image_raster(backend, path, "Null", 1)
+
+
+def one_job(backend, path, copies):
+    raster.clear_image_cache()
+    raster.print_image_raster(backend, path, "Null", copies)
+
+
+def repeated(backend, path, copies):
+    """Та же кнопка снова и снова отдельными заданиями: страница берётся из кэша"""
+    raster.clear_image_cache()
+    for _ in range(copies):
+        raster.print_image_raster(backend, path, "Null", 1)
+
+
+MODES = (
+    ("pro Kopie", per_copy),
+    ("ein Auftrag", one_job),
+    ("wiederholt", repeated),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des Bilddrucks")
+    parser.add_argument("--copies", type=int, default=200)
+    parser.add_argument("--size", default="3000x2000", help="Bildgröße in Pixeln")
+    args = parser.parse_args()
+    
+    from PIL import Image
+    width, height = (int(value) for value in args.size.split("x"))
+    workdir = tempfile.mkdtemp(prefix="autoprint_image_")
+    try:
+        path = os.path.join(workdir, "Button.jpg")
+        Image.radial_gradient("L").resize((width, height)).convert("RGB").save(path, quality=90)
+        backend = NullBackend()
+        print(f"{'Modus':>12} {'Sekunden':>9} {'ms/Kopie':>9}")
+        baseline = None
+        for title, run in MODES:
+            started = time.perf_counter()
+            run(backend, path, args.copies)
+            seconds = time.perf_counter() - started
+            baseline = baseline or seconds
+            print(f"{title:>12} {seconds:9.3f} {seconds / args.copies * 1000:9.2f}  (x{baseline / seconds:.1f})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
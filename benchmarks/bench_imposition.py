@@ -0,0 +1,68 @@
+"""Замер сборки на листы: расчёт раскладки и отрисовка листов против страницы на каждую копию
+
+Запуск из корня репозитория: python benchmarks/bench_imposition.py [--files 500] [--copies 20] [--grid 3x4]
+Раскладка меряется отдельно от отрисовки: она должна занимать доли секунды и на 10k ячеек.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoprint.imposition import Layout, compute_placements, impose
+
+
+def make_buttons(directory, count):
+    """Круглые кнопки 600x600: разные цвета, чтобы картинки не совпадали"""
+    from PIL import Image, ImageDraw
+    paths = []
+    for i in range(count):
+        image = Image.new("RGB", (600, 600), "white")
+        ImageDraw.Draw(image).ellipse((0, 0, 599, 599), fill=(i * 37 % 256, i * 91 % 256, i * 53 % 256))
+        path = os.path.join(directory, f"Button{i:04d}.png")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Sammelbögen")
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--copies", type=int, default=20)
+    parser.add_argument("--grid", default="3x4", help="Raster SPALTENxZEILEN")
+    args = parser.parse_args()
+    
+    cols, rows = (int(value) for value in args.grid.split("x"))
+    layout = Layout(grid=(cols, rows))
+    workdir = tempfile.mkdtemp(prefix="autoprint_nup_")
+    try:
+        paths = make_buttons(workdir, args.files)
+        items = [(index, path, args.copies, 1) for index, path in enumerate(paths)]
+        
+        started = time.perf_counter()
+        placements = compute_placements(items, layout.per_sheet)
+        layout_seconds = time.perf_counter() - started
+        
+        output = os.path.join(workdir, "sheets")
+        os.makedirs(output)
+        started = time.perf_counter()
+        imposed = impose(items, layout, output)
+        render_seconds = time.perf_counter() - started
+        
+        sheets = sum(job.pages for job in imposed)
+        size = sum(os.path.getsize(job.path) for job in imposed)
+        print(f"Motive: {len(placements)} ({args.files} Dateien x {args.copies}), {layout.per_sheet} pro Bogen")
+        print(f"Raster: {layout_seconds * 1000:.1f} ms ({len(placements) / layout_seconds:,.0f} Motive/s)")
+        print(f"Bögen:  {render_seconds:.2f} s für {sheets} Bögen ({sheets / render_seconds:.0f} Bögen/s), "
+              f"{size / 1e6:.1f} MB")
+        print(f"Aufträge: {len(imposed)} statt {len(placements)} "
+              f"(x{len(placements) / len(imposed):.0f} weniger), Seiten: {sheets} statt {len(placements)}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
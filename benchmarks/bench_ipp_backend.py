@@ -0,0 +1,76 @@
+"""Замер IPP-бэкенда: ожидание каждого задания против фоновой отправки по keep-alive соединениям
+
+Запуск из корня репозитория: python benchmarks/bench_ipp_backend.py [--jobs 100] [--size-kb 256] [--latency 0.02]
+Принтер заменяет IppStubServer; latency - задержка ответа на каждый запрос (сеть и разбор у принтера).
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoprint.backends import IppBackend
+from autoprint.engine import PrintEngine
+from autoprint.ipp import IppStubServer
+
+# (название, фоновая отправка, одновременных отправок)
+MODES = (
+    ("seriell", False, 1),
+    ("Pipeline 1", True, 1),
+    ("Pipeline 4", True, 4),
+)
+
+
+def make_files(directory, count, size_kb):
+    paths = []
+    block = os.urandom(size_kb * 1024)
+    for i in range(count):
+        path = os.path.join(directory, f"Auftrag{i}.pdf")
+        with open(path, 'wb') as f:
+            f.write(b"%PDF-1.4\n" + block)
+        paths.append(path)
+    return paths
+
+
+def bench(paths, latency, pipelined, in_flight):
+    stub = IppStubServer(latency=latency).start()
+    backend = IppBackend({'IPP': stub.uri}, max_in_flight=in_flight)
+    # Без фоновой отправки движок ждёт приёма каждого задания, как с Win32/CUPS
+    backend.pipelined = pipelined
+    engine = PrintEngine(backend, wait_printed=False)
+    try:
+        started = time.perf_counter()
+        summary = engine.run([(path, 1) for path in paths], 'IPP')
+        seconds = time.perf_counter() - started
+        return seconds, summary['printed'], stub.requests, stub.connections
+    finally:
+        backend.close()
+        stub.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des IPP-Backends")
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--size-kb", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.02, help="Antwortverzögerung des Stubs in Sekunden")
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix="autoprint_ipp_")
+    try:
+        paths = make_files(workdir, args.jobs, args.size_kb)
+        print(f"{'Modus':>11} {'Sekunden':>9} {'Aufträge/s':>11} {'Gesendet':>9} {'Anfragen':>9} {'Verbindungen':>12}")
+        baseline = None
+        for title, pipelined, in_flight in MODES:
+            seconds, printed, requests, connections = bench(paths, args.latency, pipelined, in_flight)
+            baseline = baseline or seconds
+            print(f"{title:>11} {seconds:9.2f} {len(paths) / seconds:11.1f} {printed:>9} {requests:>9} "
+                  f"{connections:>12}  (x{baseline / seconds:.2f})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
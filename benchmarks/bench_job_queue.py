@@ -0,0 +1,76 @@
+"""Замер очереди заданий: добавление 100k файлов, поиск, изменение копий и удаление
+
+Запуск из корня репозитория: python benchmarks/bench_job_queue.py [--jobs 100000]
+Для сравнения меряется и прежняя схема (список + проверка 'in'), на меньшем объёме.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoprint.job_queue import JobQueue, DUPLICATES_ALLOW, DUPLICATES_MERGE
+
+
+def timed(label, func, count):
+    started = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - started
+    print(f"{label:<34} {seconds * 1000:9.1f} ms  {seconds / count * 1e6:7.2f} µs/op")
+    return result
+
+
+def bench_job_queue(paths):
+    count = len(paths)
+    queue = JobQueue()
+    timed("JobQueue.add (einzeln)", lambda: [queue.add(path, 1) for path in paths], count)
+    
+    queue = JobQueue()
+    jobs = timed("JobQueue.add_many", lambda: queue.add_many((path, 1) for path in paths), count)
+    timed("JobQueue.add_many (Duplikate)", lambda: queue.add_many((path, 1) for path in paths), count)
+    timed("JobQueue.find", lambda: [queue.find(path) for path in paths], count)
+    timed("JobQueue.set_copies", lambda: [queue.set_copies(job.id, 3) for job in jobs], count)
+    timed("JobQueue.snapshot", queue.snapshot, count)
+    timed("JobQueue.remove", lambda: [queue.remove(job.id) for job in reversed(jobs)], count)
+    assert len(queue) == 0
+    
+    for policy in (DUPLICATES_ALLOW, DUPLICATES_MERGE):
+        queue = JobQueue(duplicates=policy)
+        timed(f"JobQueue.add_many x2 ({policy})", lambda: queue.add_many(
+            (path, 1) for _ in range(2) for path in paths
+        ), count * 2)
+
+
+def bench_list_queue(paths):
+    """Прежняя схема из окна: список путей + словарь копий"""
+    count = len(paths)
+    queue = []
+    copies = {}
+    
+    def add_all():
+        for path in paths:
+            if path not in queue:
+                queue.append(path)
+                copies[path] = 1
+    
+    timed(f"list + 'in' ({count})", add_all, count)
+    timed(f"list.remove ({count})", lambda: [queue.remove(path) for path in reversed(paths)], count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Druckwarteschlange")
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--list-jobs", type=int, default=10000, help="Umfang für die alte Listen-Variante")
+    args = parser.parse_args()
+    
+    paths = [f"C:\\Druck\\Ordner{i // 1000}\\Datei{i}.pdf" for i in range(args.jobs)]
+    print(f"JobQueue mit {args.jobs} Aufträgen")
+    bench_job_queue(paths)
+    if args.list_jobs:
+        print(f"Alte Liste mit {args.list_jobs} Aufträgen")
+        bench_list_queue(paths[:args.list_jobs])
+
+
+if __name__ == "__main__":
+    main()
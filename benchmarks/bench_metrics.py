@@ -0,0 +1,55 @@
+"""Замер накладных расходов метрик: span/inc выключенных и включённых метрик на одну операцию
+
+Запуск из корня репозитория: python benchmarks/bench_metrics.py [--calls 200000]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoprint.metrics import Metrics, DISABLED
+
+
+def per_call(func, calls):
+    started = time.perf_counter()
+    func(calls)
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def spans(metrics):
+    def run(calls):
+        for _ in range(calls):
+            with metrics.span('submit', "Drucker", "win32"):
+                pass
+    return run
+
+
+def counters(metrics):
+    def run(calls):
+        for _ in range(calls):
+            metrics.inc('jobs', "Drucker", "win32", "spooled")
+    return run
+
+
+def baseline(calls):
+    for _ in range(calls):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Metriken")
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+    
+    empty = per_call(baseline, args.calls)
+    print(f"{'Variante':<22} {'ns/Aufruf':>10}")
+    print(f"{'leere Schleife':<22} {empty:10.0f}")
+    for label, metrics in (("aus", DISABLED), ("an", Metrics())):
+        print(f"{'span ' + label:<22} {per_call(spans(metrics), args.calls) - empty:10.0f}")
+        print(f"{'inc ' + label:<22} {per_call(counters(metrics), args.calls) - empty:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
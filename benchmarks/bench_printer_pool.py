@@ -0,0 +1,66 @@
+"""Замер пула принтеров: один и тот же набор заданий на 1, 2 и 4 принтера
+
+Запуск из корня репозитория: python benchmarks/bench_printer_pool.py [--jobs 40] [--print-seconds 0.05]
+Печать симулирует file-бэкенд: print_seconds на страницу, каждый принтер печатает по одному заданию.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoprint.backends import FileSinkBackend
+from autoprint.engine import PrintEngine
+from autoprint.pool import PrinterPool, POLICIES
+
+
+def make_files(directory, count):
+    """Маленькие PNG по одной странице - время задаёт симуляция принтера, а не рендер"""
+    from PIL import Image
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"Seite{i}.png")
+        Image.new("RGB", (64, 64), (i % 256, 0, 0)).save(path)
+        paths.append(path)
+    return paths
+
+
+def bench(paths, printers, policy, print_seconds, sink):
+    names = [f"Drucker{i + 1}" for i in range(printers)]
+    backend = FileSinkBackend(directory=sink, printers=names, print_seconds=print_seconds)
+    engine = PrintEngine(backend)
+    started = time.perf_counter()
+    summary = PrinterPool(engine, names, policy=policy).run([(path, 1) for path in paths])
+    seconds = time.perf_counter() - started
+    per_printer = " ".join(f"{counters['jobs']:>3}" for counters in summary['printers'].values())
+    return seconds, summary['confirmed'], per_printer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des Druckerpools")
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--print-seconds", type=float, default=0.05, help="Simulierte Sekunden pro Seite")
+    parser.add_argument("--printers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix="autoprint_pool_")
+    try:
+        paths = make_files(workdir, args.jobs)
+        sink = os.path.join(workdir, "sink")
+        print(f"{'Drucker':>7} {'Verteilung':>12} {'Sekunden':>9} {'Bestätigt':>9}  Aufträge je Drucker")
+        for policy in POLICIES:
+            baseline = None
+            for printers in args.printers:
+                seconds, confirmed, per_printer = bench(paths, printers, policy, args.print_seconds, sink)
+                baseline = baseline or seconds
+                print(f"{printers:>7} {policy:>12} {seconds:9.2f} {confirmed:>9}  {per_printer}"
+                      f"  (x{baseline / seconds:.2f})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
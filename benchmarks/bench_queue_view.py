@@ -0,0 +1,101 @@
+"""Замер списка очереди: время одного добавления при разном размере очереди
+
+Запуск из корня репозитория: python benchmarks/bench_queue_view.py [--sizes 100 1000 10000 100000]
+Qt работает без экрана (offscreen). Для сравнения меряется прежний QListWidget,
+который после каждого добавления очищался и заполнялся заново (на малых размерах).
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtWidgets import QApplication, QListView, QListWidget
+
+from auto_print_final import QueueListModel
+from autoprint.job_queue import JobQueue
+
+
+def paths(count, prefix="Datei"):
+    return [f"C:\\Druck\\{prefix}{i}.pdf" for i in range(count)]
+
+
+def bench_model(app, size, samples):
+    queue = JobQueue()
+    model = QueueListModel(queue)
+    view = QListView()
+    # Те же настройки, что у списка очереди в окне
+    view.setUniformItemSizes(True)
+    view.setLayoutMode(QListView.Batched)
+    view.setBatchSize(200)
+    view.setModel(model)
+    view.resize(400, 120)
+    view.show()
+    
+    model.add_jobs(queue.add_many((path, 1) for path in paths(size)))
+    app.processEvents()
+    
+    started = time.perf_counter()
+    for path in paths(samples, prefix="Neu"):
+        model.add_jobs([queue.add(path, 1)])
+        app.processEvents()
+    seconds = (time.perf_counter() - started) / samples
+    
+    # Изменение копий и удаление тоже построчные
+    job = queue.first()
+    started = time.perf_counter()
+    queue.set_copies(job.id, 5)
+    model.job_changed(job.id)
+    app.processEvents()
+    changed = time.perf_counter() - started
+    
+    view.close()
+    return seconds, changed
+
+
+def bench_list_widget(app, size, samples):
+    """Прежняя схема update_queue_display: clear() и все строки заново"""
+    widget = QListWidget()
+    widget.resize(400, 120)
+    widget.show()
+    queued = paths(size)
+    
+    def rebuild():
+        widget.clear()
+        widget.addItems([f"{i+1}. {os.path.basename(file_path)} (1x)" for i, file_path in enumerate(queued)])
+    
+    rebuild()
+    app.processEvents()
+    started = time.perf_counter()
+    for path in paths(samples, prefix="Neu"):
+        queued.append(path)
+        rebuild()
+        app.processEvents()
+    seconds = (time.perf_counter() - started) / samples
+    widget.close()
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Warteschlangen-Ansicht")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--samples", type=int, default=200, help="Einfügungen pro Messung")
+    parser.add_argument("--widget-limit", type=int, default=10000,
+                        help="Alte QListWidget-Variante nur bis zu dieser Größe messen")
+    args = parser.parse_args()
+    
+    app = QApplication.instance() or QApplication([])
+    print(f"{'Größe':>8} {'Modell µs/add':>15} {'dataChanged µs':>15} {'QListWidget µs/add':>19}")
+    for size in args.sizes:
+        per_add, changed = bench_model(app, size, args.samples)
+        if size <= args.widget_limit:
+            widget = f"{bench_list_widget(app, size, max(args.samples // 10, 1)) * 1e6:19.0f}"
+        else:
+            widget = f"{'-':>19}"
+        print(f"{size:>8} {per_add * 1e6:15.1f} {changed * 1e6:15.1f} {widget}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Замер RAW-бэкенда: постоянные соединения и копии PJL против нового соединения и повторной отправки
+
+Запуск из корня репозитория: python benchmarks/bench_raw_backend.py [--jobs 200] [--size-kb 512] [--copies 3]
+Принтер заменяет локальный приёмник RawSink: он только читает поток и разбирает задания PJL.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoprint.backends import RawSocketBackend
+from autoprint.rawsocket import RawSink
+
+# (название, постоянные соединения с PJL, режим копий)
+MODES = (
+    ("PJL, Pool", True, "pjl"),
+    ("PJL, resend", True, "resend"),
+    ("ohne PJL", False, "resend"),
+)
+
+
+def make_files(directory, count, size_kb):
+    """Псевдо-PDF нужного размера: приёмник содержимое не разбирает"""
+    paths = []
+    block = os.urandom(size_kb * 1024)
+    for i in range(count):
+        path = os.path.join(directory, f"Auftrag{i}.pdf")
+        with open(path, 'wb') as f:
+            f.write(b"%PDF-1.4\n" + block)
+        paths.append(path)
+    return paths
+
+
+def bench(paths, copies, pjl, copies_mode):
+    sink = RawSink().start()
+    backend = RawSocketBackend({'Raw': ("127.0.0.1", sink.port)}, copies_mode=copies_mode, pjl=pjl)
+    try:
+        started = time.perf_counter()
+        jobs = 0
+        for path in paths:
+            jobs += len(backend.submit(path, 'Raw', copies))
+        sink.wait_jobs(jobs, timeout=60)
+        seconds = time.perf_counter() - started
+        pool = backend._pools['Raw']
+        return seconds, sink.bytes, sink.connections, pool.reused
+    finally:
+        backend.close()
+        sink.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des RAW-Backends (Port 9100)")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--copies", type=int, default=3)
+    args = parser.parse_args()
+    
+    workdir = tempfile.mkdtemp(prefix="autoprint_raw_")
+    try:
+        paths = make_files(workdir, args.jobs, args.size_kb)
+        print(f"{'Modus':>12} {'Sekunden':>9} {'Aufträge/s':>11} {'MB gesendet':>12} {'MB/s':>8} "
+              f"{'Verbindungen':>12} {'Wiederverwendet':>15}")
+        for title, pjl, copies_mode in MODES:
+            seconds, sent, connections, reused = bench(paths, args.copies, pjl, copies_mode)
+            print(f"{title:>12} {seconds:9.3f} {len(paths) / seconds:11.1f} {sent / 1e6:12.1f} "
+                  f"{sent / 1e6 / seconds:8.1f} {connections:>12} {reused:>15}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
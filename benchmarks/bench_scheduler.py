@@ -0,0 +1,80 @@
+"""Замер планировщика: push/pop в большой очереди и ожидание срочного задания против FIFO
+
+Запуск из корня репозитория: python benchmarks/bench_scheduler.py [--jobs 100000] [--seconds 5]
+Печать моделируется временем на задание (--seconds): срочное задание ставится в конец длинной очереди.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autoprint.job_queue import Job, PRIORITY_RUSH
+from autoprint.scheduler import PriorityScheduler
+
+
+def make_jobs(count):
+    return [Job(number, f"Datei_{number}.pdf") for number in range(1, count + 1)]
+
+
+def bench_operations(count):
+    scheduler = PriorityScheduler()
+    jobs = make_jobs(count)
+    started = time.perf_counter()
+    for job in jobs:
+        scheduler.push(job, enqueued=0.0)
+    pushed = time.perf_counter() - started
+    
+    # Каждое десятое задание меняет приоритет, каждое двадцатое отменяется
+    random.seed(1)
+    sample = random.sample(jobs, count // 10)
+    started = time.perf_counter()
+    for number, job in enumerate(sample):
+        if number % 2:
+            scheduler.cancel(job.id)
+        else:
+            scheduler.set_priority(job.id, PRIORITY_RUSH)
+    changed = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    popped = len(scheduler.drain())
+    drained = time.perf_counter() - started
+    return pushed / count, changed / len(sample), drained / popped, popped
+
+
+def rush_wait(count, seconds):
+    """Через сколько секунд «печати» начнётся срочное задание, поставленное последним"""
+    now = [0.0]
+    scheduler = PriorityScheduler(clock=lambda: now[0])
+    for job in make_jobs(count):
+        scheduler.push(job)
+    rush = Job(count + 1, "Eilig.pdf")
+    rush.priority = PRIORITY_RUSH
+    scheduler.push(rush)
+    while True:
+        job, _ = scheduler.pop()
+        if job is rush:
+            return now[0]
+        now[0] += seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des Druckplaners")
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--seconds", type=float, default=5.0, help="Simulierte Druckzeit je Auftrag")
+    args = parser.parse_args()
+    
+    push, change, pop, popped = bench_operations(args.jobs)
+    print(f"{args.jobs} Aufträge: push {push * 1e6:.2f} µs, Priorität/Abbruch {change * 1e6:.2f} µs, "
+          f"pop {pop * 1e6:.2f} µs ({popped} gedruckt)")
+    
+    print(f"{'Warteschlange':>14} {'FIFO s':>10} {'Planer s':>10}")
+    for queued in (10, 100, 1000):
+        fifo = queued * args.seconds
+        print(f"{queued:>14} {fifo:10.0f} {rush_wait(queued, args.seconds):10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Замер печати через программу просмотра: запуск на каждую копию против одного резидентного экземпляра
+
+Запуск из корня репозитория: python benchmarks/bench_viewer.py [--copies 20] [--startup 0.5]
+Вместо Adobe - заглушка python -m autoprint.viewer с --startup секунд загрузки; задание
+считается принятым, когда заглушка запишет его в printed.jsonl (как появление в спулере).
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from autoprint.viewer import ViewerSupervisor
+
+
+def printed_waiter(directory, count, timeout=10.0):
+    """wait() для ViewerSupervisor: ждёт count-ю строку в printed.jsonl"""
+    log = os.path.join(directory, "printed.jsonl")
+    
+    def wait():
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if os.path.exists(log):
+                with open(log, encoding='utf-8') as f:
+                    if sum(1 for _ in f) >= count:
+                        return count
+            time.sleep(0.005)
+        return None
+    return wait
+
+
+def bench(path, copies, startup, directory, resident):
+    command = [sys.executable, "-m", "autoprint.viewer", "--dir", directory, "--startup", str(startup)]
+    supervisor = None
+    started = time.perf_counter()
+    for copy in range(1, copies + 1):
+        if supervisor is None:
+            supervisor = ViewerSupervisor(command, resident_args=(), start_seconds=startup + 0.1)
+        supervisor.print_file(path, "Stub", printed_waiter(directory, copy))
+        if not resident:
+            # Как раньше: программа закрывается после каждой копии и грузится заново
+            supervisor.close()
+            supervisor = None
+    seconds = time.perf_counter() - started
+    starts = copies if not resident else supervisor.starts
+    if supervisor is not None:
+        supervisor.close()
+    return seconds, starts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des Druckprogramms")
+    parser.add_argument("--copies", type=int, default=20)
+    parser.add_argument("--startup", type=float, default=0.5, help="Simulierte Startzeit des Programms in Sekunden")
+    args = parser.parse_args()
+    
+    os.environ["PYTHONPATH"] = ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")
+    workdir = tempfile.mkdtemp(prefix="autoprint_viewer_")
+    try:
+        path = os.path.join(workdir, "Auftrag.pdf")
+        with open(path, 'wb') as f:
+            f.write(b"%PDF-1.4\n%%EOF\n")
+        print(f"{'Modus':>12} {'Sekunden':>9} {'Kopien/s':>9} {'Starts':>7}")
+        baseline = None
+        for title, resident in (("je Kopie", False), ("resident", True)):
+            directory = os.path.join(workdir, title.replace(" ", "_"))
+            seconds, starts = bench(path, args.copies, args.startup, directory, resident)
+            baseline = baseline or seconds
+            print(f"{title:>12} {seconds:9.2f} {args.copies / seconds:9.1f} {starts:>7}  (x{baseline / seconds:.1f})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
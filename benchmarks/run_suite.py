@@ -0,0 +1,367 @@
+"""Набор замеров AutoPrint без экрана и принтера: обход папок, очередь, превью и печать
+
+Запуск из корня репозитория:
+    python benchmarks/run_suite.py --output result.json
+    python benchmarks/run_suite.py --output new.json --baseline result.json
+
+Qt работает offscreen, печать идёт в file-бэкенд. Нагрузка (10k PNG, 500 многостраничных PDF,
+глубокое дерево папок) создаётся один раз в --workdir и переиспользуется.
+Для каждой фазы: операций в секунду и p50/p99 задержки одной операции.
+С --baseline результат сравнивается с прошлым прогоном по порогам из thresholds.json;
+код выхода 1 - есть регрессия.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import tempfile
+import threading
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+THRESHOLDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+
+SIZES = {
+    'full': {'pngs': 10000, 'pdfs': 500, 'pages': 4, 'depth': 5, 'fanout': 4, 'tree_files': 20},
+    'quick': {'pngs': 1000, 'pdfs': 50, 'pages': 4, 'depth': 3, 'fanout': 4, 'tree_files': 20},
+}
+
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def stage_result(ops, seconds, samples):
+    """Сводка фазы: samples - задержки отдельных операций в секундах"""
+    return {
+        'ops': ops,
+        'seconds': round(seconds, 4),
+        'ops_per_sec': round(ops / seconds, 1) if seconds else None,
+        'p50_ms': round(percentile(samples, 0.50) * 1000, 3) if samples else None,
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 3) if samples else None,
+        'samples': len(samples),
+    }
+
+
+# Нагрузка
+
+def make_pngs(directory, count):
+    from PIL import Image
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(1)
+    for i in range(count):
+        # Разные размеры и цвета, чтобы превью не были одинаковыми
+        size = (rng.randint(200, 800), rng.randint(200, 800))
+        Image.new("RGB", size, (rng.randrange(256), rng.randrange(256), rng.randrange(256))).save(
+            os.path.join(directory, f"Bild{i:05d}.png")
+        )
+
+
+def make_pdfs(directory, count, pages):
+    import fitz
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        doc = fitz.open()
+        for page_number in range(pages):
+            # A6: печать рендерится на DPI принтера, маленький формат держит замер коротким
+            page = doc.new_page(width=298, height=420)
+            page.insert_text((30, 60), f"Auftrag {i} Seite {page_number + 1}", fontsize=14)
+            page.draw_rect(fitz.Rect(20, 80, 278, 400), color=(0.2, 0.3, 0.6), fill=(0.85, 0.9, 1.0))
+        doc.save(os.path.join(directory, f"Dokument{i:04d}.pdf"))
+        doc.close()
+
+
+def make_tree(directory, depth, fanout, files_per_dir):
+    """Дерево папок глубины depth; пустые файлы - обходу нужны только имена"""
+    count = 0
+    level = [directory]
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            for branch in range(fanout):
+                path = os.path.join(parent, f"Ordner{branch}")
+                os.makedirs(path, exist_ok=True)
+                for i in range(files_per_dir):
+                    extension = ('.pdf', '.png', '.txt')[i % 3]
+                    open(os.path.join(path, f"Datei{i}{extension}"), 'wb').close()
+                    count += 1
+                next_level.append(path)
+        level = next_level
+    return count
+
+
+def prepare_workload(workdir, size):
+    """Создаёт нагрузку, если её ещё нет или параметры другие"""
+    marker = os.path.join(workdir, "workload.json")
+    if os.path.exists(marker):
+        with open(marker, 'r', encoding='utf-8') as f:
+            if json.load(f) == size:
+                return
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(workdir)
+    started = time.perf_counter()
+    print("Erzeuge Testdaten...", file=sys.stderr)
+    make_pngs(os.path.join(workdir, "png"), size['pngs'])
+    make_pdfs(os.path.join(workdir, "pdf"), size['pdfs'], size['pages'])
+    make_tree(os.path.join(workdir, "tree"), size['depth'], size['fanout'], size['tree_files'])
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump(size, f)
+    print(f"Testdaten in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+
+
+def list_files(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory))
+
+
+# Фазы
+
+def bench_ingest(tree):
+    """DirectoryIngest по дереву; задержка - scandir одной папки"""
+    from autoprint import ingest
+    samples = []
+    scan = ingest.scan_directory
+    
+    def timed_scan(directory, extensions):
+        started = time.perf_counter()
+        try:
+            return scan(directory, extensions)
+        finally:
+            samples.append(time.perf_counter() - started)
+    
+    found = []
+    ingest.scan_directory = timed_scan
+    try:
+        started = time.perf_counter()
+        summary = ingest.DirectoryIngest(tree, found.extend).run()
+        seconds = time.perf_counter() - started
+    finally:
+        ingest.scan_directory = scan
+    result = stage_result(summary['files'], seconds, samples)
+    result['directories'] = summary['directories']
+    return result
+
+
+def bench_add_to_queue(app, window, paths):
+    """add_to_queue окна по одному файлу (как при перетаскивании)"""
+    samples = []
+    started = time.perf_counter()
+    for i, path in enumerate(paths):
+        call_started = time.perf_counter()
+        window.add_to_queue(path)
+        samples.append(time.perf_counter() - call_started)
+        if i % 100 == 99:
+            app.processEvents()
+    app.processEvents()
+    return stage_result(len(paths), time.perf_counter() - started, samples)
+
+
+def bench_queue_view(app, window, paths):
+    """Добавление в уже полную очередь с перерисовкой списка после каждого файла"""
+    samples = []
+    started = time.perf_counter()
+    for path in paths:
+        call_started = time.perf_counter()
+        window.add_to_queue(path)
+        app.processEvents()
+        samples.append(time.perf_counter() - call_started)
+    return stage_result(len(paths), time.perf_counter() - started, samples)
+
+
+def bench_preview_cold(paths, thumb_dir):
+    """Рендер превью в пуле процессов с пустым кэшем; задержка - от запроса до готового превью"""
+    from autoprint.thumbnails import ThumbnailCache
+    cache = ThumbnailCache(size=(210, 300), directory=thumb_dir)
+    samples = []
+    done = threading.Event()
+    remaining = [len(paths)]
+    lock = threading.Lock()
+    
+    def on_ready(path, thumbnail, requested):
+        with lock:
+            samples.append(time.perf_counter() - requested)
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                done.set()
+    
+    started = time.perf_counter()
+    for path in paths:
+        requested = time.perf_counter()
+        cache.request(path, lambda path, thumbnail, requested=requested: on_ready(path, thumbnail, requested))
+    done.wait(600)
+    return stage_result(len(paths), time.perf_counter() - started, samples)
+
+
+def bench_preview_warm(app, window, paths):
+    """generate_preview окна для уже отрендеренных файлов: кэш на диске/в памяти и QPixmap"""
+    # Первый проход заполняет кэш окна с диска, второй мерится
+    for path in paths:
+        window.thumbnails.request(path, lambda path, thumbnail: None)
+    deadline = time.monotonic() + 120
+    while any(window.thumbnails.get(path) is None for path in paths[-5:]) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    
+    samples = []
+    started = time.perf_counter()
+    for path in paths:
+        call_started = time.perf_counter()
+        window.generate_preview(path)
+        samples.append(time.perf_counter() - call_started)
+    app.processEvents()
+    return stage_result(len(paths), time.perf_counter() - started, samples)
+
+
+def bench_dispatch(window, paths):
+    """print_queue_worker окна на file-бэкенде; задержка - отправка до приёма спулером, из журнала печати"""
+    from autoprint.scheduler import PriorityScheduler
+    window.reset_ui()
+    for path in paths:
+        window.add_to_queue(path)
+    printer = window.backend.default_printer()
+    
+    # Как start_printing: задания идут через планировщик, только синхронно
+    scheduler = PriorityScheduler()
+    scheduler.push_many(window.print_queue.jobs())
+    
+    started = time.perf_counter()
+    window.print_queue_worker(printer, 1, scheduler=scheduler)
+    seconds = time.perf_counter() - started
+    
+    entries = list(window.print_log.entries())
+    # seconds в журнале включает ожидание подтверждения в конце прогона, spool_seconds - нет
+    samples = [entry['spool_seconds'] for entry in entries if entry.get('spool_seconds') is not None]
+    result = stage_result(len(paths), seconds, samples)
+    result['pages'] = sum(entry.get('pages') or 0 for entry in entries)
+    result['pages_per_sec'] = round(result['pages'] / seconds, 1) if seconds else None
+    return result
+
+
+def run_suite(args):
+    size = dict(SIZES['quick' if args.quick else 'full'])
+    for key in ('pngs', 'pdfs'):
+        if getattr(args, key):
+            size[key] = getattr(args, key)
+    workdir = os.path.abspath(args.workdir)
+    prepare_workload(workdir, size)
+    pngs = list_files(os.path.join(workdir, "png"))
+    pdfs = list_files(os.path.join(workdir, "pdf"))
+    
+    # Всё, что окно пишет на диск (конфиг, журналы, кэш, "принтер"), - во временную папку
+    run_dir = tempfile.mkdtemp(prefix="autoprint_suite_")
+    os.environ['AUTOPRINT_BACKEND'] = "file"
+    os.environ['AUTOPRINT_SINK_DIR'] = os.path.join(run_dir, "sink")
+    os.environ['AUTOPRINT_JOURNAL'] = os.path.join(run_dir, "journal.db")
+    os.environ['AUTOPRINT_LOG_DIR'] = os.path.join(run_dir, "logs")
+    os.environ['AUTOPRINT_THUMB_DIR'] = os.path.join(run_dir, "thumbs")
+    os.chdir(run_dir)
+    
+    from PySide6.QtWidgets import QApplication
+    import auto_print_final
+    
+    stages = {}
+    
+    def record(name, result):
+        stages[name] = result
+        print(f"{name:<16} {result['ops']:>7} ops {result['ops_per_sec'] or 0:>10.1f} ops/s"
+              f"  p50 {result['p50_ms'] or 0:>8.3f} ms  p99 {result['p99_ms'] or 0:>8.3f} ms", file=sys.stderr)
+    
+    app = QApplication.instance() or QApplication([])
+    window = auto_print_final.AutoPrintTool()
+    window.show()
+    app.processEvents()
+    try:
+        record('ingest_tree', bench_ingest(os.path.join(workdir, "tree")))
+        record('add_to_queue', bench_add_to_queue(app, window, pngs))
+        record('queue_view', bench_queue_view(app, window, pdfs))
+        window.reset_ui()
+        previews = pdfs + pngs[:len(pdfs)]
+        record('preview_cold', bench_preview_cold(previews, os.path.join(run_dir, "thumbs")))
+        record('preview_warm', bench_preview_warm(app, window, previews))
+        record('dispatch', bench_dispatch(window, pdfs))
+    finally:
+        window.close()
+        os.chdir(ROOT)
+        shutil.rmtree(run_dir, ignore_errors=True)
+    
+    return {
+        'meta': {
+            'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'workload': size,
+        },
+        'stages': stages,
+    }
+
+
+def compare(baseline, current, thresholds):
+    """Сравнивает два прогона; возвращает список нарушений порогов"""
+    failures = []
+    print(f"{'Phase':<16} {'ops/s alt':>11} {'ops/s neu':>11} {'x':>6} {'p99 alt':>9} {'p99 neu':>9} {'x':>6}")
+    for name, result in current['stages'].items():
+        old = baseline['stages'].get(name)
+        if old is None:
+            continue
+        limits = dict(thresholds.get('default', {}), **thresholds.get('stages', {}).get(name, {}))
+        ops_ratio = p99_ratio = None
+        if old.get('ops_per_sec') and result.get('ops_per_sec'):
+            ops_ratio = result['ops_per_sec'] / old['ops_per_sec']
+        if old.get('p99_ms') and result.get('p99_ms') is not None:
+            p99_ratio = result['p99_ms'] / old['p99_ms']
+        print(f"{name:<16} {old['ops_per_sec'] or 0:>11.1f} {result['ops_per_sec'] or 0:>11.1f} "
+              f"{ops_ratio or 0:>6.2f} {old['p99_ms'] or 0:>9.3f} {result['p99_ms'] or 0:>9.3f} {p99_ratio or 0:>6.2f}")
+        if ops_ratio is not None and ops_ratio < limits.get('min_ops_ratio', 0):
+            failures.append(f"{name}: ops/s {ops_ratio:.2f}x < {limits['min_ops_ratio']}x")
+        # Доли миллисекунды шумят сильнее любой регрессии: ниже p99_floor_ms p99 не проверяем
+        if (p99_ratio is not None and p99_ratio > limits.get('max_p99_ratio', float('inf'))
+                and result['p99_ms'] >= limits.get('p99_floor_ms', 0)):
+            failures.append(f"{name}: p99 {p99_ratio:.2f}x > {limits['max_p99_ratio']}x")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark-Suite für AutoPrint")
+    parser.add_argument("--output", help="Ergebnis als JSON speichern")
+    parser.add_argument("--baseline", help="Früheres Ergebnis zum Vergleich")
+    parser.add_argument("--thresholds", default=THRESHOLDS, help="Grenzwerte für --baseline")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "autoprint_bench"),
+                        help="Ordner für die Testdaten (wird wiederverwendet)")
+    parser.add_argument("--quick", action="store_true", help="Kleine Last für einen schnellen Lauf")
+    parser.add_argument("--pngs", type=int, help="Anzahl PNG-Dateien")
+    parser.add_argument("--pdfs", type=int, help="Anzahl PDF-Dateien")
+    parser.add_argument("--compare-only", action="store_true",
+                        help="Nur --output (als neues Ergebnis) mit --baseline vergleichen")
+    args = parser.parse_args()
+    
+    if args.compare_only:
+        with open(args.output, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+    else:
+        result = run_suite(args)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.thresholds, 'r', encoding='utf-8') as f:
+            thresholds = json.load(f)
+        failures = compare(baseline, result, thresholds)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""IPP-клиент и бэкенд против локального IppStubServer: состояния заданий, копии, повторы"""
+import time
+
+import pytest
+
+from autoprint import ipp
+from autoprint.backends import IppBackend, JOB_PRINTED, JOB_SPOOLED, JOB_ERROR
+from autoprint.engine import PrintEngine
+from autoprint.pool import PrinterPool, POLICY_ROUND_ROBIN
+
+
+@pytest.fixture
+def stub():
+    stub = ipp.IppStubServer().start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "Flyer.pdf"
+    path.write_bytes(b"%PDF-1.4\n1 0 obj << /Type /Page >> endobj\n2 0 obj << /Type /Page >> endobj\n%%EOF\n")
+    return path
+
+
+def wait_state(client, job_id, state, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if client.get_job(job_id)["job-state"] == state:
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_message_roundtrip():
+    message = ipp.encode_message(ipp.PRINT_JOB, 7, [
+        (ipp.OPERATION_GROUP, [(ipp.TAG_NAME, "job-name", "Flyer"), (ipp.TAG_KEYWORD, "which", ["a", "b"])]),
+        (ipp.JOB_GROUP, [(ipp.TAG_INTEGER, "copies", 3), (ipp.TAG_RANGE, "copies-supported", (1, 99))]),
+    ]) + b"DATA"
+    decoded = ipp.decode_message(message)
+    assert (decoded.code, decoded.request_id, decoded.data) == (ipp.PRINT_JOB, 7, b"DATA")
+    assert decoded.group(ipp.OPERATION_GROUP) == {"job-name": ["Flyer"], "which": ["a", "b"]}
+    assert decoded.group(ipp.JOB_GROUP) == {"copies": [3], "copies-supported": [(1, 99)]}
+
+
+def test_job_states_and_copies(stub, document):
+    stub.print_seconds = 0.1
+    client = ipp.IppClient(stub.uri)
+    try:
+        job_id = client.print_job(str(document), copies=3, name="Flyer", format="application/pdf")
+        assert stub.jobs[job_id]['copies'] == 3
+        assert stub.jobs[job_id]['pages'] == 2
+        assert client.get_job(job_id)["job-state"] in (ipp.JOB_PENDING, ipp.JOB_PROCESSING)
+        assert job_id in client.get_jobs()
+        assert wait_state(client, job_id, ipp.JOB_COMPLETED)
+        assert job_id in client.get_jobs("completed")
+    finally:
+        client.close()
+
+
+def test_create_job_and_cancel(stub, document):
+    client = ipp.IppClient(stub.uri)
+    try:
+        job_id = client.create_job(copies=2)
+        assert client.get_job(job_id)["job-state"] == ipp.JOB_HELD
+        client.send_document(job_id, str(document))
+        assert stub.jobs[job_id]['copies'] == 2
+        client.cancel_job(job_id)
+        assert client.get_job(job_id)["job-state"] == ipp.JOB_CANCELED
+        with pytest.raises(ipp.IppError):
+            client.get_job(job_id + 100)
+    finally:
+        client.close()
+
+
+def test_print_job_is_not_resent_after_dropped_response(stub):
+    """Принтер принял Print-Job и оборвал соединение: повтор напечатал бы задание дважды"""
+    client = ipp.IppClient(stub.uri, connections=1)
+    try:
+        client.print_job(b"%PDF erste")
+        stub.drop_responses = 1
+        with pytest.raises(ipp.IppError):
+            client.print_job(b"%PDF zweite")
+        assert len(stub.jobs) == 2
+        # Повторяемый запрос в оборванном keep-alive соединении повторяется сам
+        client.get_jobs()
+        stub.drop_responses = 1
+        assert sorted(client.get_jobs("completed")) == [1, 2]
+        assert client.print_job(b"%PDF dritte") == 3
+    finally:
+        client.close()
+
+
+def test_backend_copies_in_job_ticket(stub, document):
+    backend = IppBackend({'P1': stub.uri})
+    try:
+        engine = PrintEngine(backend, rasterize_pdf=False)
+        summary = engine.run([(str(document), 4)], 'P1')
+    finally:
+        backend.close()
+    assert (summary['printed'], summary['confirmed'], summary['failed']) == (1, 1, 0)
+    assert [job['copies'] for job in stub.jobs.values()] == [4]
+
+
+def test_backend_without_printer_copies_resends(document):
+    stub = ipp.IppStubServer(max_copies=1).start()
+    backend = IppBackend({'P1': stub.uri})
+    try:
+        assert backend.printer_capabilities('P1')['copies'] == 1
+        summary = PrintEngine(backend, rasterize_pdf=False).run([(str(document), 3)], 'P1')
+    finally:
+        backend.close()
+        stub.stop()
+    assert summary['confirmed'] == 3
+    assert [job['copies'] for job in stub.jobs.values()] == [1, 1, 1]
+
+
+def test_failed_upload_is_reported_failed(stub, document):
+    backend = IppBackend({'P1': stub.uri, 'Tot': "ipp://127.0.0.1:9/ipp/print"}, timeout=5.0)
+    states = []
+    try:
+        engine = PrintEngine(backend, wait_printed=False, rasterize_pdf=False)
+        summary = engine.run(
+            [(str(document), 1, 'Tot'), (str(document), 1, 'P1')], 'P1',
+            on_job_state=lambda index, state, info: states.append((index, state))
+        )
+    finally:
+        backend.close()
+    assert (summary['printed'], summary['failed']) == (1, 1)
+    assert (0, JOB_ERROR) in states and (0, JOB_SPOOLED) not in states
+    assert (1, JOB_SPOOLED) in states
+    assert JOB_PRINTED not in [state for _, state in states]
+
+
+def test_pool_reports_failed_upload(stub, document):
+    backend = IppBackend({'P1': stub.uri, 'Tot': "ipp://127.0.0.1:9/ipp/print"}, timeout=5.0)
+    states = []
+    try:
+        engine = PrintEngine(backend, wait_printed=False, rasterize_pdf=False)
+        pool = PrinterPool(engine, ['P1', 'Tot'], policy=POLICY_ROUND_ROBIN)
+        summary = pool.run(
+            [(str(document), 1), (str(document), 1)],
+            on_job_state=lambda index, state, info: states.append((index, state))
+        )
+    finally:
+        backend.close()
+    assert (summary['printed'], summary['failed'], summary['job_errors']) == (1, 1, 0)
+    assert (summary['printers']['P1']['jobs'], summary['printers']['Tot']['failed']) == (1, 1)
+    assert (1, JOB_ERROR) in states and (1, JOB_SPOOLED) not in states
+    assert (0, JOB_SPOOLED) in states
+    assert len(stub.jobs) == 1
@@ -0,0 +1,85 @@
+"""RAW-бэкенд против локального приёмника RawSink: рамки PJL, копии через QTY, соединения"""
+import pytest
+
+from autoprint import rawsocket
+from autoprint.backends import RawSocketBackend
+
+
+@pytest.fixture
+def sink(tmp_path):
+    sink = rawsocket.RawSink(tmp_path / "sink").start()
+    yield sink
+    sink.stop()
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "Flyer.pdf"
+    path.write_bytes(b"%PDF-1.4\n" + bytes(range(256)) * 64 + b"\n%%EOF\n")
+    return path
+
+
+def make_backend(sink, **options):
+    return RawSocketBackend(f"P1=127.0.0.1:{sink.port}", **options)
+
+
+def test_pjl_header_and_trailer():
+    header = rawsocket.pjl_header('Job "1"', "PDF", 3)
+    assert header.startswith(rawsocket.UEL + b"@PJL\r\n")
+    assert b'@PJL JOB NAME="Job \'1\'"\r\n' in header
+    assert b"@PJL SET QTY=3\r\n" in header
+    assert header.endswith(b"@PJL ENTER LANGUAGE=PDF\r\n")
+    trailer = rawsocket.pjl_trailer("Job")
+    assert trailer == rawsocket.UEL + b'@PJL EOJ NAME="Job"\r\n' + rawsocket.UEL
+
+
+def test_jobs_share_one_connection(sink, document):
+    backend = make_backend(sink)
+    try:
+        first = backend.submit(str(document), "P1", 2)
+        second = backend.submit(str(document), "P1", 5)
+        assert sink.wait_jobs(2)
+    finally:
+        backend.close()
+    assert [job['name'] for job in sink.jobs] == first + second
+    assert [job['copies'] for job in sink.jobs] == [2, 5]
+    assert all(job['language'] == "PDF" for job in sink.jobs)
+    assert all(job['bytes'] == document.stat().st_size for job in sink.jobs)
+    # Задания разделены PJL, а не закрытием соединения
+    assert sink.connections == 1
+    assert (sink.directory / f"{first[0]}.pdf").read_bytes() == document.read_bytes()
+
+
+def test_copies_above_pjl_limit_are_split(sink, document):
+    backend = make_backend(sink)
+    try:
+        job_ids = backend.submit(str(document), "P1", rawsocket.PJL_MAX_COPIES + 1)
+        assert sink.wait_jobs(2)
+    finally:
+        backend.close()
+    assert len(job_ids) == 2
+    assert [job['copies'] for job in sink.jobs] == [rawsocket.PJL_MAX_COPIES, 1]
+
+
+def test_resend_mode_sends_file_per_copy(sink, document):
+    backend = make_backend(sink, copies_mode="resend")
+    assert backend.printer_capabilities("P1")['copies'] == 1
+    try:
+        assert len(backend.submit(str(document), "P1", 3)) == 3
+        assert sink.wait_jobs(3)
+    finally:
+        backend.close()
+    assert [job['copies'] for job in sink.jobs] == [1, 1, 1]
+
+
+def test_without_pjl_connection_is_the_job(sink, document):
+    backend = make_backend(sink, pjl=False)
+    try:
+        backend.submit(str(document), "P1")
+        backend.submit(str(document), "P1")
+        assert sink.wait_jobs(2)
+    finally:
+        backend.close()
+    assert sink.connections == 2
+    assert [job['language'] for job in sink.jobs] == [None, None]
+    assert all(job['bytes'] == document.stat().st_size for job in sink.jobs)
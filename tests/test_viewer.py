@@ -0,0 +1,98 @@
+"""ViewerSupervisor против программы-заглушки python -m autoprint.viewer"""
+import os
+import sys
+import json
+import time
+import subprocess
+
+import pytest
+
+from autoprint.viewer import ViewerSupervisor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "Auftrag.pdf"
+    path.write_bytes(b"%PDF-1.4\n%%EOF\n")
+    return str(path)
+
+
+@pytest.fixture
+def viewer(tmp_path, monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    directory = tmp_path / "viewer"
+    command = [sys.executable, "-m", "autoprint.viewer", "--dir", str(directory)]
+    supervisor = ViewerSupervisor(command, resident_args=(), start_seconds=0.5, request_timeout=10.0)
+    yield supervisor, directory
+    supervisor.close()
+
+
+def printed(directory):
+    log = directory / "printed.jsonl"
+    if not log.exists():
+        return []
+    return [json.loads(line) for line in log.read_text(encoding='utf-8').splitlines()]
+
+
+def waiter(directory, count, timeout=10.0):
+    """wait() для print_file: задание принято, когда заглушка записала count-ю строку"""
+    def wait():
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if len(printed(directory)) >= count:
+                return count
+            time.sleep(0.01)
+        return None
+    return wait
+
+
+def test_one_resident_instance_prints_all_copies(viewer, document):
+    supervisor, directory = viewer
+    for copy in range(1, 4):
+        assert supervisor.print_file(document, "Stub", waiter(directory, copy)) == copy
+    assert (supervisor.starts, supervisor.restarts) == (1, 0)
+    assert {job['pid'] for job in printed(directory)} == {supervisor.pid}
+    assert all(job['printer'] == "Stub" for job in printed(directory))
+
+
+def test_restart_after_crash(viewer, document):
+    supervisor, directory = viewer
+    assert supervisor.print_file(document, "Stub", waiter(directory, 1)) == 1
+    crashed = supervisor.pid
+    supervisor.process.kill()
+    supervisor.process.wait()
+    
+    assert supervisor.print_file(document, "Stub", waiter(directory, 2)) == 2
+    assert (supervisor.starts, supervisor.restarts) == (2, 1)
+    assert supervisor.pid != crashed
+    assert printed(directory)[-1]['pid'] == supervisor.pid
+
+
+def test_unconfirmed_job_restarts_program(viewer, document):
+    supervisor, directory = viewer
+    assert supervisor.print_file(document, "Stub", lambda: None) is None
+    assert not supervisor.running()
+    assert supervisor.restarts == 1
+    # Следующее задание запускает программу заново
+    assert supervisor.print_file(document, "Stub", waiter(directory, 2)) == 2
+    assert supervisor.running()
+
+
+def test_close_leaves_foreign_instances_alone(viewer, document, tmp_path):
+    supervisor, directory = viewer
+    # «Adobe, открытый пользователем»: такой же процесс, но запущенный не супервизором
+    foreign = subprocess.Popen(
+        [sys.executable, "-m", "autoprint.viewer", "--dir", str(tmp_path / "foreign")],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        supervisor.print_file(document, "Stub", waiter(directory, 1))
+        process = supervisor.process
+        supervisor.close()
+        assert process.poll() is not None
+        assert foreign.poll() is None
+    finally:
+        foreign.kill()
+        foreign.wait()